@@ -0,0 +1,80 @@
+"""
+Day archive check against the Firestore emulator.
+
+Seeds finished days for one user (one that fits in a single commit and one
+that needs several) and runs archive_day on each, then checks that every
+task doc is gone, the day's rollup holds the tasks with their counts and is
+marked archived, and the month doc has the day. Running it again on an
+archived day must be a no-op. Exits non-zero on any mismatch.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/archive_days.py
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from common import use_emulator
+
+use_emulator()
+
+import main  # noqa: E402
+
+
+def seed_day(user_id: str, date: str, size: int):
+    """size tasks on date, every third one completed"""
+    writer = main.db.bulk_writer()
+    created_at = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
+    for i in range(size):
+        completed = i % 3 == 0
+        writer.set(main.get_user_tasks_collection(user_id, date).document(), {
+            "title": f"task {i}", "description": None, "priority": "medium", "completed": completed,
+            "created_at": created_at + timedelta(seconds=i), "user_id": user_id, "group_id": None,
+        })
+    writer.close()
+    batch = main.db.batch()
+    main.record_progress(batch, user_id, date, None, total=size, completed=len(range(0, size, 3)))
+    batch.commit()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=f"25,{main.ARCHIVE_BATCH_SIZE * 2 + 10}", help="comma-separated tasks per seeded day")
+    args = parser.parse_args()
+
+    user_id = f"archive-{uuid.uuid4().hex[:8]}"
+    first = datetime.now(timezone.utc).date() - timedelta(days=main.ARCHIVE_MIN_AGE_DAYS + 1)
+    failures = []
+
+    def expect(label, actual, expected):
+        status = "ok" if actual == expected else "WRONG"
+        print(f"{status:<6} {label}: {actual!r}")
+        if actual != expected:
+            failures.append(label)
+
+    for offset, size in enumerate(int(v) for v in args.sizes.split(",")):
+        date = (first - timedelta(days=offset)).isoformat()
+        seed_day(user_id, date, size)
+        began = time.perf_counter()
+        removed = main.archive_day(user_id, date)
+        elapsed = (time.perf_counter() - began) * 1000
+        print(f"archived {size} tasks on {date} in {elapsed:.0f} ms")
+
+        completed = len(range(0, size, 3))
+        summary = main.get_daily_summary_ref(user_id, date).get().to_dict() or {}
+        month = main.get_history_month_ref(user_id, date[:7]).get().to_dict() or {}
+        expect(f"{size}: task docs removed", removed, size)
+        expect(f"{size}: task docs left", len(list(main.get_user_tasks_collection(user_id, date).select(["__name__"]).stream())), 0)
+        expect(f"{size}: archived", summary.get("archived"), True)
+        expect(f"{size}: archived tasks", len(summary.get("tasks", [])), size)
+        expect(f"{size}: day counts", (summary.get("total_tasks"), summary.get("completed_tasks")), (size, completed))
+        expect(f"{size}: month doc", month.get("days", {}).get(date[8:]), {"total_tasks": size, "completed_tasks": completed})
+        expect(f"{size}: archiving again", main.archive_day(user_id, date), 0)
+
+    if failures:
+        sys.exit(f"archive wrong for: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main_cli()
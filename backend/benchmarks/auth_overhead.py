@@ -0,0 +1,67 @@
+"""
+Microbenchmark of per-request auth overhead in get_current_user.
+
+Signs an RS256 ID token with a throwaway key and swaps auth.verify_id_token
+for a verifier that does the same signature check and claims parsing the
+Admin SDK does, so the numbers reflect real crypto cost without network
+access. Runs the dependency with the token cache on and off.
+
+    python benchmarks/auth_overhead.py --requests 2000
+"""
+import argparse
+import asyncio
+import time
+
+from common import PROJECT_ID, use_emulator
+
+# No Firestore traffic here; the emulator setup just lets main import without credentials
+use_emulator(required=False)
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+import main  # noqa: E402
+
+
+def make_token():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_pem = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    signer = crypt.RSASigner.from_string(private_pem, key_id="bench")
+    now = int(time.time())
+    token = jwt.encode(signer, {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": "bench-user",
+        "uid": "bench-user",
+        "email": "bench@bench.local",
+        "iat": now,
+        "exp": now + 3600,
+    }).decode()
+    return token, {"bench": public_pem.decode()}
+
+
+async def measure(token, requests):
+    header = f"Bearer {token}"
+    began = time.perf_counter()
+    for _ in range(requests):
+        await main.get_current_user(header)
+    return (time.perf_counter() - began) / requests * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    token, certs = make_token()
+    main.auth.verify_id_token = lambda id_token, check_revoked=False: jwt.decode(id_token, certs=certs, audience=PROJECT_ID)
+
+    for label, size in (("cache off", 0), ("cache on", main.AUTH_CACHE_SIZE or 10000)):
+        main.token_cache = main.TokenCache(size, main.AUTH_CACHE_TTL)
+        per_request = asyncio.run(measure(token, args.requests))
+        print(f"{label:>9}: {per_request:8.1f} µs/request  {main.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
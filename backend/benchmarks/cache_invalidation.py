@@ -0,0 +1,102 @@
+"""
+Invalidation check for the document cache, against the Firestore emulator.
+
+Warms the cache through the API, changes the cached documents through the
+write endpoints and fails if any later read serves the old version. Covers
+user profiles, group docs (member counts) and group member docs, including
+cached "not a member" answers and the group tag on personal tasks, which
+only members may set. Set DOC_CACHE_URL to run it against Redis.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/cache_invalidation.py
+"""
+import sys
+import uuid
+
+from common import stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+
+def main_cli():
+    run = uuid.uuid4().hex[:8]
+    host, member = f"host-{run}", f"member-{run}"
+    stub_auth(main)
+    client = TestClient(main.app)
+    as_host = {"Authorization": f"Bearer {host}"}
+    as_member = {"Authorization": f"Bearer {member}"}
+    failures = []
+
+    def expect(label, actual, expected):
+        status = "ok" if actual == expected else "STALE"
+        print(f"{status:<6} {label}: {actual!r}")
+        if actual != expected:
+            failures.append(label)
+
+    def profile_name(headers):
+        return client.get("/api/user/profile", headers=headers).json()["user"]["display_name"]
+
+    def member_count(group_id):
+        return client.get(f"/api/groups/{group_id}", headers=as_host).json()["group"]["member_count"]
+
+    def listed_count(group_id):
+        groups = client.get("/api/groups", headers=as_host).json()["groups"]
+        return next((g["member_count"] for g in groups if g["id"] == group_id), None)
+
+    def can_read_tasks(group_id):
+        return client.get(f"/api/groups/{group_id}/tasks", headers=as_member).status_code
+
+    def can_tag_tasks(group_id):
+        """Status of a personal task tagged with the group, created alone and in a batch"""
+        alone = client.post("/api/tasks", headers=as_member, json={"title": "tagged", "group_id": group_id}).status_code
+        operation = {"op": "create", "title": "tagged", "group_id": group_id}
+        batched = client.post("/api/tasks/batch", headers=as_member, json={"operations": [operation]}).json()["results"][0]["status_code"]
+        return alone, batched
+
+    # User profiles: the auto-created profile, then an explicit setup
+    expect("profile after auto-create", profile_name(as_host), host)
+    client.post("/api/users/setup", headers=as_host, json={"display_name": "Before"})
+    expect("profile after setup", profile_name(as_host), "Before")
+    client.post("/api/users/setup", headers=as_host, json={"display_name": "After"})
+    expect("profile after second setup", profile_name(as_host), "After")
+
+    group = client.post("/api/groups", headers=as_host, json={"name": f"Cache {run}"}).json()["group"]
+    client.post("/api/users/setup", headers=as_member, json={"display_name": "Member"})
+    expect("group host profile", client.get("/api/groups", headers=as_host).json()["groups"][0]["host"]["display_name"], "After")
+
+    # Group member docs: a cached "not a member" must not survive joining, nor "member" survive leaving
+    expect("non-member reads group tasks", can_read_tasks(group["id"]), 403)
+    expect("non-member tags tasks with group", can_tag_tasks(group["id"]), (403, 403))
+    expect("member count before join", member_count(group["id"]), 1)
+    expect("listed member count before join", listed_count(group["id"]), 1)
+    client.post("/api/groups/join", headers=as_member, json={"invite_code": group["invite_code"]})
+    expect("member reads group tasks after join", can_read_tasks(group["id"]), 200)
+    expect("member tags tasks with group after join", can_tag_tasks(group["id"]), (200, 201))
+    expect("member count after join", member_count(group["id"]), 2)
+    expect("listed member count after join", listed_count(group["id"]), 2)
+    note = client.post("/api/motivational-notes", headers=as_host, json={"to_user_id": member, "message": "hi", "group_id": group["id"]})
+    expect("group note after join", note.status_code, 200)
+
+    client.post(f"/api/groups/{group['id']}/leave", headers=as_member)
+    expect("member reads group tasks after leave", can_read_tasks(group["id"]), 403)
+    expect("member tags tasks with group after leave", can_tag_tasks(group["id"]), (403, 403))
+    expect("member count after leave", member_count(group["id"]), 1)
+    expect("listed member count after leave", listed_count(group["id"]), 1)
+    note = client.post("/api/motivational-notes", headers=as_host, json={"to_user_id": member, "message": "hi", "group_id": group["id"]})
+    expect("group note after leave", note.status_code, 403)
+
+    # Group docs: the host leaving a single-member group deletes it
+    expect("host creates group task", client.post(f"/api/groups/{group['id']}/tasks", headers=as_host, json={"title": "t"}).status_code, 200)
+    client.post(f"/api/groups/{group['id']}/leave", headers=as_host)
+    expect("group task after group deleted", client.post(f"/api/groups/{group['id']}/tasks", headers=as_host, json={"title": "t"}).status_code, 404)
+    expect("groups listed after group deleted", listed_count(group["id"]), None)
+
+    print(f"cache: {main.doc_cache.stats()}")
+    if failures:
+        sys.exit(f"stale reads after invalidation: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,87 @@
+"""Shared setup for the benchmark scripts: emulator-only Firebase app, auth stub, stats."""
+import contextvars
+import os
+import sys
+
+import firebase_admin
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "demo-checkapp")
+
+
+class EmulatorCredential(credentials.Base):
+    """The emulator accepts unauthenticated requests, so skip Application Default Credentials"""
+
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
+def use_emulator(required: bool = True):
+    """Initialize Firebase against the Firestore emulator before main is imported"""
+    if required and not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("FIRESTORE_EMULATOR_HOST is not set - refusing to run against a live project")
+    os.environ.setdefault("FIRESTORE_EMULATOR_HOST", "localhost:8080")
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(EmulatorCredential(), options={"projectId": PROJECT_ID})
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def stub_auth(main, known_uids=None):
+    """Accept 'Bearer <uid>' instead of real ID tokens (optionally only for known uids)"""
+    import time
+
+    def verify(token, *args, **kwargs):
+        if known_uids is not None and token not in known_uids:
+            raise ValueError("unknown benchmark user")
+        return {"uid": token, "email": f"{token}@bench.local", "exp": time.time() + 3600}
+
+    main.auth.verify_id_token = verify
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+_request_tally = contextvars.ContextVar("bench_request_tally", default=None)
+
+
+def count_reads(main):
+    """Wrap main.run_db so Firestore traffic is tallied as billed document reads.
+
+    Uses the same accounting as /metrics (main.billed_usage, and
+    main.transaction_usage for transactions, counting every read the
+    transaction made as well as its single round trip). Returns
+    running totals; request_tally() additionally scopes a tally to the calling
+    task so concurrent requests can be told apart.
+    """
+    totals = {"documents": 0, "round_trips": 0}
+    original = main.run_db
+
+    async def counting_run_db(fn, *args, **kwargs):
+        result = await original(fn, *args, **kwargs)
+        if fn is main.auth.verify_id_token:
+            return result
+        if getattr(fn, "to_wrap", None) is not None:
+            documents, _ = main.transaction_usage(args[0], True)
+        else:
+            documents, _ = main.billed_usage(result)
+        for tally in (totals, _request_tally.get()):
+            if tally is not None:
+                tally["documents"] += documents
+                tally["round_trips"] += 1
+        return result
+
+    main.run_db = counting_run_db
+    return totals
+
+
+def request_tally():
+    """Start a read tally for the current task (call right before issuing a request)"""
+    tally = {"documents": 0, "round_trips": 0}
+    _request_tally.set(tally)
+    return tally
@@ -0,0 +1,103 @@
+"""
+Round-trip check for the create endpoints against the Firestore emulator.
+
+Records every Firestore call each create endpoint makes and fails if any of
+them reads back the document it just wrote. Each create should cost exactly
+one write round trip; lookups it needs (membership, friendship, the sender's
+profile) are listed alongside so regressions are easy to spot.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/create_round_trips.py
+"""
+import sys
+import uuid
+
+from common import stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+WRITES = {"add", "set", "create", "update", "delete", "commit"}
+
+
+def record_calls():
+    """Wrap run_db so each Firestore call is logged as (method, target path)"""
+    calls = []
+    original = main.run_db
+
+    async def recording_run_db(fn, *args, **kwargs):
+        if fn is main.auth.verify_id_token:
+            return await original(fn, *args, **kwargs)
+        target = getattr(fn, "__self__", None)
+        calls.append((getattr(fn, "__name__", repr(fn)), getattr(target, "path", getattr(target, "_path", None))))
+        return await original(fn, *args, **kwargs)
+
+    main.run_db = recording_run_db
+    return calls
+
+
+def check(label, calls, response, created_id):
+    response.raise_for_status()
+    writes = [name for name, _ in calls if name in WRITES]
+    first_write = next(i for i, (name, _) in enumerate(calls) if name in WRITES)
+    read_backs = [path for name, path in calls[first_write:] if name == "get" and path and path.endswith(f"/{created_id}")]
+    print(f"{label:<28} {len(calls):>6} {len(writes):>7} {len(read_backs):>11}   {' '.join(name for name, _ in calls)}")
+    return not read_backs and len(writes) == 1
+
+
+def main_cli():
+    run = uuid.uuid4().hex[:8]
+    host, friend = f"host-{run}", f"friend-{run}"
+    stub_auth(main)
+    calls = record_calls()
+    client = TestClient(main.app)
+    as_host = {"Authorization": f"Bearer {host}"}
+    as_friend = {"Authorization": f"Bearer {friend}"}
+
+    def call(method, path, headers, payload=None):
+        calls.clear()
+        return client.request(method, path, headers=headers, json=payload)
+
+    ok = True
+    print(f"{'endpoint':<28} {'calls':>6} {'writes':>7} {'read-backs':>11}   sequence")
+
+    response = call("POST", "/api/users/setup", as_host, {"display_name": "Host"})
+    ok &= check("POST /users/setup", calls, response, host)
+    client.post("/api/users/setup", headers=as_friend, json={"display_name": "Friend"})
+
+    response = call("POST", "/api/tasks", as_host, {"title": "Plan the day"})
+    ok &= check("POST /tasks", calls, response, response.json()["task"]["id"])
+
+    response = call("POST", "/api/groups", as_host, {"name": f"Bench {run}"})
+    group = response.json()["group"]
+    ok &= check("POST /groups", calls, response, group["id"])
+    client.post("/api/groups/join", headers=as_friend, json={"invite_code": group["invite_code"]})
+
+    response = call("POST", f"/api/groups/{group['id']}/tasks", as_host, {"title": "Group goal"})
+    group_task = response.json()["task"]
+    ok &= check("POST /groups/{id}/tasks", calls, response, group_task["id"])
+
+    response = call("PUT", f"/api/groups/{group['id']}/tasks/{group_task['id']}", as_host, {"title": "Group goal v2"})
+    ok &= check("PUT /groups/{id}/tasks/{t}", calls, response, group_task["id"])
+
+    response = call("POST", f"/api/groups/{group['id']}/messages", as_friend, {"message": "hi"})
+    ok &= check("POST /groups/{id}/messages", calls, response, response.json()["group_message"]["id"])
+
+    response = call("POST", "/api/friends/request", as_host, {"user_email": f"{friend}@bench.local"})
+    request = response.json()["request"]
+    ok &= check("POST /friends/request", calls, response, request["id"])
+    client.post(f"/api/friends/requests/{request['id']}/respond", headers=as_friend, json={"accept": True})
+
+    response = call("POST", "/api/motivational-notes", as_host, {"to_user_id": friend, "message": "You got this"})
+    ok &= check("POST /motivational-notes", calls, response, response.json()["note"]["id"])
+
+    response = call("POST", "/api/tasks/batch", as_host, {"operations": [{"op": "create", "title": f"t{i}"} for i in range(10)]})
+    ok &= check("POST /tasks/batch (10)", calls, response, response.json()["results"][0]["task_id"])
+
+    if not ok:
+        sys.exit("a create endpoint re-read its own write or took more than one write round trip")
+
+
+if __name__ == "__main__":
+    main_cli()
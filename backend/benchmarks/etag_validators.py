@@ -0,0 +1,104 @@
+"""
+Conditional GET check for the list endpoints, against the Firestore emulator.
+
+For today's tasks, a friend's tasks, group tasks, group members and the
+groups list: fetches the ETag, re-requests with If-None-Match and expects a
+304, then makes a change and expects the validator to move exactly when the
+response would differ. Changes that leave a response alone (another user's
+task, a different group) must keep the 304. Reports the Firestore reads a
+304 costs next to a full response. Exits non-zero on any mismatch.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/etag_validators.py
+"""
+import sys
+import uuid
+
+from common import count_reads, stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+
+def main_cli():
+    run = uuid.uuid4().hex[:8]
+    host, member, other = f"host-{run}", f"member-{run}", f"other-{run}"
+    stub_auth(main)
+    counter = count_reads(main)
+    client = TestClient(main.app)
+    auth = {uid: {"Authorization": f"Bearer {uid}"} for uid in (host, member, other)}
+    failures = []
+    etags = {}
+
+    def check(label, path, uid, changed):
+        """Revalidate path as uid: changed says whether the last step should have moved its validator"""
+        previous = etags.get((path, uid))
+        counter.update(documents=0)
+        response = client.get(path, headers={**auth[uid], "If-None-Match": previous or '"none"'})
+        reads = counter["documents"]
+        expected = 200 if changed or previous is None else 304
+        status = "ok" if response.status_code == expected else "WRONG"
+        print(f"{status:<6} {label:<44} {response.status_code} ({reads} reads)")
+        if response.status_code != expected:
+            failures.append(label)
+        if response.status_code == 200:
+            etags[(path, uid)] = response.headers["etag"]
+
+    for uid in auth:
+        client.post("/api/users/setup", headers=auth[uid], json={"display_name": uid})
+    request_id = client.post("/api/friends/request", headers=auth[host], json={"user_email": f"{member}@bench.local"}).json()["request"]["id"]
+    client.post(f"/api/friends/requests/{request_id}/respond", headers=auth[member], json={"accept": True})
+
+    today, friend_tasks = "/api/tasks/today", f"/api/tasks/friend/{member}"
+    check("today: first fetch", today, member, True)
+    check("friend tasks: first fetch", friend_tasks, host, True)
+    check("today: unchanged", today, member, False)
+    task = client.post("/api/tasks", headers=auth[member], json={"title": "write report"}).json()["task"]
+    check("today: after create", today, member, True)
+    check("friend tasks: after friend's create", friend_tasks, host, True)
+    client.put(f"/api/tasks/{task['id']}", headers=auth[member], json={"completed": True})
+    check("today: after completing", today, member, True)
+    client.put(f"/api/tasks/{task['id']}", headers=auth[member], json={"completed": True})
+    check("today: after re-completing (updated_at moves)", today, member, True)
+    check("friend tasks: after friend's updates", friend_tasks, host, True)
+    client.post("/api/tasks", headers=auth[other], json={"title": "someone else"})
+    check("today: after another user's create", today, member, False)
+    check("friend tasks: after a stranger's create", friend_tasks, host, False)
+    client.post("/api/tasks/batch", headers=auth[member], json={"operations": [{"op": "delete", "task_id": task["id"]}]})
+    check("today: after batch delete", today, member, True)
+    check("today?fields=title: own validator", f"{today}?fields=title", member, True)
+
+    group = client.post("/api/groups", headers=auth[host], json={"name": f"ETag {run}"}).json()["group"]
+    other_group = client.post("/api/groups", headers=auth[other], json={"name": f"Other {run}"}).json()["group"]
+    group_tasks, members, groups = f"/api/groups/{group['id']}/tasks", f"/api/groups/{group['id']}/members", "/api/groups"
+    check("group tasks: first fetch", group_tasks, host, True)
+    check("group members: first fetch", members, host, True)
+    check("groups list: first fetch", groups, host, True)
+    group_task = client.post(group_tasks, headers=auth[host], json={"title": "team goal"}).json()["task"]
+    check("group tasks: after create", group_tasks, host, True)
+    client.put(f"{group_tasks}/{group_task['id']}", headers=auth[host], json={"title": "team goal v2"})
+    check("group tasks: after update", group_tasks, host, True)
+    client.post(f"/api/groups/{other_group['id']}/tasks", headers=auth[other], json={"title": "elsewhere"})
+    check("group tasks: after another group's create", group_tasks, host, False)
+    client.delete(f"{group_tasks}/{group_task['id']}", headers=auth[host])
+    check("group tasks: after delete", group_tasks, host, True)
+
+    client.post("/api/groups/join", headers=auth[member], json={"invite_code": group["invite_code"]})
+    check("group members: after join", members, host, True)
+    check("groups list: after a member joins (count)", groups, host, True)
+    client.post("/api/users/setup", headers=auth[member], json={"display_name": "Renamed"})
+    check("group members: after a member renames", members, host, True)
+    check("groups list: unchanged by a member rename", groups, host, False)
+    client.post("/api/users/setup", headers=auth[host], json={"display_name": "Host Renamed"})
+    check("groups list: after the host renames", groups, host, True)
+    client.post(f"/api/groups/{group['id']}/leave", headers=auth[member])
+    check("group members: after leave", members, host, True)
+    check("group members: unchanged", members, host, False)
+
+    if failures:
+        sys.exit(f"validators wrong for: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main_cli()
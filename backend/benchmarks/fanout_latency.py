@@ -0,0 +1,117 @@
+"""
+Latency of the per-friend / per-member fan-out against the Firestore emulator.
+
+Seeds a user with N friends who are also the members of one group, then times
+/api/friends/progress and /api/groups/{id}/progress (with task lists, one
+query per friend or member) at each FANOUT_CONCURRENCY cap. A cap of 1 is
+the old one-query-at-a-time behaviour. --rtt-ms holds each Firestore call's
+executor thread a little longer to stand in for the network distance to a
+real project, which the local emulator doesn't have.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/fanout_latency.py --sizes 5,50,500
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+
+from common import stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+TASKS_PER_MEMBER = 6
+
+
+def seed_circle(size: int):
+    """User fanout-{size}-0 with `size` friends, all in group fanout-{size}; returns (user id, group id)"""
+    db = main.db
+    writer = db.bulk_writer()
+    now = datetime.now(timezone.utc)
+    today = main.get_today_date()
+    group_id = f"fanout-{size}"
+    group_ref = db.collection("groups").document(group_id)
+    user_ids = [f"fanout-{size}-{i}" for i in range(size + 1)]
+    owner = user_ids[0]
+    for i, uid in enumerate(user_ids):
+        writer.set(db.collection("users").document(uid), {"email": f"{uid}@bench.local", "display_name": uid, "username": None, "created_at": now})
+        role = "host" if i == 0 else "member"
+        writer.set(group_ref.collection("members").document(uid), {"user_id": uid, "role": role, "joined_at": now})
+        writer.set(main.get_user_memberships_collection(uid).document(group_id), {"group_id": group_id, "role": role, "joined_at": now})
+        if i:
+            writer.set(main.get_friendship_ref(owner, uid), {"user_id": owner, "friend_id": uid, "created_at": now})
+        for t in range(TASKS_PER_MEMBER):
+            writer.set(main.get_user_tasks_collection(uid, today).document(f"task-{t}"), {
+                "title": f"Task {t}",
+                "completed": t % 2 == 0,
+                "priority": "medium",
+                "created_at": now,
+                "user_id": uid,
+                "group_id": group_id if t % 2 else None,
+            })
+    writer.set(group_ref, {
+        "name": group_id,
+        "host_id": owner,
+        "invite_code": f"F{size:05d}",
+        "is_private": False,
+        "member_count": len(user_ids),
+        "member_ids": user_ids,
+        "created_at": now,
+    })
+    writer.close()
+    return owner, group_id
+
+
+def add_rtt(rtt_ms: float):
+    """Hold every Firestore call's thread for an extra rtt_ms, like a round trip to a remote project"""
+    original = main.run_db
+
+    async def delayed_run_db(fn, *args, **kwargs):
+        if fn is main.auth.verify_id_token:
+            return await original(fn, *args, **kwargs)
+
+        def call(*call_args, **call_kwargs):
+            time.sleep(rtt_ms / 1000)
+            return fn(*call_args, **call_kwargs)
+        return await original(call, *args, **kwargs)
+
+    main.run_db = delayed_run_db
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5,50,500", help="comma-separated friend/member counts")
+    parser.add_argument("--caps", default=f"1,{main.FANOUT_CONCURRENCY},50", help="comma-separated FANOUT_CONCURRENCY values")
+    parser.add_argument("--repeat", type=int, default=5, help="requests per measurement (median is reported)")
+    parser.add_argument("--rtt-ms", type=float, default=10.0, help="simulated network latency per Firestore call")
+    args = parser.parse_args()
+
+    stub_auth(main)
+    if args.rtt_ms:
+        add_rtt(args.rtt_ms)
+    client = TestClient(main.app)
+    caps = [int(c) for c in args.caps.split(",")]
+
+    print(f"{'members':>8} {'cap':>5} {'friends.progress ms':>20} {'group.progress ms':>18}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        owner, group_id = seed_circle(size)
+        headers = {"Authorization": f"Bearer {owner}"}
+        for cap in caps:
+            main.FANOUT_CONCURRENCY = cap
+            timings = {}
+            for path in ("/api/friends/progress?include_tasks=true", f"/api/groups/{group_id}/progress?include_tasks=true"):
+                samples = []
+                for _ in range(args.repeat):
+                    began = time.perf_counter()
+                    response = client.get(path, headers=headers)
+                    samples.append((time.perf_counter() - began) * 1000)
+                    response.raise_for_status()
+                timings[path] = statistics.median(samples)
+            friends_ms, group_ms = timings.values()
+            print(f"{size:>8} {cap:>5} {friends_ms:>20.1f} {group_ms:>18.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
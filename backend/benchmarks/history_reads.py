@@ -0,0 +1,57 @@
+"""
+Read-budget check for /api/history against the Firestore emulator.
+
+Seeds one user with a year of daily rollups at several task volumes, then
+requests the full 365-day range and counts the documents the endpoint reads.
+The count should stay flat no matter how many tasks each day holds.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/history_reads.py
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import count_reads, stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+
+def seed_year(user_id: str, tasks_per_day: int):
+    today = datetime.now(timezone.utc).date()
+    batch = main.db.batch()
+    for offset in range(365):
+        date = (today - timedelta(days=offset)).isoformat()
+        main.record_progress(batch, user_id, date, None, total=tasks_per_day, completed=tasks_per_day - offset % 3)
+        if len(batch) >= 400:
+            batch.commit()
+            batch = main.db.batch()
+    batch.commit()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumes", default="3,30,300", help="comma-separated tasks per day to test")
+    args = parser.parse_args()
+
+    stub_auth(main)
+    counter = count_reads(main)
+    client = TestClient(main.app)
+    start = (datetime.now(timezone.utc).date() - timedelta(days=364)).isoformat()
+
+    print(f"{'tasks/day':>10} {'doc reads':>10} {'round trips':>12} {'latency ms':>11}")
+    for volume in (int(v) for v in args.volumes.split(",")):
+        user_id = f"history-bench-{volume}"
+        seed_year(user_id, volume)
+        counter.update(documents=0, round_trips=0)
+        began = time.perf_counter()
+        response = client.get("/api/history", params={"start": start, "limit": 100}, headers={"Authorization": f"Bearer {user_id}"})
+        elapsed = (time.perf_counter() - began) * 1000
+        response.raise_for_status()
+        print(f"{volume:>10} {counter['documents']:>10} {counter['round_trips']:>12} {elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,107 @@
+"""
+Concurrency load test for the backend API against the Firestore emulator.
+
+Runs the FastAPI app in-process with auth stubbed out, seeds a handful of
+users with tasks, then hammers a read-heavy endpoint with concurrent clients
+and reports latency percentiles.
+
+    firebase emulators:start --only firestore
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/load_test.py
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/load_test.py --inline
+
+--inline runs every Firestore call directly on the event loop, which is how
+the handlers behaved before the bounded executor was introduced.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from common import percentile, stub_auth, use_emulator
+
+use_emulator()
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+
+
+def seed(users: int, tasks_per_user: int):
+    today = main.get_today_date()
+    user_ids = [f"bench-user-{i}" for i in range(users)]
+    batch = main.db.batch()
+    pending = 0
+    for i, uid in enumerate(user_ids):
+        batch.set(main.db.collection("users").document(uid), {
+            "email": f"{uid}@bench.local",
+            "display_name": uid,
+            "username": None,
+        })
+        friend_id = user_ids[(i + 1) % users]
+        batch.set(main.get_friendship_ref(uid, friend_id), {"user_id": uid, "friend_id": friend_id})
+        batch.set(main.get_friendship_ref(friend_id, uid), {"user_id": friend_id, "friend_id": uid})
+        for t in range(tasks_per_user):
+            batch.set(main.get_user_tasks_collection(uid, today).document(f"task-{t}"), {
+                "title": f"task {t}",
+                "completed": t % 2 == 0,
+                "user_id": uid,
+                "priority": "medium",
+            })
+        pending += 3 + tasks_per_user
+        if pending >= 400:
+            batch.commit()
+            batch = main.db.batch()
+            pending = 0
+    batch.commit()
+    return user_ids
+
+
+async def run(args, user_ids):
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(n):
+            nonlocal errors
+            for i in range(args.requests):
+                uid = user_ids[(n + i) % len(user_ids)]
+                start = time.perf_counter()
+                response = await client.get(args.path, headers={"Authorization": f"Bearer {uid}"})
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+
+        wall = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        wall = time.perf_counter() - wall
+
+    return latencies, errors, wall
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/friends/progress")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--inline", action="store_true", help="run Firestore calls on the event loop (pre-executor behaviour)")
+    args = parser.parse_args()
+
+    if args.inline:
+        async def run_inline(fn, *a, **kw):
+            return fn(*a, **kw)
+        main.run_db = run_inline
+
+    user_ids = seed(args.users, args.tasks)
+    stub_auth(main, set(user_ids))
+
+    latencies, errors, wall = asyncio.run(run(args, user_ids))
+    mode = "inline" if args.inline else f"executor ({main.DB_MAX_WORKERS} workers)"
+    print(f"{args.path} | {mode} | concurrency={args.concurrency}")
+    print(f"  requests: {len(latencies)}  errors: {errors}  throughput: {len(latencies) / wall:.1f} req/s")
+    print(f"  p50: {percentile(latencies, 50):.1f} ms  p99: {percentile(latencies, 99):.1f} ms  mean: {statistics.mean(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+"""
+Response size and serialization time for the progress endpoints, against the Firestore emulator.
+
+Seeds a user with N friends who share one group (the fan-out benchmark's data),
+then for /api/friends/progress and /api/groups/{id}/progress reports the bytes on
+the wire for the full payload, a fields= projection and include_tasks=false. For
+each full payload it also times FastAPI's old encoding path (jsonable_encoder then
+json.dumps) against OrjsonResponse, on the handler's actual return value.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/payload_size.py --sizes 50,500
+"""
+import argparse
+import json
+import statistics
+import time
+
+from common import stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+from fanout_latency import seed_circle  # noqa: E402
+
+VARIANTS = [("full", {"include_tasks": "true"}), ("fields=title,completed", {"include_tasks": "true", "fields": "title,completed"}), ("include_tasks=false", {"include_tasks": "false"})]
+
+
+def time_ms(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def capture_results():
+    """Keep each handler's return value (before it becomes a response) for the encoding comparison"""
+    captured = {}
+    original = main.OrjsonResponse
+
+    class CapturingResponse(original):
+        def render(self, content):
+            captured["content"] = content
+            return super().render(content)
+
+    main.OrjsonResponse = CapturingResponse
+    return captured
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500", help="comma-separated friend/member counts")
+    parser.add_argument("--repeat", type=int, default=20, help="encodings per timing (median is reported)")
+    args = parser.parse_args()
+
+    stub_auth(main)
+    captured = capture_results()
+    client = TestClient(main.app)
+
+    print(f"{'members':>8} {'endpoint':<16} {'variant':<24} {'bytes':>10} {'jsonable+json ms':>17} {'orjson ms':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        owner, group_id = seed_circle(size)
+        headers = {"Authorization": f"Bearer {owner}"}
+        for label, path in (("friends.progress", "/api/friends/progress"), ("group.progress", f"/api/groups/{group_id}/progress")):
+            for variant, params in VARIANTS:
+                response = client.get(path, params=params, headers=headers)
+                response.raise_for_status()
+                timings = ""
+                if variant == "full":
+                    content = captured["content"]
+                    before = time_ms(lambda: json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode(), args.repeat)
+                    after = time_ms(lambda: main.OrjsonResponse(content), args.repeat)
+                    timings = f"{before:>17.2f} {after:>10.2f}"
+                print(f"{size:>8} {label:<16} {variant:<24} {len(response.content):>10} {timings}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,76 @@
+"""
+Typeahead check for /api/users/search against the Firestore emulator.
+
+Seeds --users profiles with generated names, then types a few queries one
+keystroke at a time (the way the friend search box calls the API) and
+reports latency and billed reads per keystroke. Substring and mixed-case
+queries are included; every keystroke should stay a single bounded query,
+and narrowing a query whose shorter form was complete should cost nothing.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/search_typeahead.py --users 5000
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone
+
+from common import count_reads, stub_auth, use_emulator
+
+use_emulator()
+
+from fastapi.testclient import TestClient  # noqa: E402
+import main  # noqa: E402
+
+FIRST = ["Ada", "Grace", "Alan", "Linus", "Margaret", "Ken", "Barbara", "Dennis", "Radia", "Edsger"]
+LAST = ["Lovelace", "Hopper", "Turing", "Torvalds", "Hamilton", "Thompson", "Liskov", "Ritchie", "Perlman", "Dijkstra"]
+QUERIES = ["ada", "LOVE", "velace", "hopper.4", "grace hop", "search-99", "zzz"]
+
+
+def seed_users(count: int):
+    writer = main.db.bulk_writer()
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        first, last = FIRST[i % len(FIRST)], LAST[(i // len(FIRST)) % len(LAST)]
+        uid = f"search-{i}"
+        email = f"{first.lower()}.{last.lower()}.{i}@bench.local"
+        username = f"{last.lower()}{i}"
+        display_name = f"{first} {last}"
+        writer.set(main.db.collection("users").document(uid), {
+            "email": email,
+            "username": username,
+            "display_name": display_name,
+            "created_at": now,
+        })
+        writer.set(main.get_user_search_ref(uid), main.user_search_entry(email, username, display_name))
+    writer.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    seed_users(args.users)
+    stub_auth(main)
+    counter = count_reads(main)
+    client = TestClient(main.app)
+    headers = {"Authorization": "Bearer search-0"}
+    client.get("/api/user/profile", headers=headers)
+
+    latencies = []
+    print(f"{'query':<12} {'results':>8} {'doc reads':>10} {'latency ms':>11}")
+    for query in QUERIES:
+        for end in range(1, len(query) + 1):
+            typed = query[:end]
+            counter.update(documents=0, round_trips=0)
+            began = time.perf_counter()
+            response = client.get("/api/users/search", params={"query": typed}, headers=headers)
+            elapsed = (time.perf_counter() - began) * 1000
+            response.raise_for_status()
+            latencies.append(elapsed)
+            print(f"{typed:<12} {len(response.json()['users']):>8} {counter['documents']:>10} {elapsed:>11.1f}")
+    print(f"per keystroke: median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,214 @@
+"""
+Seed the Firestore emulator with a synthetic, deterministic dataset.
+
+Every ID is derived from an index, so the suite can pick valid friends,
+groups, tasks and notes for any user without reading anything back, and
+reseeding the same scale overwrites the same documents.
+
+Layout for --users N, --groups G, --group-size S, --friends F:
+  users/bench-user-{i}          friends with the F users around i (F/2 each side)
+  groups/bench-group-{j}        members bench-user-{j*S} .. {j*S+S-1}, the first is host
+  friend_requests/bench-req-{i} pending, from the user F/2+1 places after i
+  today's tasks, rollups and 60 days of history for every user
+  messages and group tasks for every group, notes from a friend for every user
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/seed.py --users 10000 --groups 1000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import use_emulator
+
+use_emulator()
+
+import main  # noqa: E402
+
+
+class Dataset:
+    """Deterministic layout of the seeded data; shared with the suite"""
+
+    def __init__(self, users=1000, groups=100, group_size=10, friends=10, tasks=10, messages=50, notes=5, group_tasks=5):
+        self.users = users
+        self.groups = min(groups, max(1, users // group_size))
+        self.group_size = group_size
+        self.friends = friends - friends % 2
+        self.tasks = tasks
+        self.messages = messages
+        self.notes = notes
+        self.group_tasks = group_tasks
+
+    @staticmethod
+    def user_id(i):
+        return f"bench-user-{i}"
+
+    @staticmethod
+    def group_id(j):
+        return f"bench-group-{j}"
+
+    @staticmethod
+    def invite_code(j):
+        return f"B{j:05d}"
+
+    def friends_of(self, i):
+        half = self.friends // 2
+        return [(i + offset) % self.users for offset in range(-half, half + 1) if offset]
+
+    def group_of(self, i):
+        """The one group user i belongs to, or None"""
+        j = i // self.group_size
+        return j if j < self.groups else None
+
+    def members_of(self, j):
+        return [j * self.group_size + k for k in range(self.group_size)]
+
+    def host_of(self, j):
+        return j * self.group_size
+
+    def requester_of(self, i):
+        return (i + self.friends // 2 + 1) % self.users
+
+    def config(self):
+        return dict(vars(self))
+
+
+def task_is_done(i, t):
+    return (i + t) % 3 != 0
+
+
+def seed(data: Dataset):
+    db = main.db
+    writer = db.bulk_writer()
+    now = datetime.now(timezone.utc)
+    today = main.get_today_date()
+    history_days = [(now.date() - timedelta(days=offset)) for offset in range(1, 61)]
+
+    for i in range(data.users):
+        uid = data.user_id(i)
+        writer.set(db.collection("users").document(uid), {
+            "email": f"{uid}@bench.local",
+            "display_name": f"Bench User {i}",
+            "username": f"bench{i}",
+            "created_at": now,
+            "updated_at": now,
+        })
+        writer.set(main.get_user_search_ref(uid), main.user_search_entry(f"{uid}@bench.local", f"bench{i}", f"Bench User {i}"))
+        for friend in data.friends_of(i):
+            friend_id = data.user_id(friend)
+            writer.set(main.get_friendship_ref(uid, friend_id), {"user_id": uid, "friend_id": friend_id, "created_at": now})
+        writer.set(db.collection("friend_requests").document(f"bench-req-{i}"), {
+            "from_user_id": data.user_id(data.requester_of(i)),
+            "to_user_id": uid,
+            "status": "pending",
+            "created_at": now,
+        })
+
+        # Today's tasks and the matching rollup, written as absolute values so reseeding is idempotent
+        group = data.group_of(i)
+        group_id = data.group_id(group) if group is not None else None
+        total = completed = group_total = group_completed = 0
+        for t in range(data.tasks):
+            in_group = group_id is not None and t % 3 == 0
+            done = task_is_done(i, t)
+            writer.set(main.get_user_tasks_collection(uid, today).document(f"task-{t}"), {
+                "title": f"Task {t}",
+                "description": None,
+                "priority": ("low", "medium", "high")[t % 3],
+                "completed": done,
+                "created_at": now - timedelta(minutes=data.tasks - t),
+                "user_id": uid,
+                "group_id": group_id if in_group else None,
+            })
+            total += 1
+            completed += done
+            if in_group:
+                group_total += 1
+                group_completed += done
+        summary = {"date": today, "total_tasks": total, "completed_tasks": completed}
+        if group_id:
+            summary["groups"] = {group_id: {"total_tasks": group_total, "completed_tasks": group_completed}}
+        writer.set(main.get_daily_summary_ref(uid, today), summary)
+
+        months = {}
+        for day in history_days + [now.date()]:
+            day_total = data.tasks if day != now.date() else total
+            day_done = day_total - (i + day.toordinal()) % 4 if day != now.date() else completed
+            months.setdefault(day.strftime("%Y-%m"), {})[day.strftime("%d")] = {"total_tasks": day_total, "completed_tasks": day_done}
+        for month, days in months.items():
+            writer.set(main.get_history_month_ref(uid, month), {"month": month, "days": days})
+
+        for k in range(data.notes):
+            writer.set(db.collection("motivational_notes").document(f"bench-note-{i}-{k}"), {
+                "from_user_id": data.user_id(data.friends_of(i)[0]) if data.friends else uid,
+                "to_user_id": uid,
+                "message": f"Keep going #{k}",
+                "group_id": None,
+                "read": False,
+                "created_at": now - timedelta(hours=k),
+            })
+
+    for j in range(data.groups):
+        gid = data.group_id(j)
+        group_ref = db.collection("groups").document(gid)
+        members = [data.user_id(i) for i in data.members_of(j)]
+        writer.set(group_ref, {
+            "name": f"Bench Group {j}",
+            "description": None,
+            "host_id": members[0],
+            "invite_code": data.invite_code(j),
+            "is_private": False,
+            "member_count": len(members),
+            "member_ids": members,
+            "created_at": now,
+        })
+        for position, uid in enumerate(members):
+            role = "host" if position == 0 else "member"
+            writer.set(group_ref.collection("members").document(uid), {"user_id": uid, "role": role, "joined_at": now})
+            writer.set(main.get_user_memberships_collection(uid).document(gid), {"group_id": gid, "role": role, "joined_at": now})
+        for k in range(data.group_tasks):
+            writer.set(group_ref.collection("tasks").document(f"gtask-{k}"), {
+                "title": f"Group task {k}",
+                "description": None,
+                "priority": "medium",
+                "created_by": members[0],
+                "group_id": gid,
+                "created_at": now - timedelta(hours=data.group_tasks - k),
+            })
+        for k in range(data.messages):
+            writer.set(group_ref.collection("messages").document(f"bench-msg-{k}"), {
+                "user_id": members[k % len(members)],
+                "message": f"Message {k}",
+                "group_id": gid,
+                "created_at": now - timedelta(minutes=data.messages - k),
+            })
+
+    writer.close()
+
+
+def add_dataset_arguments(parser):
+    defaults = Dataset()
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--groups", type=int, default=defaults.groups)
+    parser.add_argument("--group-size", type=int, default=defaults.group_size)
+    parser.add_argument("--friends", type=int, default=defaults.friends, help="friends per user (even)")
+    parser.add_argument("--tasks", type=int, default=defaults.tasks, help="tasks per user today")
+    parser.add_argument("--messages", type=int, default=defaults.messages, help="messages per group")
+    parser.add_argument("--notes", type=int, default=defaults.notes, help="notes per user")
+    parser.add_argument("--group-tasks", type=int, default=defaults.group_tasks, help="tasks per group")
+
+
+def dataset_from_args(args):
+    return Dataset(args.users, args.groups, args.group_size, args.friends, args.tasks, args.messages, args.notes, args.group_tasks)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_dataset_arguments(parser)
+    data = dataset_from_args(parser.parse_args())
+    began = time.perf_counter()
+    seed(data)
+    print(f"seeded {data.config()} in {time.perf_counter() - began:.1f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
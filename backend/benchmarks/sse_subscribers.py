@@ -0,0 +1,120 @@
+"""
+Fan-out harness for the /api/stream event hub.
+
+Connects hundreds of simulated subscribers to the in-process hub through the
+same sse_events generator the endpoint streams, wires them up as friends
+(each user follows the next --friends users) and groups of --group-size, then
+publishes task completions, notes and group messages and reports delivery
+latency, fan-out and drops. A --slow fraction of subscribers never reads, to
+show a stalled client only loses its own oldest events.
+
+    python benchmarks/sse_subscribers.py --subscribers 500 --events 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from common import percentile, use_emulator
+
+# The hub never touches Firestore; the emulator setup just lets main import without credentials
+use_emulator(required=False)
+
+import main  # noqa: E402
+
+
+class SimulatedClient:
+    """Stands in for the Starlette request sse_events polls for disconnects"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def is_disconnected(self):
+        return self.closed
+
+
+def topics_for(index, users, friends, group_size):
+    user_id = f"user-{index}"
+    topics = [f"user:{user_id}", f"progress:{user_id}", f"group:group-{index // group_size}"]
+    topics += [f"progress:user-{(index + offset) % users}" for offset in range(1, friends + 1)]
+    return topics
+
+
+async def consume(client, subscription, latencies):
+    async for chunk in main.sse_events(client, subscription):
+        for line in chunk.splitlines():
+            if line.startswith("data: "):
+                latencies.append(time.perf_counter() - json.loads(line[6:])["sent_at"])
+
+
+async def run(args):
+    main.events = hub = main.EventHub(args.queue_size)
+    rng = random.Random(7)
+    clients, subscriptions, readers, tasks = [], [], [], []
+    latencies = []
+    for index in range(args.subscribers):
+        subscription = hub.subscribe(topics_for(index, args.subscribers, args.friends, args.group_size))
+        subscriptions.append(subscription)
+        if rng.random() < args.slow:
+            continue  # connected but never reads
+        client = SimulatedClient()
+        clients.append(client)
+        readers.append(subscription)
+        tasks.append(asyncio.create_task(consume(client, subscription, latencies)))
+    await asyncio.sleep(0)
+
+    expected = 0
+    began = time.perf_counter()
+    for n in range(args.events):
+        index = rng.randrange(args.subscribers)
+        user_id = f"user-{index}"
+        kind = rng.random()
+        if kind < 0.8:
+            topics = [f"progress:{user_id}", f"group:group-{index // args.group_size}"]
+            expected += hub.publish(topics, "task_updated", {"user_id": user_id, "task_id": f"t{n}", "completed": True, "sent_at": time.perf_counter()})
+        elif kind < 0.9:
+            to_user = f"user-{(index + 1) % args.subscribers}"
+            expected += hub.publish([f"user:{to_user}"], "motivational_note", {"note": {"from_user_id": user_id, "message": "keep going"}, "sent_at": time.perf_counter()})
+        else:
+            topics = [f"group:group-{index // args.group_size}"]
+            expected += hub.publish(topics, "group_message", {"group_message": {"user_id": user_id, "message": "hi"}, "sent_at": time.perf_counter()})
+        if n % args.burst == 0:
+            await asyncio.sleep(0)
+
+    # Wait for readers to drain whatever survived their queues
+    deadline = time.perf_counter() + 10
+    while time.perf_counter() < deadline and any(s.queue.qsize() for s in readers):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - began
+
+    for client in clients:
+        client.closed = True
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    dropped = sum(s.dropped for s in subscriptions)
+    stranded = sum(s.queue.qsize() for s in subscriptions)
+    print(f"subscribers: {args.subscribers} ({args.subscribers - len(tasks)} stalled), events published: {args.events}")
+    print(f"deliveries: {expected} expected, {len(latencies)} received, {stranded} queued on stalled clients, {dropped} dropped")
+    print(f"fan-out: {expected / args.events:.1f} subscribers/event, {len(latencies) / elapsed:,.0f} deliveries/s")
+    if latencies:
+        print(f"delivery latency: p50 {percentile(latencies, 50) * 1000:.2f} ms  p99 {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"hub after readers disconnect: {hub.stats()}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--friends", type=int, default=10, help="friends each subscriber follows")
+    parser.add_argument("--group-size", type=int, default=25)
+    parser.add_argument("--queue-size", type=int, default=main.EVENT_QUEUE_SIZE)
+    parser.add_argument("--burst", type=int, default=10, help="events published between yields to the loop")
+    parser.add_argument("--slow", type=float, default=0.05, help="fraction of subscribers that never read")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,252 @@
+"""
+Endpoint benchmark suite for the backend API against the Firestore emulator.
+
+Drives every REST endpoint with concurrent in-process clients (auth stubbed,
+"Bearer <uid>") over a dataset laid out by seed.py, and reports throughput,
+latency percentiles and billed Firestore reads / round trips per request.
+Results can be saved as JSON and compared against a previous run, so a
+change that slows a hot endpoint or adds reads to it shows up as a
+regression.
+
+    firebase emulators:start --only firestore
+    export FIRESTORE_EMULATOR_HOST=localhost:8080
+    python benchmarks/seed.py --users 10000 --groups 1000
+    python benchmarks/suite.py --users 10000 --groups 1000 --save before.json
+    ...change something...
+    python benchmarks/suite.py --users 10000 --groups 1000 --compare before.json
+
+Scenarios run reads first, then writes, then the ones that remove data.
+Mutating scenarios assume a freshly seeded dataset; reseed (or restart the
+emulator) before comparing runs that include them. /api/stream is covered
+by sse_subscribers.py.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from common import count_reads, percentile, request_tally, stub_auth, use_emulator
+
+use_emulator()
+
+import httpx  # noqa: E402
+import main  # noqa: E402
+from seed import add_dataset_arguments, dataset_from_args, seed  # noqa: E402
+
+
+class Scenario:
+    """One endpoint call; build(data, n) returns (user index, path, json body) for request n"""
+
+    def __init__(self, name, method, build, kind="read"):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.kind = kind
+
+
+def user(data, n):
+    return n % data.users
+
+
+def member(data, n):
+    """A (user index, group index) pair where the user is a member of the group"""
+    j = n % data.groups
+    return data.members_of(j)[(n // data.groups) % data.group_size], j
+
+
+def host(data, n):
+    j = n % data.groups
+    return data.host_of(j), j
+
+
+def guest(data, n):
+    """A non-host member, for leaving"""
+    j = n % data.groups
+    return data.members_of(j)[1 + (n // data.groups) % (data.group_size - 1)], j
+
+
+def friend(data, i):
+    return data.user_id(data.friends_of(i)[0])
+
+
+def keep_task(data, n):
+    return f"task-{(n // data.users) % max(1, data.tasks // 2)}"
+
+
+def group_scenario(name, method, suffix, body=None, pick=member, kind="read"):
+    def build(data, n):
+        i, j = pick(data, n)
+        return i, f"/api/groups/{data.group_id(j)}{suffix}", body(data, n) if body else None
+    return Scenario(name, method, build, kind)
+
+
+SCENARIOS = [
+    # Reads
+    Scenario("user.profile", "GET", lambda d, n: (user(d, n), "/api/user/profile", None)),
+    Scenario("users.search", "GET", lambda d, n: (user(d, n), f"/api/users/search?query=bench{(n * 7) % d.users}", None)),
+    Scenario("friends.list", "GET", lambda d, n: (user(d, n), "/api/friends", None)),
+    Scenario("friends.requests", "GET", lambda d, n: (user(d, n), "/api/friends/requests", None)),
+    Scenario("friends.progress", "GET", lambda d, n: (user(d, n), "/api/friends/progress?include_tasks=true", None)),
+    Scenario("friends.progress.stats", "GET", lambda d, n: (user(d, n), "/api/friends/progress?include_tasks=false", None)),
+    Scenario("tasks.today", "GET", lambda d, n: (user(d, n), "/api/tasks/today", None)),
+    Scenario("tasks.friend", "GET", lambda d, n: (user(d, n), f"/api/tasks/friend/{friend(d, user(d, n))}", None)),
+    Scenario("groups.list", "GET", lambda d, n: (member(d, n)[0], "/api/groups", None)),
+    group_scenario("group.details", "GET", ""),
+    group_scenario("group.members", "GET", "/members"),
+    group_scenario("group.tasks", "GET", "/tasks"),
+    group_scenario("group.progress", "GET", "/progress?include_tasks=true"),
+    group_scenario("group.progress.stats", "GET", "/progress?include_tasks=false"),
+    group_scenario("group.messages", "GET", "/messages?limit=50"),
+    Scenario("notes.list", "GET", lambda d, n: (user(d, n), "/api/motivational-notes", None)),
+    Scenario("dashboard", "GET", lambda d, n: (user(d, n), "/api/dashboard", None)),
+    Scenario("history", "GET", lambda d, n: (user(d, n), "/api/history", None)),
+    Scenario("history.friend", "GET", lambda d, n: (user(d, n), f"/api/history/friend/{friend(d, user(d, n))}", None)),
+    # Writes
+    Scenario("users.setup", "POST", lambda d, n: (user(d, n), "/api/users/setup", {"display_name": f"Bench User {user(d, n)}"}), "write"),
+    Scenario("tasks.create", "POST", lambda d, n: (user(d, n), "/api/tasks", {"title": f"Bench task {n}"}), "write"),
+    Scenario("tasks.update", "PUT", lambda d, n: (user(d, n), f"/api/tasks/{keep_task(d, n)}", {"completed": n % 2 == 0}), "write"),
+    Scenario("tasks.batch", "POST", lambda d, n: (user(d, n), "/api/tasks/batch", {"operations": (
+        [{"op": "create", "title": f"Batch task {n}.{k}"} for k in range(10)]
+        + [{"op": "update", "task_id": f"task-{t}", "completed": (n + t) % 2 == 0} for t in range(max(1, d.tasks // 2))]
+    )}), "write"),
+    Scenario("notes.send", "POST", lambda d, n: (user(d, n), "/api/motivational-notes", {"to_user_id": friend(d, user(d, n)), "message": f"Go! {n}"}), "write"),
+    Scenario("notes.read", "PUT", lambda d, n: (user(d, n), f"/api/motivational-notes/bench-note-{user(d, n)}-{(n // d.users) % max(1, d.notes)}/read", None), "write"),
+    group_scenario("group.message.send", "POST", "/messages", lambda d, n: {"message": f"Hello {n}"}, kind="write"),
+    group_scenario("group.task.create", "POST", "/tasks", lambda d, n: {"title": f"Group task {n}"}, pick=host, kind="write"),
+    Scenario("group.task.update", "PUT", lambda d, n: (host(d, n)[0], f"/api/groups/{d.group_id(host(d, n)[1])}/tasks/gtask-{(n // d.groups) % max(1, d.group_tasks)}", {"title": f"Renamed {n}"}), "write"),
+    Scenario("groups.create", "POST", lambda d, n: (user(d, n), "/api/groups", {"name": f"Bench new group {n}"}), "write"),
+    Scenario("groups.join", "POST", lambda d, n: (member(d, n)[0], "/api/groups/join", {"invite_code": d.invite_code((member(d, n)[1] + 1 + n // (d.groups * d.group_size)) % d.groups)}), "write"),
+    Scenario("friends.request", "POST", lambda d, n: (user(d, n), "/api/friends/request", {"user_email": f"{d.user_id((user(d, n) + d.friends // 2 + 2 + n // d.users) % d.users)}@bench.local"}), "write"),
+    # Removals
+    Scenario("friends.respond", "POST", lambda d, n: (user(d, n), f"/api/friends/requests/bench-req-{user(d, n)}/respond", {"accept": n % 2 == 0}), "remove"),
+    Scenario("tasks.delete", "DELETE", lambda d, n: (user(d, n), f"/api/tasks/task-{d.tasks // 2 + (n // d.users) % max(1, d.tasks - d.tasks // 2)}", None), "remove"),
+    Scenario("group.task.delete", "DELETE", lambda d, n: (host(d, n)[0], f"/api/groups/{d.group_id(host(d, n)[1])}/tasks/gtask-{(n // d.groups) % max(1, d.group_tasks)}", None), "remove"),
+    group_scenario("groups.leave", "POST", "/leave", pick=guest, kind="remove"),
+    Scenario("friends.remove", "DELETE", lambda d, n: (user(d, n), f"/api/friends/{friend(d, user(d, n))}", None), "remove"),
+]
+
+
+async def run_scenario(client, scenario, data, concurrency, requests):
+    latencies, reads, trips = [], [], []
+    errors = 0
+
+    async def worker(w):
+        nonlocal errors
+        for r in range(requests):
+            i, path, body = scenario.build(data, w * requests + r)
+            tally = request_tally()
+            start = time.perf_counter()
+            response = await client.request(scenario.method, path, json=body, headers={"Authorization": f"Bearer {data.user_id(i)}"})
+            latencies.append((time.perf_counter() - start) * 1000)
+            reads.append(tally["documents"])
+            trips.append(tally["round_trips"])
+            if response.status_code >= 400:
+                errors += 1
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(worker(w)) for w in range(concurrency)))
+    wall = time.perf_counter() - wall
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "reads_per_request": statistics.mean(reads),
+        "round_trips_per_request": statistics.mean(trips),
+    }
+
+
+async def run(args, data, scenarios):
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # Warm the token cache so auth doesn't skew the first scenario
+        await asyncio.gather(*(client.get("/api/user/profile", headers={"Authorization": f"Bearer {data.user_id(i)}"}) for i in range(min(data.users, args.concurrency * args.requests))))
+        for scenario in scenarios:
+            results[scenario.name] = stats = await run_scenario(client, scenario, data, args.concurrency, args.requests)
+            print(f"{scenario.name:<24} {stats['requests']:>5} {stats['errors']:>4} {stats['throughput']:>8.1f} "
+                  f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                  f"{stats['reads_per_request']:>8.1f} {stats['round_trips_per_request']:>6.1f}", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print per-scenario changes against a saved run; returns the scenarios that regressed"""
+    regressions = []
+    print(f"\nvs {baseline.get('commit', '?')[:10]} ({baseline.get('timestamp', '?')})")
+    print(f"{'scenario':<24} {'p50 ms':>16} {'reads/req':>16}")
+    for name, stats in results.items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        latency = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        reads = stats["reads_per_request"] - before["reads_per_request"]
+        flag = ""
+        if reads > 0.5 or latency > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<24} {before['p50_ms']:>7.1f} {latency:>+7.0f}% {before['reads_per_request']:>8.1f} {reads:>+7.1f}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_dataset_arguments(parser)
+    parser.add_argument("--seed", action="store_true", help="seed the dataset before running")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client per scenario")
+    parser.add_argument("--only", help="comma-separated scenario name prefixes to run")
+    parser.add_argument("--reads-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="p50 slowdown (percent) reported as a regression")
+    args = parser.parse_args()
+
+    data = dataset_from_args(args)
+    if args.seed:
+        seed(data)
+    stub_auth(main)
+    count_reads(main)
+
+    scenarios = [s for s in SCENARIOS if not (args.reads_only and s.kind != "read")]
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        scenarios = [s for s in scenarios if s.name.startswith(prefixes)]
+
+    print(f"dataset {data.config()} | concurrency={args.concurrency} x {args.requests} requests | {main.DB_MAX_WORKERS} db workers")
+    print(f"{'scenario':<24} {'reqs':>5} {'errs':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'reads':>8} {'trips':>6}")
+    results = asyncio.run(run(args, data, scenarios))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "dataset": data.config(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main_cli()
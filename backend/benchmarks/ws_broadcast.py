@@ -0,0 +1,149 @@
+"""
+Broadcast latency for the /ws/groups/{id} chat sockets, against the Firestore emulator.
+
+Seeds one group with --sockets members and connects one simulated WebSocket per
+member straight to the ASGI app (no network or client library: each socket is a
+pair of in-memory ASGI channels). --senders of them then post --messages chat
+messages, and every socket timestamps each frame it receives. Reports connect
+time, end-to-end latency (send frame to delivery, including the Firestore write)
+per delivery and per message (until the last socket has it), and how many
+sockets were closed for falling behind. A --slow fraction of sockets takes
+--slow-ms to accept each frame, like a client on a bad connection.
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/ws_broadcast.py --sockets 2000 --messages 400
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from common import percentile, stub_auth, use_emulator
+
+use_emulator()
+
+import main  # noqa: E402
+
+
+class SimulatedSocket:
+    """One client connection, driven through the app's ASGI websocket interface"""
+
+    def __init__(self, user_id: str, group_id: str, send_delay: float):
+        self.user_id = user_id
+        self.send_delay = send_delay
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.close_code = None
+        self.latencies = {}  # message text -> seconds from send to arrival here
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": f"/ws/groups/{group_id}",
+            "raw_path": f"/ws/groups/{group_id}".encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"bench.local"), (b"authorization", f"Bearer {user_id}".encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench.local", 80),
+            "subprotocols": [],
+        }
+        self.inbox.put_nowait({"type": "websocket.connect"})
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            self.accepted.set()
+        elif message["type"] == "websocket.send":
+            if self.send_delay:
+                await asyncio.sleep(self.send_delay)
+            frame = json.loads(message["text"])
+            if frame["type"] == "group_message":
+                text = frame["data"]["group_message"]["message"]
+                self.latencies[text] = time.perf_counter() - float(text.split("@")[1])
+
+    def post(self, text: str):
+        self.inbox.put_nowait({"type": "websocket.receive", "text": json.dumps({"message": text})})
+
+    def disconnect(self):
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+
+def seed_group(size: int):
+    """Group ws-{size} with members ws-{size}-0..size-1; returns (group id, member ids)"""
+    db = main.db
+    writer = db.bulk_writer()
+    now = datetime.now(timezone.utc)
+    group_id = f"ws-{size}"
+    group_ref = db.collection("groups").document(group_id)
+    user_ids = [f"ws-{size}-{i}" for i in range(size)]
+    for i, uid in enumerate(user_ids):
+        writer.set(db.collection("users").document(uid), {"email": f"{uid}@bench.local", "display_name": uid, "username": None, "created_at": now})
+        writer.set(group_ref.collection("members").document(uid), {"user_id": uid, "role": "host" if i == 0 else "member", "joined_at": now})
+    writer.set(group_ref, {"name": group_id, "host_id": user_ids[0], "invite_code": f"W{size:06d}"[:8], "is_private": False, "member_count": size, "member_ids": user_ids, "created_at": now})
+    writer.close()
+    return group_id, user_ids
+
+
+async def run(args):
+    group_id, user_ids = seed_group(args.sockets)
+    rng = random.Random(11)
+    sockets = [SimulatedSocket(uid, group_id, args.slow_ms / 1000 if rng.random() < args.slow else 0) for uid in user_ids]
+
+    began = time.perf_counter()
+    apps = [asyncio.create_task(main.app(s.scope, s.receive, s.send)) for s in sockets]
+    await asyncio.gather(*(s.accepted.wait() for s in sockets))
+    connect_seconds = time.perf_counter() - began
+    refused = sum(1 for s in sockets if s.close_code is not None)
+
+    senders = sockets[:args.senders]
+    texts = []
+    for n in range(args.messages):
+        text = f"m{n}@{time.perf_counter()!r}"
+        texts.append(text)
+        senders[n % len(senders)].post(text)
+        await asyncio.sleep(1 / args.rate)
+
+    # Give the last broadcasts time to land (or the slow sockets time to be cut off)
+    deadline = time.perf_counter() + 10
+    readers = [s for s in sockets if not s.send_delay]
+    while time.perf_counter() < deadline and any(len(s.latencies) < len(texts) for s in readers if s.close_code is None):
+        await asyncio.sleep(0.05)
+
+    for s in sockets:
+        s.disconnect()
+    await asyncio.gather(*apps, return_exceptions=True)
+
+    deliveries = [seconds for s in sockets for seconds in s.latencies.values()]
+    per_message = [max(s.latencies[text] for s in readers if text in s.latencies) for text in texts if any(text in s.latencies for s in readers)]
+    behind = sum(1 for s in sockets if s.close_code == main.WS_TRY_AGAIN_LATER)
+    print(f"sockets: {len(sockets)} ({sum(1 for s in sockets if s.send_delay)} slow), connected in {connect_seconds:.2f}s, {refused} refused")
+    print(f"messages: {len(texts)} from {len(senders)} senders at {args.rate}/s, deliveries: {len(deliveries)} of {len(texts) * len(sockets)}")
+    if deliveries:
+        print(f"delivery latency: p50 {percentile(deliveries, 50) * 1000:.1f} ms  p95 {percentile(deliveries, 95) * 1000:.1f} ms  p99 {percentile(deliveries, 99) * 1000:.1f} ms")
+    if per_message:
+        print(f"until every reading socket has a message: p50 {percentile(per_message, 50) * 1000:.1f} ms  max {max(per_message) * 1000:.1f} ms")
+    print(f"closed for falling behind: {behind}, hub after disconnect: {main.events.stats()}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--senders", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=50, help="messages per second")
+    parser.add_argument("--slow", type=float, default=0.01, help="fraction of sockets that accept frames slowly")
+    parser.add_argument("--slow-ms", type=float, default=100)
+    args = parser.parse_args()
+    stub_auth(main)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
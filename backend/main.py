@@ -1,13 +1,31 @@
-from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
-from datetime import datetime, timezone
+from google.api_core.exceptions import AlreadyExists, InvalidArgument, NotFound
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import asyncio
+import base64
+import contextvars
+import copy
+import functools
+import hashlib
+import json
+import logging
+import orjson
 import os
+import platform
 import random
+import secrets
 import string
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -34,7 +52,320 @@ if not firebase_admin._apps:
             pass
 
 db = firestore.client()
-app = FastAPI(title="Daily Check-In Task Tracker API - Multi-Partner & Groups", version="2.0.0")
+
+# The Firestore client is synchronous, so every call goes through a bounded
+# thread pool instead of blocking the event loop while a round-trip is in flight
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "32"))
+db_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="firestore")
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking Firestore (or other Firebase Admin) call on the bounded executor"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    result = None
+    committed = False
+    try:
+        result = await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+        committed = True
+        return result
+    finally:
+        transaction = args[0] if getattr(fn, "to_wrap", None) is not None else None
+        record_db_call(fn, result, time.perf_counter() - started, transaction, committed)
+
+def get_all_docs(refs):
+    """Fetch several documents in one round trip"""
+    return list(db.get_all(refs))
+
+# Independent reads in one request (one query per friend or member) run concurrently,
+# at most this many in flight per request so one large group can't take every executor thread
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "10"))
+# get_all streams documents back one RPC at a time, so large lookups are split and fanned out
+GET_ALL_CHUNK_SIZE = 100
+
+async def fan_out(fn, items, limit: Optional[int] = None):
+    """Await fn(item) for every item with at most limit in flight; results come back in item order"""
+    semaphore = asyncio.Semaphore(limit or FANOUT_CONCURRENCY)
+    
+    async def bounded(item):
+        async with semaphore:
+            return await fn(item)
+    
+    return await asyncio.gather(*(bounded(item) for item in items))
+
+async def get_docs(refs):
+    """Batch-get any number of documents, GET_ALL_CHUNK_SIZE per concurrent round trip (unordered)"""
+    chunks = [refs[i:i + GET_ALL_CHUNK_SIZE] for i in range(0, len(refs), GET_ALL_CHUNK_SIZE)]
+    results = await fan_out(lambda chunk: run_db(get_all_docs, chunk), chunks)
+    return [snap for chunk in results for snap in chunk]
+
+async def count_docs(query) -> int:
+    """Number of docs matching query, counted by Firestore instead of downloading them"""
+    result = await run_db(query.count(alias="total").get)
+    return int(result[0][0].value)
+
+# Observability: every Firestore call goes through run_db, so that is where reads,
+# writes and time are attributed to the request in flight
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+def json_default(value):
+    """Serialize datetimes (Firestore timestamps are datetimes too) in responses and event payloads.
+    Any other type is a bug in the payload, so it raises rather than turning into a string."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def log_default(value):
+    """json_default for log fields, where a stray type is logged as its str() instead of losing the line"""
+    try:
+        return json_default(value)
+    except TypeError:
+        return str(value)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {})
+        }
+        return json.dumps(entry, default=log_default)
+
+logger = logging.getLogger("checkapp")
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(JsonFormatter())
+    logger.addHandler(log_handler)
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+class RequestUsage:
+    """Firestore usage and timing for one HTTP request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+        self.db_seconds = 0.0
+        self.auth_seconds = 0.0
+
+    def server_timing(self, total_seconds: float):
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.reads} reads, {self.writes} writes, {self.round_trips} calls", '
+            f"auth;dur={self.auth_seconds * 1000:.1f}, total;dur={total_seconds * 1000:.1f}"
+        )
+
+current_usage: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("current_usage", default=None)
+
+def log_event(level: str, message: str, **fields):
+    """One JSON log line, tagged with the method and path of the request being served"""
+    usage = current_usage.get()
+    if usage is not None:
+        fields = {"method": usage.method, "path": usage.path, **fields}
+    logger.log(getattr(logging, level.upper()), message, extra={"fields": fields})
+
+def bucket_order(key: tuple):
+    """Sort key for a histogram bucket series: its other labels, then le from low to +Inf"""
+    labels = dict(key)
+    return tuple(item for item in key if item[0] != "le"), float(labels.get("le", "inf"))
+
+class Metrics:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format.
+    Only updated from the event loop, so no locking."""
+
+    def __init__(self):
+        self._meta: Dict[str, tuple] = {}
+        self._values: Dict[str, Dict[tuple, float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self._values.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self._values.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, buckets: tuple, **labels):
+        # Every bucket gets a series (at 0 if need be), or histogram_quantile() sees gaps
+        for bound in buckets:
+            self.inc(f"{name}_bucket", 1.0 if value <= bound else 0.0, le=str(bound), **labels)
+        self.inc(f"{name}_bucket", le="+Inf", **labels)
+        self.inc(f"{name}_sum", value, **labels)
+        self.inc(f"{name}_count", **labels)
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text) in self._meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            series_names = [f"{name}_bucket", f"{name}_sum", f"{name}_count"] if kind in ("histogram", "summary") else [name]
+            for series_name in series_names:
+                series = self._values.get(series_name, {})
+                keys = sorted(series, key=bucket_order) if series_name.endswith("_bucket") else list(series)
+                for key in keys:
+                    value = series[key]
+                    labels = ",".join(f'{k}="{v}"' for k, v in key)
+                    lines.append(f"{series_name}{{{labels}}} {value:g}" if labels else f"{series_name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+metrics = Metrics()
+metrics.describe("http_requests_total", "counter", "HTTP requests by route and status")
+metrics.describe("http_request_duration_seconds", "histogram", "Time until the response completed, by route")
+metrics.describe("firestore_reads_total", "counter", "Billed Firestore document reads, by route")
+metrics.describe("firestore_writes_total", "counter", "Firestore document writes, by route")
+metrics.describe("firestore_round_trips_total", "counter", "Firestore calls, by route")
+metrics.describe("firestore_call_duration_seconds", "summary", "Firestore call time, by operation")
+metrics.describe("auth_verify_duration_seconds", "summary", "ID token verification time on cache misses")
+metrics.describe("auth_token_cache_hits_total", "counter", "Requests served from the verified-token cache")
+metrics.describe("auth_token_cache_misses_total", "counter", "Requests that had to verify their ID token")
+metrics.describe("auth_token_cache_size", "gauge", "Verified tokens currently cached")
+metrics.describe("doc_cache_hits_total", "counter", "Document cache hits, by collection")
+metrics.describe("doc_cache_misses_total", "counter", "Document cache misses, by collection")
+metrics.describe("doc_cache_hit_ratio", "gauge", "Share of document cache lookups served without a Firestore read, by collection")
+metrics.describe("doc_cache_entries", "gauge", "Documents in this process's cache")
+metrics.describe("event_stream_subscribers", "gauge", "Connected /api/stream and group chat socket clients in this process")
+metrics.describe("events_published_total", "counter", "Events published to the in-process hub")
+
+def db_op_name(fn):
+    """Low-cardinality label for a run_db target, e.g. DocumentReference.get or transaction:leave_group_transaction"""
+    wrapped = getattr(fn, "to_wrap", None)
+    if wrapped is not None:
+        return f"transaction:{wrapped.__name__}"
+    owner = getattr(fn, "__self__", None)
+    name = getattr(fn, "__name__", "call")
+    return f"{type(owner).__name__}.{name}" if owner is not None else name
+
+def billed_usage(result):
+    """(reads, writes) for a run_db result; transactions are billed by transaction_usage instead"""
+    if hasattr(result, "exists"):
+        return 1, 0  # document get; missing documents are billed too
+    if isinstance(result, list):
+        if not result or hasattr(result[0], "exists"):
+            return max(1, len(result)), 0  # query or get_all; an empty query still costs one read
+        if isinstance(result[0], list):
+            return max(1, -(-int(result[0][0].value) // 1000)), 0  # count(): one read per 1000 matches
+        if hasattr(result[0], "update_time"):
+            return 0, len(result)  # batch commit
+    if isinstance(result, tuple) and len(result) == 2 and hasattr(result[1], "path"):
+        return 0, 1  # CollectionReference.add
+    if hasattr(result, "update_time"):
+        return 0, 1  # set / update / delete / create
+    return 0, 0
+
+def transaction_read(transaction, result):
+    """Pass through a read made inside a transaction, adding what it's billed for to the transaction.
+    Queries have to be materialized (list) first so they can be counted."""
+    transaction.billed_reads = getattr(transaction, "billed_reads", 0) + billed_usage(result)[0]
+    return result
+
+def counts_usage(fn):
+    """Goes under @firestore.transactional: notes the writes each attempt queued,
+    since the transaction forgets them once it commits"""
+    @functools.wraps(fn)
+    def counted(transaction, *args, **kwargs):
+        result = fn(transaction, *args, **kwargs)
+        transaction.billed_writes = len(transaction._write_pbs)
+        return result
+    return counted
+
+def transaction_usage(transaction, committed: bool):
+    """(reads, writes) for a transaction run: reads from every attempt are billed, writes only if it committed"""
+    return getattr(transaction, "billed_reads", 0), getattr(transaction, "billed_writes", 0) if committed else 0
+
+def record_db_call(fn, result, seconds: float, transaction=None, committed: bool = False):
+    usage = current_usage.get()
+    if fn is auth.verify_id_token:
+        metrics.inc("auth_verify_duration_seconds_sum", seconds)
+        metrics.inc("auth_verify_duration_seconds_count")
+        if usage is not None:
+            usage.auth_seconds += seconds
+        return
+    op = db_op_name(fn)
+    metrics.inc("firestore_call_duration_seconds_sum", seconds, op=op)
+    metrics.inc("firestore_call_duration_seconds_count", op=op)
+    if usage is not None:
+        reads, writes = billed_usage(result) if transaction is None else transaction_usage(transaction, committed)
+        usage.reads += reads
+        usage.writes += writes
+        usage.round_trips += 1
+        usage.db_seconds += seconds
+
+class RequestMetricsMiddleware:
+    """Attributes Firestore usage to each request: Server-Timing header, metrics and a JSON access log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if ARCHIVE_ON_ROLLOVER:
+            rollover_archiver.poke()
+        usage = RequestUsage(scope["method"], scope["path"])
+        token = current_usage.set(usage)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = usage.server_timing(time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.inc("http_requests_total", method=usage.method, route=route, status=str(status))
+            metrics.observe("http_request_duration_seconds", elapsed, LATENCY_BUCKETS, method=usage.method, route=route)
+            metrics.inc("firestore_reads_total", usage.reads, route=route)
+            metrics.inc("firestore_writes_total", usage.writes, route=route)
+            metrics.inc("firestore_round_trips_total", usage.round_trips, route=route)
+            log_event("info", "request", route=route, status=status, duration_ms=round(elapsed * 1000, 1),
+                      db_ms=round(usage.db_seconds * 1000, 1), reads=usage.reads, writes=usage.writes, round_trips=usage.round_trips)
+            current_usage.reset(token)
+
+class OrjsonResponse(JSONResponse):
+    """JSON rendered by orjson; Firestore timestamps go through json_default"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+class OrjsonRoute(APIRoute):
+    """Route that hands a handler's dict or list straight to OrjsonResponse.
+
+    FastAPI otherwise walks the whole result with jsonable_encoder first, which costs
+    far more than the JSON encoding itself on the progress payloads. Headers set on an
+    injected `response: Response` parameter are carried over, as FastAPI would.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def render_directly(*call_args, **call_kwargs):
+            result = await endpoint(*call_args, **call_kwargs)
+            if isinstance(result, Response):
+                return result
+            rendered = OrjsonResponse(result)
+            for value in call_kwargs.values():
+                if isinstance(value, Response):
+                    rendered.headers.raw.extend(value.headers.raw)
+                    rendered.status_code = value.status_code or rendered.status_code
+            return rendered
+        super().__init__(path, render_directly, **kwargs)
+
+app = FastAPI(title="Daily Check-In Task Tracker API - Multi-Partner & Groups", version="2.0.0", default_response_class=OrjsonResponse)
+app.router.route_class = OrjsonRoute
 
 # Enable CORS
 app.add_middleware(
@@ -44,6 +375,7 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 # Enhanced Pydantic models
 class TaskCreate(BaseModel):
@@ -55,6 +387,18 @@ class TaskCreate(BaseModel):
 class TaskUpdate(BaseModel):
     completed: bool
 
+class TaskOperation(BaseModel):
+    op: str = Field(..., pattern="^(create|update|delete)$")
+    task_id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[str] = "medium"
+    group_id: Optional[str] = None
+    completed: Optional[bool] = None
+
+class TaskBatch(BaseModel):
+    operations: List[TaskOperation] = Field(..., min_length=1, max_length=1000)
+
 class Task(BaseModel):
     id: str
     title: str
@@ -160,6 +504,59 @@ class GroupMessage(BaseModel):
     user: Optional[Dict[str, Any]] = None
 
 # Authentication dependency
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CHECK_REVOKED = os.getenv("AUTH_CHECK_REVOKED", "false").lower() == "true"
+# With revocation checks on, cached tokens are re-verified this often so a revoked session dies quickly
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60" if AUTH_CHECK_REVOKED else "3600"))
+
+class TokenCache:
+    """Bounded LRU of verified ID tokens, keyed by a SHA-256 of the raw token.
+
+    An entry never outlives the token's own exp claim, and is also capped at
+    max_ttl seconds. A max_size of 0 disables caching.
+    """
+
+    def __init__(self, max_size: int, max_ttl: int):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, decoded_token = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decoded_token
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, decoded_token: dict):
+        if self.max_size <= 0:
+            return
+        expires_at = min(decoded_token.get("exp", 0), time.time() + self.max_ttl)
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, decoded_token)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+token_cache = TokenCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
 async def get_current_user(authorization: str = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
@@ -169,10 +566,13 @@ async def get_current_user(authorization: str = Header(None)):
             raise HTTPException(status_code=401, detail="Invalid authorization format")
         
         token = authorization.split(" ")[1]
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = token_cache.get(token)
+        if decoded_token is None:
+            decoded_token = await run_db(auth.verify_id_token, token, check_revoked=AUTH_CHECK_REVOKED)
+            token_cache.put(token, decoded_token)
         return decoded_token
     except Exception as e:
-        print(f"❌ Auth error: {e}")
+        log_event("warning", "Auth error", error=str(e))
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 # Helper functions
@@ -185,44 +585,784 @@ def generate_invite_code():
 def get_user_tasks_collection(user_id: str, date: str):
     return db.collection("users").document(user_id).collection("daily_tasks").document(date).collection("tasks")
 
+def get_daily_summary_ref(user_id: str, date: str):
+    """users/{uid}/daily_tasks/{date} doubles as that day's progress rollup"""
+    return db.collection("users").document(user_id).collection("daily_tasks").document(date)
+
+def get_history_month_ref(user_id: str, month: str):
+    """users/{uid}/history/{YYYY-MM} archives one month of daily rollups in a single doc"""
+    return db.collection("users").document(user_id).collection("history").document(month)
+
+def progress_increments(total: int, completed: int):
+    counts: Dict[str, Any] = {}
+    if total:
+        counts["total_tasks"] = firestore.Increment(total)
+    if completed:
+        counts["completed_tasks"] = firestore.Increment(completed)
+    return counts
+
+def record_progress(writer, user_id: str, date: str, group_id: Optional[str], total: int = 0, completed: int = 0):
+    """Apply a task count change to the day's rollup and the month's history archive.
+    writer is the WriteBatch or Transaction that also carries the task write."""
+    record_progress_many(writer, user_id, date, {group_id: (total, completed)})
+
+def record_progress_many(writer, user_id: str, date: str, deltas: Dict[Optional[str], tuple]):
+    """record_progress for several groups' (total, completed) changes at once, still in two writes.
+    Every call bumps the day's tasks_version, the ETag validator for that day's task list,
+    so call it for any task write, even one that leaves the counts alone."""
+    counts = progress_increments(sum(t for t, _ in deltas.values()), sum(c for _, c in deltas.values()))
+    groups = {gid: progress_increments(t, c) for gid, (t, c) in deltas.items() if gid}
+    groups = {gid: group_counts for gid, group_counts in groups.items() if group_counts}
+    
+    summary: Dict[str, Any] = {"date": date, "tasks_version": firestore.Increment(1), **counts}
+    if groups:
+        summary["groups"] = groups
+    writer.set(get_daily_summary_ref(user_id, date), summary, merge=True)
+    if counts:
+        writer.set(get_history_month_ref(user_id, date[:7]), {"month": date[:7], "days": {date[8:]: dict(counts)}}, merge=True)
+
+def created_payload(doc_id: str, data: dict, write_time):
+    """Response body for a doc just written, with SERVER_TIMESTAMP fields set to the commit time.
+    Saves re-reading the doc after the write just to resolve the sentinels."""
+    payload = {key: write_time if value is firestore.SERVER_TIMESTAMP else value for key, value in data.items()}
+    payload["id"] = doc_id
+    return payload
+
+PAGE_MAX_SIZE = 100
+
+def encode_cursor(snapshot, field: str):
+    """Opaque page token holding the last doc's sort value and id, so resuming needs no extra read"""
+    value = snapshot.get(field)
+    raw = json.dumps({"v": value.isoformat() if value else None, "id": snapshot.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """(sort value, doc id) from encode_cursor. A doc whose sort field is null still sorts (nulls
+    come before every timestamp), so a null value is a valid place to resume from."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(raw["v"]) if raw["v"] is not None else None), str(raw["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def fetch_page(query, field: str, direction: str, limit: int, cursor: Optional[str]):
+    """One page of query ordered by field (then doc id), plus the cursor for the next page.
+    Reads limit + 1 docs at most, however deep into the collection the page is."""
+    query = query.order_by(field, direction=direction).order_by("__name__", direction=direction)
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        query = query.start_after({field: value, "__name__": doc_id})
+    docs = list(await run_db(query.limit(limit + 1).get))
+    page = docs[:limit]
+    next_cursor = encode_cursor(page[-1], field) if len(docs) > limit else None
+    return page, next_cursor
+
+FIELDS_DESCRIPTION = "Comma-separated task fields to return, e.g. title,completed (id is always included); omit for every field"
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """The fields= query parameter as a list of field names, or None for every field"""
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if not all(name.isidentifier() for name in names):
+        raise HTTPException(status_code=400, detail="fields must be comma-separated field names")
+    return sorted(names - {"id"})
+
+def select_fields(query, fields: Optional[List[str]], *needed: str):
+    """Project a query to the requested fields, plus any the handler reads itself, so the rest never leaves Firestore"""
+    if fields is None:
+        return query
+    return query.select(sorted(set(fields).union(needed)) or ["__name__"])
+
+def doc_payload(doc, fields: Optional[List[str]] = None):
+    """A doc's data with its id, narrowed to fields when a projection was asked for"""
+    data = doc.to_dict() or {}
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key in fields}
+    data["id"] = doc.id
+    return data
+
+# Conditional GETs: list endpoints send a strong ETag, and a request whose If-None-Match
+# already names it gets a bodiless 304. Validators come from version counters read before the
+# data (a day's tasks_version on its rollup; a group's tasks_version and host_profile_version on
+# the group doc), so a 304 skips the data reads and a write landing in between can only make the
+# ETag too old, never too new. Member lists load every profile anyway, so they are validated by
+# the profiles' own updated_at times instead.
+NOT_MODIFIED_HEADERS = {"Cache-Control": "private, no-cache"}
+
+def make_etag(*parts) -> str:
+    """Strong validator over the values a response is built from"""
+    return '"' + hashlib.sha256(json.dumps(parts, sort_keys=True, default=json_default).encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names etag (compared weakly, as GET requests are)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers.update(NOT_MODIFIED_HEADERS)
+
+def not_modified(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, **NOT_MODIFIED_HEADERS})
+
+async def get_tasks_version(user_id: str, date: str):
+    """The day's tasks_version: bumped by every write to that day's tasks (see record_progress_many)"""
+    summary = await run_db(get_daily_summary_ref(user_id, date).get)
+    return (summary.to_dict() or {}).get("tasks_version") if summary.exists else None
+
+def progress_stats(total_tasks: int, completed_tasks: int):
+    completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    return {
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "completion_percentage": round(completion_percentage)
+    }
+
+def summary_stats(summary: Optional[dict], group_id: Optional[str] = None):
+    """Progress stats from a daily rollup, optionally narrowed to one group's tasks"""
+    counts = summary or {}
+    if group_id:
+        counts = (counts.get("groups") or {}).get(group_id) or {}
+    return progress_stats(counts.get("total_tasks", 0), counts.get("completed_tasks", 0))
+
+async def load_daily_summaries(user_ids: List[str], date: str) -> Dict[str, dict]:
+    """Fetch several users' rollups for one day in a single batch read"""
+    if not user_ids:
+        return {}
+    refs = [get_daily_summary_ref(uid, date) for uid in user_ids]
+    snapshots = await get_docs(refs)
+    return {snap.reference.parent.parent.id: snap.to_dict() for snap in snapshots if snap.exists}
+
+def get_user_memberships_collection(user_id: str):
+    """Per-user mirror of groups/{gid}/members, written in the same batch as the member doc"""
+    return db.collection("users").document(user_id).collection("group_memberships")
+
+# ETag counters on group docs, not part of any response: tasks_version moves with the group's
+# tasks, host_profile_version when the host edits their profile
+GROUP_VERSION_FIELDS = ("tasks_version", "host_profile_version")
+
+def group_listing(group_id: str, data: dict):
+    """Group doc shaped for list responses, using the denormalized member fields"""
+    data["id"] = group_id
+    for version in GROUP_VERSION_FIELDS:
+        data.pop(version, None)
+    data["members"] = data.pop("member_ids", [])
+    data["member_count"] = data.get("member_count", len(data["members"]))
+    return data
+
+def membership_index_data(group_id: str, role: str):
+    return {
+        "group_id": group_id,
+        "role": role,
+        "joined_at": firestore.SERVER_TIMESTAMP
+    }
+
+def get_group_member_ref(group_id: str, user_id: str):
+    return db.collection("groups").document(group_id).collection("members").document(user_id)
+
+def get_friendship_ref(user_id: str, friend_id: str):
+    """friendships/{user_id}_{friend_id}: one doc per direction, so checking a friendship is a single get"""
+    return db.collection("friendships").document(f"{user_id}_{friend_id}")
+
+# Read-through cache for hot, rarely written documents: user profiles, group docs, group
+# member docs and friendship edges. The write paths that change them invalidate them; the TTL bounds
+# staleness from writers this process can't see (manage.py, other workers' local caches).
+DOC_CACHE_TTL = float(os.getenv("DOC_CACHE_TTL", "60"))
+DOC_CACHE_SIZE = int(os.getenv("DOC_CACHE_SIZE", "50000"))
+# redis://host:port/db to share one cache (and its invalidations) between workers
+DOC_CACHE_URL = os.getenv("DOC_CACHE_URL")
+
+class MemoryCacheBackend:
+    """Per-process LRU with a per-entry expiry. A max_size of 0 disables caching."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            found[key] = value
+        return found
+
+    async def set_many(self, values: Dict[str, Any], ttl: float):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        for key, value in values.items():
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Set key only if it isn't already set; returns whether it was"""
+        if await self.get_many([key]):
+            return False
+        await self.set_many({key: value}, ttl)
+        return True
+
+    async def pop(self, key: str) -> Any:
+        """Remove key and return its value, or None if it wasn't set"""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def delete_many(self, keys: List[str]):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def size(self):
+        return len(self._entries)
+
+def cache_encode(value):
+    # Tagged so cache_decode can give handlers back a datetime, as a Firestore read would
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Can't cache {type(value).__name__}")
+
+def cache_decode(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        return {key: cache_decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [cache_decode(item) for item in value]
+    return value
+
+def cache_dumps(value) -> bytes:
+    return orjson.dumps(value, default=cache_encode, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+def cache_loads(raw: bytes):
+    return cache_decode(orjson.loads(raw))
+
+class RedisCacheBackend:
+    """Cache kept in Redis (or a compatible server), shared by every worker.
+    Values are stored as JSON, never pickled, so the server's contents are only ever data."""
+
+    def __init__(self, url: str, prefix: str = "checkapp:doc:"):
+        # Optional dependency: only needed when DOC_CACHE_URL is set
+        import redis.asyncio
+        self._redis = redis.asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        values = await self._redis.mget([self.prefix + key for key in keys])
+        return {key: cache_loads(value) for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, values: Dict[str, Any], ttl: float):
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(self.prefix + key, cache_dumps(value), px=int(ttl * 1000))
+        await pipeline.execute()
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        return bool(await self._redis.set(self.prefix + key, cache_dumps(value), px=int(ttl * 1000), nx=True))
+
+    async def pop(self, key: str) -> Any:
+        value = await self._redis.getdel(self.prefix + key)
+        return cache_loads(value) if value is not None else None
+
+    async def delete_many(self, keys: List[str]):
+        await self._redis.delete(*[self.prefix + key for key in keys])
+
+    def size(self):
+        return None  # shared with other workers; see the Redis server's own stats
+
+class CachedDocument:
+    """The parts of a DocumentSnapshot the handlers use, served from the cache"""
+
+    def __init__(self, reference, data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+class DocCache:
+    """Read-through document cache keyed by document path.
+
+    Missing documents are cached too, so a failed membership check stays cheap;
+    that is why every write that creates one of these documents must invalidate it.
+    A backend error degrades to reading Firestore.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        # Paths being fetched right now, and those invalidated mid-fetch (their result may predate the write)
+        self._fetching: Dict[str, int] = {}
+        self._raced: set = set()
+
+    async def get_many(self, refs) -> List[CachedDocument]:
+        """Documents for refs, in order; misses are fetched with get_docs and cached"""
+        keys = [ref.path for ref in refs]
+        unique = {key: ref for key, ref in zip(keys, refs)}
+        try:
+            values = await self.backend.get_many(list(unique)) if unique else {}
+        except Exception as e:
+            log_event("warning", "Document cache read failed", error=str(e))
+            values = {}
+        missing = {key: ref for key, ref in unique.items() if key not in values}
+        for key, ref in unique.items():
+            counts = self.misses if key in missing else self.hits
+            kind = ref.parent.id
+            counts[kind] = counts.get(kind, 0) + 1
+        if missing:
+            fetched = await self._fetch(missing)
+            values.update(fetched)
+        return [CachedDocument(ref, values.get(key)) for key, ref in zip(keys, refs)]
+
+    async def get(self, ref) -> CachedDocument:
+        return (await self.get_many([ref]))[0]
+
+    async def _fetch(self, missing: Dict[str, Any]):
+        for key in missing:
+            self._fetching[key] = self._fetching.get(key, 0) + 1
+        try:
+            snapshots = await get_docs(list(missing.values()))
+        finally:
+            raced = set()
+            for key in missing:
+                self._fetching[key] -= 1
+                if key in self._raced:
+                    raced.add(key)
+                    if not self._fetching[key]:
+                        self._raced.discard(key)
+                if not self._fetching[key]:
+                    del self._fetching[key]
+        fetched = {snap.reference.path: snap.to_dict() if snap.exists else None for snap in snapshots}
+        try:
+            await self.backend.set_many({key: value for key, value in fetched.items() if key not in raced}, self.ttl)
+        except Exception as e:
+            log_event("warning", "Document cache write failed", error=str(e))
+        return fetched
+
+    async def invalidate(self, *refs):
+        """Drop refs from the cache; call after the write that changed them has committed"""
+        keys = [ref.path for ref in refs]
+        self._raced.update(key for key in keys if key in self._fetching)
+        try:
+            await self.backend.delete_many(keys)
+        except Exception as e:
+            log_event("error", "Document cache invalidation failed", error=str(e), keys=keys)
+
+    def stats(self):
+        return {"size": self.backend.size(), "hits": dict(self.hits), "misses": dict(self.misses)}
+
+doc_cache = DocCache(RedisCacheBackend(DOC_CACHE_URL) if DOC_CACHE_URL else MemoryCacheBackend(DOC_CACHE_SIZE), DOC_CACHE_TTL)
+
+# Idempotency-Key support: the first response for a (user, endpoint, key) is kept for
+# IDEMPOTENCY_TTL seconds and replayed to retries without touching Firestore. The store
+# is shared between workers when DOC_CACHE_URL is set.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+# A claimed key whose request never finished (crashed worker) frees up after this long
+IDEMPOTENCY_PENDING_TTL = 60.0
+idempotency_store = RedisCacheBackend(DOC_CACHE_URL, "checkapp:idem:") if DOC_CACHE_URL else MemoryCacheBackend(int(os.getenv("IDEMPOTENCY_STORE_SIZE", "10000")))
+
+def request_fingerprint(kwargs: dict):
+    """Hash of a route's body and path parameters, to spot a key reused for a different request"""
+    params = {name: value.model_dump() if isinstance(value, BaseModel) else value
+              for name, value in kwargs.items() if isinstance(value, (BaseModel, str, int, float, bool))}
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=json_default).encode()).hexdigest()
+
+def idempotent(handler):
+    """Route decorator: repeated requests with the same Idempotency-Key header get the first outcome.
+
+    The route must take current_user and an idempotency_key header parameter.
+    Successes and client errors are replayed; server errors free the key for a retry.
+    """
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        key = kwargs.get("idempotency_key")
+        if not key:
+            return await handler(*args, **kwargs)
+        store_key = f"{kwargs['current_user']['uid']}:{handler.__name__}:{key}"
+        fingerprint = request_fingerprint({k: v for k, v in kwargs.items() if k not in ("idempotency_key", "current_user")})
+        
+        if not await idempotency_store.add(store_key, {"fingerprint": fingerprint, "pending": True}, IDEMPOTENCY_PENDING_TTL):
+            stored = (await idempotency_store.get_many([store_key])).get(store_key)
+            if stored is None:
+                raise HTTPException(status_code=409, detail="Request with this Idempotency-Key expired mid-retry; try again")
+            if stored["fingerprint"] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if stored.get("pending"):
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            if stored["status_code"] >= 400:
+                raise HTTPException(status_code=stored["status_code"], detail=stored["body"])
+            return OrjsonResponse(stored["body"], status_code=stored["status_code"], headers={"Idempotent-Replayed": "true"})
+        
+        try:
+            body = await handler(*args, **kwargs)
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await idempotency_store.delete_many([store_key])
+            else:
+                await idempotency_store.set_many({store_key: {"fingerprint": fingerprint, "status_code": e.status_code, "body": e.detail}}, IDEMPOTENCY_TTL)
+            raise
+        except Exception:
+            await idempotency_store.delete_many([store_key])
+            raise
+        await idempotency_store.set_many({store_key: {"fingerprint": fingerprint, "status_code": 200, "body": jsonable_encoder(body)}}, IDEMPOTENCY_TTL)
+        return body
+    
+    return wrapper
+
+# User search matches any substring of the email, username or display name, through
+# an array of lowercase n-grams (one array_contains query per search). The array lives on
+# user_search/{uid}, next to a copy of the searched fields, rather than on the user doc that
+# every profile read, the document cache and the dataloader would otherwise carry it on.
+SEARCH_NGRAM_MAX = 10
+SEARCH_RESULTS = 10
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "30"))
+USER_SEARCH_FIELDS = ["email", "display_name", "username"]
+
+def search_tokens(email: Optional[str], username: Optional[str], display_name: Optional[str]):
+    """Every substring up to SEARCH_NGRAM_MAX characters of the searchable fields, lowercased"""
+    terms = [(email or "").lower(), (username or "").lower(), " ".join((display_name or "").lower().split())]
+    tokens = set()
+    for term in terms:
+        for start in range(len(term)):
+            for end in range(start + 1, min(len(term), start + SEARCH_NGRAM_MAX) + 1):
+                tokens.add(term[start:end])
+    return sorted(tokens)
+
+def get_user_search_ref(user_id: str):
+    return db.collection("user_search").document(user_id)
+
+def user_search_entry(email: Optional[str], username: Optional[str], display_name: Optional[str]):
+    """user_search/{uid}: the searched fields and their n-grams, rewritten with every profile write"""
+    return {"email": email, "username": username, "display_name": display_name, "search_tokens": search_tokens(email, username, display_name)}
+
+def user_matches(data: dict, query: str):
+    return any(query in " ".join((data.get(field) or "").lower().split()) for field in USER_SEARCH_FIELDS)
+
+def user_summary(user_id: str, data: Optional[dict]):
+    """Public subset of a user document embedded in responses"""
+    if data is None:
+        return None
+    return {
+        "id": user_id,
+        "email": data.get("email"),
+        "display_name": data.get("display_name"),
+        "username": data.get("username")
+    }
+
 async def get_user_data(user_id: str):
     """Get basic user data for responses"""
-    user_doc = db.collection("users").document(user_id).get()
-    if user_doc.exists:
-        data = user_doc.to_dict()
-        return {
-            "id": user_id,
-            "email": data.get("email"),
-            "display_name": data.get("display_name"),
-            "username": data.get("username")
-        }
-    return None
+    user_doc = await doc_cache.get(db.collection("users").document(user_id))
+    return user_summary(user_id, user_doc.to_dict() if user_doc.exists else None)
+
+class UserLoader:
+    """Request-scoped user profile loader.
+
+    Handlers collect every user ID a response needs and resolve them with a
+    single load_many() call, which deduplicates the IDs and fetches the ones the
+    document cache doesn't hold in one db.get_all() round-trip. Results are
+    memoized for the rest of the request, and a fetch still in flight is shared
+    with concurrent callers (the sections of /api/dashboard). Each profile's
+    updated_at is kept as its version, for ETags over responses that show profiles.
+    """
+
+    def __init__(self):
+        # user id -> the fetch that loads it, which resolves to {user id: profile}
+        self._fetches: Dict[str, asyncio.Future] = {}
+        self._versions: Dict[str, Any] = {}
+
+    async def _fetch(self, user_ids: List[str]) -> Dict[str, Optional[dict]]:
+        refs = [db.collection("users").document(uid) for uid in user_ids]
+        profiles = {}
+        for snap in await doc_cache.get_many(refs):
+            data = snap.to_dict() if snap.exists else None
+            self._versions[snap.id] = (data or {}).get("updated_at")
+            profiles[snap.id] = user_summary(snap.id, data)
+        return profiles
+
+    async def load_many(self, user_ids) -> Dict[str, Optional[dict]]:
+        user_ids = [uid for uid in user_ids if uid]
+        missing = [uid for uid in dict.fromkeys(user_ids) if uid not in self._fetches]
+        if missing:
+            fetch = asyncio.ensure_future(self._fetch(missing))
+            for uid in missing:
+                self._fetches[uid] = fetch
+        profiles = {}
+        for fetch in {id(self._fetches[uid]): self._fetches[uid] for uid in user_ids}.values():
+            profiles.update(await fetch)
+        return {uid: profiles.get(uid) for uid in user_ids}
+
+    async def load(self, user_id: str):
+        return (await self.load_many([user_id])).get(user_id)
+
+    def versions(self, user_ids) -> list:
+        """updated_at of each already loaded profile, in order (None for missing profiles)"""
+        return [self._versions.get(uid) for uid in user_ids]
+
+class RecentSet:
+    """Bounded set that forgets its least recently seen members first"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._members: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key: str):
+        if key in self._members:
+            self._members.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key: str):
+        self._members[key] = None
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    def discard(self, key: str):
+        self._members.pop(key, None)
+
+# User docs are never deleted, so once this process has seen one it can skip the check
+known_users = RecentSet(int(os.getenv("KNOWN_USERS_CACHE_SIZE", "50000")))
 
 async def ensure_user_exists(current_user: dict):
     """Ensure user exists in database, create if not"""
     user_id = current_user['uid']
     email = current_user['email']
     
-    user_doc = db.collection("users").document(user_id).get()
-    if not user_doc.exists:
-        # Create user document
-        user_profile = {
-            "email": email,
-            "display_name": current_user.get('name', email.split('@')[0]),
-            "username": None,
-            "created_at": firestore.SERVER_TIMESTAMP,
-            "updated_at": firestore.SERVER_TIMESTAMP
-        }
-        db.collection("users").document(user_id).set(user_profile)
-        print(f"✅ Auto-created user profile for {email}")
+    if user_id in known_users:
+        return user_id
+    
+    # Create-if-absent in one write instead of read-then-set
+    display_name = current_user.get('name', email.split('@')[0])
+    user_profile = {
+        "email": email,
+        "display_name": display_name,
+        "username": None,
+        "created_at": firestore.SERVER_TIMESTAMP,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    }
+    try:
+        user_ref = db.collection("users").document(user_id)
+        batch = db.batch()
+        batch.create(user_ref, user_profile)
+        batch.set(get_user_search_ref(user_id), user_search_entry(email, None, display_name))
+        await run_db(batch.commit)
+        await doc_cache.invalidate(user_ref)
+        log_event("info", "Auto-created user profile", user_id=user_id, email=email)
+    except AlreadyExists:
+        pass
+    known_users.add(user_id)
     
     return user_id
 
+# Live events
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+
+# Events that change what a connected client should be listening to: (topic prefix, id field, follow?)
+TOPIC_CHANGES = {
+    "friend_added": ("progress:", "friend_id", True),
+    "friend_removed": ("progress:", "friend_id", False),
+    "group_joined": ("group:", "group_id", True),
+    "group_left": ("group:", "group_id", False),
+}
+
+class Event:
+    """One published event, serialized at most once per wire format however many clients get it"""
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self._sse: Optional[str] = None
+        self._frame: Optional[str] = None
+
+    @property
+    def sse(self) -> str:
+        if self._sse is None:
+            self._sse = f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=json_default)}\n\n"
+        return self._sse
+
+    @property
+    def frame(self) -> str:
+        """WebSocket text frame: {"id", "type", "data"}"""
+        if self._frame is None:
+            self._frame = orjson.dumps({"id": self.id, "type": self.type, "data": self.data}, default=json_default).decode()
+        return self._frame
+
+class Subscription:
+    """One connected client: a bounded queue of events and the topics feeding it"""
+
+    def __init__(self, hub: "EventHub", queue_size: int):
+        self.hub = hub
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.topics: set = set()
+        self.dropped = 0
+
+    def add(self, topic: str):
+        self.topics.add(topic)
+        self.hub._topics.setdefault(topic, set()).add(self)
+
+    def remove(self, topic: str):
+        self.topics.discard(topic)
+        subscribers = self.hub._topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.hub._topics[topic]
+
+    def close(self):
+        for topic in list(self.topics):
+            self.remove(topic)
+
+    def deliver(self, event: Event):
+        # Follow new friends and groups right away so their next events aren't missed
+        change = TOPIC_CHANGES.get(event.type)
+        if change:
+            prefix, field, follow = change
+            topic = f"{prefix}{event.data[field]}"
+            if follow:
+                self.add(topic)
+            else:
+                self.remove(topic)
+        # A slow client loses its oldest events instead of holding up the publisher
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+class EventHub:
+    """In-process pub/sub feeding /api/stream and the group chat sockets. Publishing never touches Firestore.
+
+    Topics are user:{uid} (requests, notes, membership changes), progress:{uid}
+    (personal task changes) and group:{gid} (messages, group tasks, members).
+    Must be used from the event loop; each worker process has its own hub.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.published = 0
+        self._topics: Dict[str, set] = {}
+
+    def subscribe(self, topics: List[str]) -> Subscription:
+        subscription = Subscription(self, self.queue_size)
+        for topic in topics:
+            subscription.add(topic)
+        return subscription
+
+    def publish(self, topics: List[str], event_type: str, data: dict):
+        """Deliver an event once to every subscriber of any of the topics; returns the fan-out"""
+        subscribers = set()
+        for topic in topics:
+            subscribers.update(self._topics.get(topic, ()))
+        self.published += 1
+        if not subscribers:
+            return 0
+        # Serialized on first delivery to each kind of client, however many are listening
+        event = Event(self.published, event_type, data)
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def stats(self):
+        subscribers = set()
+        for topic_subscribers in self._topics.values():
+            subscribers.update(topic_subscribers)
+        return {"topics": len(self._topics), "subscribers": len(subscribers), "published": self.published}
+
+events = EventHub(EVENT_QUEUE_SIZE)
+
+def publish_task_event(event_type: str, user_id: str, group_id: Optional[str], data: dict):
+    """Send a personal task change to the owner's friends and, for group tasks, the group"""
+    topics = [f"progress:{user_id}"]
+    if group_id:
+        topics.append(f"group:{group_id}")
+    events.publish(topics, event_type, {"user_id": user_id, "group_id": group_id, **data})
+
+async def stream_topics(user_id: str):
+    """Topics a user's stream starts on: their own inbox and progress, friends' progress and their groups"""
+    friendships, memberships = await asyncio.gather(
+        run_db(db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).select(["friend_id"]).get),
+        run_db(get_user_memberships_collection(user_id).select(["__name__"]).get)
+    )
+    topics = [f"user:{user_id}", f"progress:{user_id}"]
+    topics += [f"progress:{doc.to_dict()['friend_id']}" for doc in friendships]
+    topics += [f"group:{doc.id}" for doc in memberships]
+    return topics
+
+async def sse_events(request: Request, subscription: Subscription):
+    """Drain a subscription as an SSE byte stream, with keep-alives, until the client goes away"""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield event.sse
+    finally:
+        subscription.close()
+
+# EventSource and browser WebSockets can't send an Authorization header, and an ID token in
+# the URL ends up in access logs while it is valid for an hour. Those clients swap their
+# token for a stream ticket instead: random, single-use and valid for STREAM_TICKET_TTL seconds.
+STREAM_TICKET_TTL = 30.0
+stream_tickets = RedisCacheBackend(DOC_CACHE_URL, "checkapp:ticket:") if DOC_CACHE_URL else MemoryCacheBackend(int(os.getenv("STREAM_TICKET_STORE_SIZE", "10000")))
+
+async def get_stream_user(ticket: Optional[str] = Query(None), authorization: str = Header(None)):
+    """The Authorization header, or a ?ticket= from POST /api/stream/ticket for clients that can't send one"""
+    if authorization or not ticket:
+        return await get_current_user(authorization)
+    user = await stream_tickets.pop(ticket)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    return user
+
 # Routes
 @app.get("/")
 async def root():
     return {"message": "Daily Check-In Task Tracker API - Multi-Partner & Groups", "version": "2.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: str = Header(None)):
+    """Prometheus scrape endpoint; set METRICS_TOKEN to require it as a bearer token"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Metrics token required")
+    tokens = token_cache.stats()
+    metrics.set("auth_token_cache_hits_total", tokens["hits"])
+    metrics.set("auth_token_cache_misses_total", tokens["misses"])
+    metrics.set("auth_token_cache_size", tokens["size"])
+    cache = doc_cache.stats()
+    for kind in set(cache["hits"]) | set(cache["misses"]):
+        hits, misses = cache["hits"].get(kind, 0), cache["misses"].get(kind, 0)
+        metrics.set("doc_cache_hits_total", hits, collection=kind)
+        metrics.set("doc_cache_misses_total", misses, collection=kind)
+        metrics.set("doc_cache_hit_ratio", hits / (hits + misses), collection=kind)
+    if cache["size"] is not None:
+        metrics.set("doc_cache_entries", cache["size"])
+    hub = events.stats()
+    metrics.set("event_stream_subscribers", hub["subscribers"])
+    metrics.set("events_published_total", hub["published"])
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # User Management
 @app.post("/api/users/setup")
 async def setup_user(user_data: UserCreate, current_user: dict = Depends(get_current_user)):
@@ -234,7 +1374,7 @@ async def setup_user(user_data: UserCreate, current_user: dict = Depends(get_cur
         
         # Check if username is taken
         if user_data.username:
-            existing_user = db.collection("users").where(field_path="username", op_string="==", value=user_data.username).limit(1).get()
+            existing_user = await run_db(db.collection("users").where(field_path="username", op_string="==", value=user_data.username).limit(1).get)
             if existing_user and len(existing_user) > 0 and existing_user[0].id != user_id:
                 raise HTTPException(status_code=400, detail="Username already taken")
         
@@ -246,44 +1386,70 @@ async def setup_user(user_data: UserCreate, current_user: dict = Depends(get_cur
             "updated_at": firestore.SERVER_TIMESTAMP
         }
         
-        db.collection("users").document(user_id).set(user_profile, merge=True)
+        # updated_at validates the member lists that show this profile; listings of the groups
+        # the user hosts are moved along afterwards by bump_host_profile_versions
+        user_ref = db.collection("users").document(user_id)
+        batch = db.batch()
+        batch.set(user_ref, user_profile, merge=True)
+        batch.set(get_user_search_ref(user_id), user_search_entry(email, user_data.username, display_name))
+        write_results = await run_db(batch.commit)
+        await doc_cache.invalidate(user_ref)
+        known_users.add(user_id)
+        await bump_host_profile_versions(user_id)
         
-        # Return profile without SERVER_TIMESTAMP to avoid serialization issues
-        response_profile = {
-            "id": user_id,
-            "email": email,
-            "display_name": display_name,
-            "username": user_data.username,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
+        response_profile = created_payload(user_id, user_profile, write_results[0].update_time)
         
         return {"message": "User profile updated successfully", "user": response_profile}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error setting up user: {e}")
+        log_event("error", "Error setting up user", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+async def bump_host_profile_versions(user_id: str):
+    """Move host_profile_version on the groups a user hosts, so group listings can be validated
+    without loading host profiles. Best effort, after the profile write: each group is updated on
+    its own, and a failure only leaves that group's listing ETag stale until its next change."""
+    try:
+        hosted = await run_db(get_user_memberships_collection(user_id).where(field_path="role", op_string="==", value="host").select(["__name__"]).get)
+    except Exception as e:
+        log_event("warning", "Could not look up hosted groups", user_id=user_id, error=str(e))
+        return
+    group_refs = [db.collection("groups").document(doc.id) for doc in hosted]
+    
+    async def bump(group_ref):
+        try:
+            await run_db(group_ref.update, {"host_profile_version": firestore.Increment(1)})
+            return group_ref
+        except NotFound:
+            return None  # stale index entry for a deleted group
+        except Exception as e:
+            log_event("warning", "Could not bump host_profile_version", user_id=user_id, group_id=group_ref.id, error=str(e))
+            return None
+    
+    bumped = [ref for ref in await fan_out(bump, group_refs) if ref is not None]
+    if bumped:
+        await doc_cache.invalidate(*bumped)
+
 @app.get("/api/user/profile")
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile with stats"""
     try:
         # Ensure user exists in database
         user_id = await ensure_user_exists(current_user)
-        user_doc = db.collection("users").document(user_id).get()
+        
+        # Friends and joined groups (hosted ones included) are counted server-side from
+        # the friendship edges and the membership index, so the cost doesn't grow with them
+        user_doc, friend_count, group_count = await asyncio.gather(
+            doc_cache.get(db.collection("users").document(user_id)),
+            count_docs(db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id)),
+            count_docs(get_user_memberships_collection(user_id))
+        )
         
         if not user_doc.exists:
             return {"user": None}
         
         user_data = user_doc.to_dict()
-        
-        # Get friend count
-        friend_count = len(db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).get())
-        
-        # Get group count - only count hosted groups for now to avoid index issues
-        group_count = len(db.collection("groups").where(field_path="host_id", op_string="==", value=user_id).get())
-        
         user_data.update({
             "id": user_id,
             "friend_count": friend_count,
@@ -292,45 +1458,50 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
         
         return {"user": user_data}
     except Exception as e:
-        print(f"❌ Error getting user profile: {e}")
+        log_event("error", "Error getting user profile", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+# Typeahead sends one query per keystroke: results are cached briefly, and a complete
+# result for "ja" already holds every match for "jan", so narrowing a query is free
+search_cache = MemoryCacheBackend(int(os.getenv("SEARCH_CACHE_SIZE", "10000")))
+
+async def search_user_index(needle: str):
+    """[(user_id, fields)] of users matching needle; at most SEARCH_RESULTS + 1 from a single query"""
+    prefixes = [needle[:end] for end in range(len(needle), 0, -1)]
+    cached = await search_cache.get_many(prefixes)
+    for prefix in prefixes:
+        if prefix in cached:
+            matches, complete = cached[prefix]
+            if prefix == needle or complete:
+                return [(match_id, data) for match_id, data in matches if user_matches(data, needle)]
+    
+    # Queries longer than an n-gram look up their leading one and are checked in full here
+    token = needle[:SEARCH_NGRAM_MAX]
+    limit = SEARCH_RESULTS + 1 if token == needle else SEARCH_RESULTS * 2
+    docs = await run_db(db.collection("user_search").where(field_path="search_tokens", op_string="array_contains", value=token).select(USER_SEARCH_FIELDS).limit(limit).get)
+    matches = [(doc.id, doc.to_dict()) for doc in docs]
+    complete = len(docs) < limit
+    matches = [(match_id, data) for match_id, data in matches if user_matches(data, needle)]
+    await search_cache.set_many({needle: (matches, complete)}, SEARCH_CACHE_TTL)
+    return matches
+
 @app.get("/api/users/search")
 async def search_users(
     query: str = Query(..., min_length=1), 
     current_user: dict = Depends(get_current_user)
 ):
-    """Search users by email or username"""
+    """Search users by any part of their email, username or display name (case-insensitive)"""
     try:
         user_id = current_user['uid']
-        users = []
-        
-        # Search by email
-        email_results = db.collection("users").where(field_path="email", op_string=">=", value=query).where(field_path="email", op_string="<=", value=query + "\uf8ff").limit(10).get()
-        
-        # Search by username if provided
-        username_results = []
-        if "@" not in query:  # Only search username if it's not an email format
-            username_results = db.collection("users").where(field_path="username", op_string=">=", value=query).where(field_path="username", op_string="<=", value=query + "\uf8ff").limit(10).get()
-        
-        # Combine and deduplicate results
-        all_docs = list(email_results) + list(username_results)
-        seen_ids = set()
-        
-        for doc in all_docs:
-            if doc.id not in seen_ids and doc.id != user_id:
-                data = doc.to_dict()
-                users.append({
-                    "id": doc.id,
-                    "email": data.get("email"),
-                    "display_name": data.get("display_name"),
-                    "username": data.get("username")
-                })
-                seen_ids.add(doc.id)
+        needle = " ".join(query.lower().split())
+        if not needle:
+            return {"users": []}
         
-        return {"users": users[:10]}  # Limit to 10 results
+        matches = await search_user_index(needle)
+        users = [user_summary(match_id, data) for match_id, data in matches if match_id != user_id]
+        return {"users": users[:SEARCH_RESULTS]}
     except Exception as e:
-        print(f"❌ Error searching users: {e}")
+        log_event("error", "Error searching users", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Friend Management
@@ -338,16 +1509,17 @@ class FriendRequestCreate(BaseModel):
     user_email: str
 
 @app.post("/api/friends/request")
-async def send_friend_request(request: FriendRequestCreate, current_user: dict = Depends(get_current_user)):
+@idempotent
+async def send_friend_request(request: FriendRequestCreate, current_user: dict = Depends(get_current_user), idempotency_key: Optional[str] = Header(None)):
     """Send a friend request"""
     try:
         # Ensure current user exists in database
         user_id = await ensure_user_exists(current_user)
         friend_email = request.user_email
-        print(f"🔍 Sending friend request from {user_id} to {friend_email}")
+        log_event("info", "Sending friend request", user_id=user_id, to_email=friend_email)
         
         # Find user by email
-        friend_docs = db.collection("users").where(field_path="email", op_string="==", value=friend_email).limit(1).get()
+        friend_docs = await run_db(db.collection("users").where(field_path="email", op_string="==", value=friend_email).limit(1).get)
         if not friend_docs:
             raise HTTPException(status_code=404, detail=f"User with email '{friend_email}' not found. They need to sign up first.")
         
@@ -356,12 +1528,12 @@ async def send_friend_request(request: FriendRequestCreate, current_user: dict =
             raise HTTPException(status_code=400, detail="Cannot send friend request to yourself")
         
         # Check if friendship already exists
-        existing_friendship = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).where(field_path="friend_id", op_string="==", value=friend_id).limit(1).get()
-        if existing_friendship:
+        existing_friendship = await doc_cache.get(get_friendship_ref(user_id, friend_id))
+        if existing_friendship.exists:
             raise HTTPException(status_code=400, detail="Already friends")
         
         # Check for existing pending request
-        existing_request = db.collection("friend_requests").where(field_path="from_user_id", op_string="==", value=user_id).where(field_path="to_user_id", op_string="==", value=friend_id).where(field_path="status", op_string="==", value="pending").limit(1).get()
+        existing_request = await run_db(db.collection("friend_requests").where(field_path="from_user_id", op_string="==", value=user_id).where(field_path="to_user_id", op_string="==", value=friend_id).where(field_path="status", op_string="==", value="pending").limit(1).get)
         if existing_request:
             raise HTTPException(status_code=400, detail="Friend request already sent")
         
@@ -373,161 +1545,180 @@ async def send_friend_request(request: FriendRequestCreate, current_user: dict =
             "created_at": firestore.SERVER_TIMESTAMP
         }
         
-        doc_ref = db.collection("friend_requests").add(request_data)
-        # Fetch created doc to avoid returning Sentinel
-        created = db.collection("friend_requests").document(doc_ref[1].id).get()
-        created_payload = created.to_dict() or {}
-        created_payload["id"] = created.id
+        write_time, doc_ref = await run_db(db.collection("friend_requests").add, request_data)
+        request_payload = created_payload(doc_ref.id, request_data, write_time)
+        events.publish([f"user:{friend_id}"], "friend_request", {"request": request_payload})
         
-        return {"message": "Friend request sent successfully", "request": created_payload}
+        return {"message": "Friend request sent successfully", "request": request_payload}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error sending friend request: {e}")
+        log_event("error", "Error sending friend request", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/friends/requests")
-async def get_friend_requests(current_user: dict = Depends(get_current_user)):
+async def get_friend_requests(current_user: dict = Depends(get_current_user), users: UserLoader = Depends(UserLoader)):
     """Get pending friend requests"""
     try:
         user_id = current_user['uid']
         
         # Get incoming requests
-        incoming_requests = db.collection("friend_requests").where(field_path="to_user_id", op_string="==", value=user_id).where(field_path="status", op_string="==", value="pending").get()
+        incoming_requests = await run_db(db.collection("friend_requests").where(field_path="to_user_id", op_string="==", value=user_id).where(field_path="status", op_string="==", value="pending").get)
+        
+        # Get sender info in one batch
+        senders = await users.load_many([doc.to_dict()["from_user_id"] for doc in incoming_requests])
         
         requests = []
         for doc in incoming_requests:
             data = doc.to_dict()
             data["id"] = doc.id
-            
-            # Get sender info
-            sender_data = await get_user_data(data["from_user_id"])
-            data["from_user"] = sender_data
-            
+            data["from_user"] = senders.get(data["from_user_id"])
             requests.append(data)
         
         return {"requests": requests}
     except Exception as e:
-        print(f"❌ Error getting friend requests: {e}")
+        log_event("error", "Error getting friend requests", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 class FriendRequestResponse(BaseModel):
     accept: bool
 
+@firestore.transactional
+@counts_usage
+def respond_friend_request_transaction(transaction, request_ref, user_id: str, accept: bool):
+    """Answer a pending request and, on accept, create both friendship edges atomically.
+
+    Returns (request data, changed); repeating the answer already given changes nothing.
+    """
+    request_doc = transaction_read(transaction, request_ref.get(transaction=transaction))
+    if not request_doc.exists:
+        raise HTTPException(status_code=404, detail="Friend request not found")
+    
+    request_data = request_doc.to_dict()
+    if request_data["to_user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to respond to this request")
+    
+    status = "accepted" if accept else "rejected"
+    if request_data.get("status") == status:
+        return request_data, False
+    if request_data.get("status") != "pending":
+        raise HTTPException(status_code=409, detail=f"Friend request was already {request_data.get('status')}")
+    
+    transaction.update(request_ref, {
+        "status": status,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    })
+    if accept:
+        friend_id = request_data["from_user_id"]
+        transaction.set(get_friendship_ref(user_id, friend_id), {
+            "user_id": user_id,
+            "friend_id": friend_id,
+            "created_at": firestore.SERVER_TIMESTAMP
+        })
+        # Create reverse friendship
+        transaction.set(get_friendship_ref(friend_id, user_id), {
+            "user_id": friend_id,
+            "friend_id": user_id,
+            "created_at": firestore.SERVER_TIMESTAMP
+        })
+    return request_data, True
+
 @app.post("/api/friends/requests/{request_id}/respond")
-async def respond_to_friend_request(request_id: str, response: FriendRequestResponse, current_user: dict = Depends(get_current_user)):
+@idempotent
+async def respond_to_friend_request(request_id: str, response: FriendRequestResponse, current_user: dict = Depends(get_current_user), idempotency_key: Optional[str] = Header(None)):
     """Accept or reject a friend request"""
     try:
         # Ensure user exists in database
         user_id = await ensure_user_exists(current_user)
         
         action = "accept" if response.accept else "reject"
-        print(f"🔍 {user_id} is {action}ing friend request {request_id}")
-        
-        # Get the request
-        request_doc = db.collection("friend_requests").document(request_id).get()
-        if not request_doc.exists:
-            raise HTTPException(status_code=404, detail="Friend request not found")
+        log_event("info", "Responding to friend request", user_id=user_id, action=action, request_id=request_id)
         
-        request_data = request_doc.to_dict()
-        if request_data["to_user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Not authorized to respond to this request")
+        # Read the request, update its status and add both friendship edges in one transaction
+        request_ref = db.collection("friend_requests").document(request_id)
+        request_data, changed = await run_db(respond_friend_request_transaction, db.transaction(), request_ref, user_id, response.accept)
         
-        # Update request status
-        db.collection("friend_requests").document(request_id).update({
-            "status": "accepted" if action == "accept" else "rejected",
-            "updated_at": firestore.SERVER_TIMESTAMP
-        })
-        
-        # If accepted, create friendship
-        if action == "accept":
-            friendship_data = {
-                "user_id": user_id,
-                "friend_id": request_data["from_user_id"],
-                "created_at": firestore.SERVER_TIMESTAMP
-            }
-            db.collection("friendships").add(friendship_data)
-            
-            # Create reverse friendship
-            reverse_friendship_data = {
-                "user_id": request_data["from_user_id"],
-                "friend_id": user_id,
-                "created_at": firestore.SERVER_TIMESTAMP
-            }
-            db.collection("friendships").add(reverse_friendship_data)
+        if changed and response.accept:
+            friend_id = request_data["from_user_id"]
+            await doc_cache.invalidate(get_friendship_ref(user_id, friend_id), get_friendship_ref(friend_id, user_id))
+            events.publish([f"user:{user_id}"], "friend_added", {"friend_id": friend_id})
+            events.publish([f"user:{friend_id}"], "friend_added", {"friend_id": user_id})
         
         return {"message": f"Friend request {action}ed successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error responding to friend request: {e}")
+        log_event("error", "Error responding to friend request", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/friends")
-async def get_friends(current_user: dict = Depends(get_current_user)):
+async def get_friends(current_user: dict = Depends(get_current_user), users: UserLoader = Depends(UserLoader)):
     """Get user's friends list"""
     try:
         user_id = current_user['uid']
         
-        friendships = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).get()
+        friendships = await run_db(db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).select(["friend_id"]).get)
+        profiles = await users.load_many([doc.to_dict()["friend_id"] for doc in friendships])
         
-        friends = []
-        for doc in friendships:
-            friendship_data = doc.to_dict()
-            friend_data = await get_user_data(friendship_data["friend_id"])
-            if friend_data:
-                friends.append(friend_data)
+        friends = [friend_data for friend_data in profiles.values() if friend_data]
         
         return {"friends": friends}
     except Exception as e:
-        print(f"❌ Error getting friends: {e}")
+        log_event("error", "Error getting friends", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/friends/progress")
-async def get_friends_progress(current_user: dict = Depends(get_current_user)):
+async def get_friends_progress(
+    include_tasks: bool = Query(False, description="Include each friend's task list; without it stats come from the daily rollups"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
     """Get today's progress for all friends"""
     try:
         user_id = current_user['uid']
         today = get_today_date()
         
-        friendships = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).get()
+        friendships = await run_db(db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).select(["friend_id"]).get)
+        friend_ids = [doc.to_dict()["friend_id"] for doc in friendships]
+        task_fields = parse_fields(fields)
+        
+        # Profiles don't depend on the progress reads, and each friend's task query is independent
+        if include_tasks:
+            profiles, task_lists = await asyncio.gather(
+                users.load_many(friend_ids),
+                fan_out(lambda friend_id: run_db(select_fields(get_user_tasks_collection(friend_id, today), task_fields, "completed").get), friend_ids)
+            )
+            summaries = {}
+        else:
+            profiles, summaries = await asyncio.gather(users.load_many(friend_ids), load_daily_summaries(friend_ids, today))
+            task_lists = [None] * len(friend_ids)
         
         friends_progress = []
-        for doc in friendships:
-            friendship_data = doc.to_dict()
-            friend_id = friendship_data["friend_id"]
-            
+        for friend_id, friend_tasks in zip(friend_ids, task_lists):
             # Get friend info
-            friend_data = await get_user_data(friend_id)
+            friend_data = profiles.get(friend_id)
             if not friend_data:
                 continue
             
-            # Get friend's tasks for today
-            friend_tasks = get_user_tasks_collection(friend_id, today).get()
-            
-            tasks = []
-            for task_doc in friend_tasks:
-                task_data = task_doc.to_dict()
-                task_data["id"] = task_doc.id
-                tasks.append(task_data)
+            if not include_tasks:
+                friends_progress.append({"friend": friend_data, "stats": summary_stats(summaries.get(friend_id))})
+                continue
             
-            completed_tasks = len([t for t in tasks if t.get("completed", False)])
-            total_tasks = len(tasks)
-            completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+            completed_tasks = len([doc for doc in friend_tasks if doc.to_dict().get("completed", False)])
+            tasks = [doc_payload(doc, task_fields) for doc in friend_tasks]
             
             friends_progress.append({
                 "friend": friend_data,
                 "tasks": tasks,
-                "stats": {
-                    "total_tasks": total_tasks,
-                    "completed_tasks": completed_tasks,
-                    "completion_percentage": round(completion_percentage)
-                }
+                "stats": progress_stats(len(tasks), completed_tasks)
             })
         
         return {"friends_progress": friends_progress}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error getting friends progress: {e}")
+        log_event("error", "Error getting friends progress", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/friends/{friend_id}")
@@ -535,41 +1726,54 @@ async def remove_friend(friend_id: str, current_user: dict = Depends(get_current
     """Remove a friend relationship in both directions"""
     try:
         user_id = current_user['uid']
-        # Delete current->friend
-        docs1 = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).where(field_path="friend_id", op_string="==", value=friend_id).get()
-        for d in docs1:
-            db.collection("friendships").document(d.id).delete()
-        # Delete friend->current
-        docs2 = db.collection("friendships").where(field_path="user_id", op_string="==", value=friend_id).where(field_path="friend_id", op_string="==", value=user_id).get()
-        for d in docs2:
-            db.collection("friendships").document(d.id).delete()
+        # Both directions are known by ID; read them (uncached) in one round trip so only
+        # edges that exist are deleted and no one hears about a friendship that wasn't there
+        friendship_refs = [get_friendship_ref(user_id, friend_id), get_friendship_ref(friend_id, user_id)]
+        existing = [snap.reference for snap in await get_docs(friendship_refs) if snap.exists]
+        if not existing:
+            raise HTTPException(status_code=404, detail="Friendship not found")
+        batch = db.batch()
+        for ref in existing:
+            batch.delete(ref)
+        await run_db(batch.commit)
+        await doc_cache.invalidate(*existing)
+        events.publish([f"user:{user_id}"], "friend_removed", {"friend_id": friend_id})
+        events.publish([f"user:{friend_id}"], "friend_removed", {"friend_id": user_id})
         return {"message": "Friend removed successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error removing friend: {e}")
+        log_event("error", "Error removing friend", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tasks/friend/{friend_id}")
-async def get_friend_tasks(friend_id: str, current_user: dict = Depends(get_current_user)):
+async def get_friend_tasks(
+    friend_id: str,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """Get today's tasks for a friend (requires friendship) and return as array"""
     try:
         user_id = current_user['uid']
         # Verify friendship
-        friendship = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).where(field_path="friend_id", op_string="==", value=friend_id).limit(1).get()
-        if not friendship:
+        friendship = await doc_cache.get(get_friendship_ref(user_id, friend_id))
+        if not friendship.exists:
             raise HTTPException(status_code=403, detail="Not friends")
         
         today = get_today_date()
-        tasks: List[Dict[str, Any]] = []
-        docs = get_user_tasks_collection(friend_id, today).stream()
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            tasks.append(data)
-        return tasks
+        task_fields = parse_fields(fields)
+        etag = make_etag("tasks", friend_id, today, await get_tasks_version(friend_id, today), task_fields)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        docs = await run_db(select_fields(get_user_tasks_collection(friend_id, today), task_fields).get)
+        return [doc_payload(doc, task_fields) for doc in docs]
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting friend's tasks: {e}")
+        log_event("error", "Error getting friend's tasks", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Group Management
@@ -586,153 +1790,148 @@ async def create_group(group_data: GroupCreate, current_user: dict = Depends(get
             "host_id": user_id,
             "invite_code": invite_code,
             "is_private": group_data.is_private,
+            "member_count": 1,
+            "member_ids": [user_id],
             "created_at": firestore.SERVER_TIMESTAMP
         }
         
-        # Create group
-        group_ref = db.collection("groups").add(group_info)
-        group_id = group_ref[1].id
-        
-        # Add host as first member
+        # Create group with the host as first member
+        group_ref = db.collection("groups").document()
+        group_id = group_ref.id
         member_data = {
             "user_id": user_id,
             "role": "host",
             "joined_at": firestore.SERVER_TIMESTAMP
         }
-        db.collection("groups").document(group_id).collection("members").document(user_id).set(member_data)
-        
-        # Fetch created group to avoid Sentinel in response
-        gdoc = db.collection("groups").document(group_id).get()
-        safe_group = gdoc.to_dict() or {}
-        safe_group["id"] = group_id
-        # Include convenience fields expected by frontend
-        members_docs = db.collection("groups").document(group_id).collection("members").get()
-        safe_group["members"] = [m.get("user_id") for m in [d.to_dict() for d in members_docs] if m]
-        safe_group["member_count"] = len(members_docs)
-        safe_group["host"] = await get_user_data(safe_group.get("host_id"))
+        batch = db.batch()
+        batch.set(group_ref, group_info)
+        batch.set(group_ref.collection("members").document(user_id), member_data)
+        batch.set(get_user_memberships_collection(user_id).document(group_id), membership_index_data(group_id, "host"))
+        # The host profile lookup doesn't depend on the write, so it shares the round trip
+        write_results, host = await asyncio.gather(run_db(batch.commit), get_user_data(user_id))
+        
+        safe_group = group_listing(group_id, created_payload(group_id, group_info, write_results[0].update_time))
+        safe_group["host"] = host
         
         return {"message": "Group created successfully", "group": safe_group}
     except Exception as e:
-        print(f"❌ Error creating group: {e}")
+        log_event("error", "Error creating group", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@firestore.transactional
+@counts_usage
+def join_group_transaction(transaction, group_ref, user_id: str):
+    """Add a member, its index entry and the group's denormalized counters atomically"""
+    member_ref = group_ref.collection("members").document(user_id)
+    if transaction_read(transaction, member_ref.get(transaction=transaction)).exists:
+        raise HTTPException(status_code=400, detail="Already a member of this group")
+    
+    member_data = {
+        "user_id": user_id,
+        "role": "member",
+        "joined_at": firestore.SERVER_TIMESTAMP
+    }
+    transaction.set(member_ref, member_data)
+    transaction.set(get_user_memberships_collection(user_id).document(group_ref.id), membership_index_data(group_ref.id, "member"))
+    transaction.update(group_ref, {
+        "member_count": firestore.Increment(1),
+        "member_ids": firestore.ArrayUnion([user_id])
+    })
+
 @app.post("/api/groups/join")
-async def join_group(invite: InviteCodeRequest, current_user: dict = Depends(get_current_user)):
+@idempotent
+async def join_group(invite: InviteCodeRequest, current_user: dict = Depends(get_current_user), idempotency_key: Optional[str] = Header(None)):
     """Join a group using invite code (accept JSON body)"""
     try:
         user_id = current_user['uid']
         invite_code = invite.invite_code
         
         # Find group by invite code
-        groups = db.collection("groups").where(field_path="invite_code", op_string="==", value=invite_code).limit(1).get()
+        groups = await run_db(db.collection("groups").where(field_path="invite_code", op_string="==", value=invite_code).limit(1).get)
         if not groups:
             raise HTTPException(status_code=404, detail="Invalid invite code")
         
         group_doc = groups[0]
         group_id = group_doc.id
         
-        # Check if already a member
-        existing_member = db.collection("groups").document(group_id).collection("members").document(user_id).get()
-        if existing_member.exists:
-            raise HTTPException(status_code=400, detail="Already a member of this group")
-        
-        # Add as member
-        member_data = {
-            "user_id": user_id,
-            "role": "member",
-            "joined_at": firestore.SERVER_TIMESTAMP
-        }
-        db.collection("groups").document(group_id).collection("members").document(user_id).set(member_data)
+        # Add as member (fails if already a member)
+        await run_db(join_group_transaction, db.transaction(), group_doc.reference, user_id)
+        await doc_cache.invalidate(group_doc.reference, get_group_member_ref(group_id, user_id))
+        events.publish([f"group:{group_id}"], "member_joined", {"group_id": group_id, "user_id": user_id})
+        events.publish([f"user:{user_id}"], "group_joined", {"group_id": group_id})
         
         return {"message": "Successfully joined group", "group_id": group_id}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error joining group: {e}")
+        log_event("error", "Error joining group", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/groups")
-async def get_user_groups(current_user: dict = Depends(get_current_user)):
+async def get_user_groups(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
     """Get all groups user is a member of"""
     try:
         user_id = current_user['uid']
-        groups = []
-        
-        # First, get groups where user is the host
-        hosted_groups = db.collection("groups").where(field_path="host_id", op_string="==", value=user_id).get()
-        
-        for group_doc in hosted_groups:
-            group_data = group_doc.to_dict()
-            group_data["id"] = group_doc.id
-            
-            # Get member ids
-            members = db.collection("groups").document(group_doc.id).collection("members").get()
-            group_data["member_count"] = len(members)
-            group_data["members"] = [m.get("user_id") for m in [d.to_dict() for d in members] if m]
-            
-            # Get host info
-            group_data["host"] = await get_user_data(group_data["host_id"])
-            
-            groups.append(group_data)
-        
-        # Then, get all groups and check if user is a member (less efficient but works without indexes)
-        all_groups = db.collection("groups").get()
-        
-        for group_doc in all_groups:
-            group_id = group_doc.id
-            
-            if any(g["id"] == group_id for g in groups):
-                continue
-            
-            # Check if user is a member of this group
-            try:
-                member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
-                if member_doc.exists:
-                    group_data = group_doc.to_dict()
-                    group_data["id"] = group_id
-                    
-                    members = db.collection("groups").document(group_id).collection("members").get()
-                    group_data["member_count"] = len(members)
-                    group_data["members"] = [m.get("user_id") for m in [d.to_dict() for d in members] if m]
-                    
-                    group_data["host"] = await get_user_data(group_data["host_id"])
-                    
-                    groups.append(group_data)
-            except:
-                continue
         
+        # Read only the caller's own groups from the membership index
+        memberships = await run_db(get_user_memberships_collection(user_id).select(["__name__"]).get)
+        group_refs = [db.collection("groups").document(doc.id) for doc in memberships]
+        group_docs = [group_doc for group_doc in await doc_cache.get_many(group_refs) if group_doc.exists]
+        
+        # The group docs hold every listed field, and host_profile_version stands in for the
+        # host profiles, so a match skips loading them
+        host_versions = [group_doc.to_dict().get("host_profile_version") for group_doc in group_docs]
+        groups = [group_listing(group_doc.id, group_doc.to_dict()) for group_doc in group_docs]
+        etag = make_etag("groups", groups, host_versions)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        
+        # Get host info for every group in one batch
+        hosts = await users.load_many([g.get("host_id") for g in groups])
+        for group_data in groups:
+            group_data["host"] = hosts.get(group_data.get("host_id"))
+        
+        set_etag(response, etag)
         return {"groups": groups}
     except Exception as e:
-        print(f"❌ Error getting user groups: {e}")
+        log_event("error", "Error getting user groups", error=str(e))
         # Return empty groups instead of 500 error
         return {"groups": []}
 
 @app.get("/api/groups/{group_id}")
-async def get_group_details(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_group_details(group_id: str, current_user: dict = Depends(get_current_user), users: UserLoader = Depends(UserLoader)):
     """Get detailed group information"""
     try:
         user_id = current_user['uid']
         
-        # Verify user is a member
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        # Verify membership with one (cached) read before loading every member
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
-        # Get group info
-        group_doc = db.collection("groups").document(group_id).get()
+        # Get group info and members (roles and join dates live on the member docs)
+        group_doc, member_docs = await asyncio.gather(
+            doc_cache.get(db.collection("groups").document(group_id)),
+            run_db(db.collection("groups").document(group_id).collection("members").get)
+        )
+        members = [doc.to_dict() for doc in member_docs]
         if not group_doc.exists:
             raise HTTPException(status_code=404, detail="Group not found")
         
         group_data = group_doc.to_dict()
         group_data["id"] = group_id
+        group_data.pop("member_ids", None)
+        for version in GROUP_VERSION_FIELDS:
+            group_data.pop(version, None)
         
-        # Get members
-        member_docs = db.collection("groups").document(group_id).collection("members").get()
-        members = []
-        for doc in member_docs:
-            member_data = doc.to_dict()
-            member_data["user"] = await get_user_data(member_data["user_id"])
-            members.append(member_data)
+        profiles = await users.load_many([m["user_id"] for m in members])
+        for member_data in members:
+            member_data["user"] = profiles.get(member_data["user_id"])
         
         group_data["members"] = members
         group_data["member_count"] = len(members)
@@ -741,24 +1940,40 @@ async def get_group_details(group_id: str, current_user: dict = Depends(get_curr
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting group details: {e}")
+        log_event("error", "Error getting group details", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/groups/{group_id}/members")
-async def get_group_members(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_group_members(
+    group_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
     """Return list of group members (as array)"""
     try:
         user_id = current_user['uid']
         # Verify membership
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
-        member_docs = db.collection("groups").document(group_id).collection("members").get()
+        # The group doc lists its members; groups predating member_ids fall back to the subcollection
+        group_doc = await doc_cache.get(db.collection("groups").document(group_id))
+        group = (group_doc.to_dict() or {}) if group_doc.exists else {}
+        member_ids = group.get("member_ids")
+        if member_ids is None:
+            member_docs = await run_db(db.collection("groups").document(group_id).collection("members").select(["user_id"]).get)
+            member_ids = [doc.to_dict()["user_id"] for doc in member_docs]
+        
+        # Every profile edit sets updated_at, so with the member IDs it validates the list
+        profiles = await users.load_many(member_ids)
+        etag = make_etag("group_members", group_id, member_ids, users.versions(member_ids))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         members = []
-        for doc in member_docs:
-            data = doc.to_dict()
-            u = await get_user_data(data["user_id"])
+        for u in profiles.values():
             if u:
                 members.append({
                     "id": u["id"],
@@ -766,44 +1981,67 @@ async def get_group_members(group_id: str, current_user: dict = Depends(get_curr
                     "display_name": u.get("display_name"),
                     "username": u.get("username")
                 })
+        
+        set_etag(response, etag)
         return members
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting group members: {e}")
+        log_event("error", "Error getting group members", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@firestore.transactional
+@counts_usage
+def leave_group_transaction(transaction, group_ref, user_id: str):
+    """Remove a member, its index entry and update the group's counters atomically.
+    Returns True when the host left and the group itself was deleted; raises 404 for non-members."""
+    group_doc = transaction_read(transaction, group_ref.get(transaction=transaction))
+    if not group_doc.exists:
+        raise HTTPException(status_code=404, detail="Group not found")
+    group = group_doc.to_dict()
+    member_ref = group_ref.collection("members").document(user_id)
+    index_ref = get_user_memberships_collection(user_id).document(group_ref.id)
+    
+    if group.get("host_id") == user_id:
+        member_count = group.get("member_count")
+        if member_count is None:
+            # Group predates the denormalized counters (see manage.py repair-group-counters)
+            member_count = len(transaction_read(transaction, list(transaction.get(group_ref.collection("members").select(["__name__"]).limit(2)))))
+        if member_count > 1:
+            raise HTTPException(status_code=400, detail="Host cannot leave while other members remain")
+        # Single-member group: delete membership and group
+        transaction.delete(member_ref)
+        transaction.delete(index_ref)
+        transaction.delete(group_ref)
+        return True
+    
+    if not transaction_read(transaction, member_ref.get(transaction=transaction)).exists:
+        raise HTTPException(status_code=404, detail="Not a member of this group")
+    transaction.delete(member_ref)
+    transaction.delete(index_ref)
+    transaction.update(group_ref, {
+        "member_count": firestore.Increment(-1),
+        "member_ids": firestore.ArrayRemove([user_id])
+    })
+    return False
+
 @app.post("/api/groups/{group_id}/leave")
 async def leave_group(group_id: str, current_user: dict = Depends(get_current_user)):
     """Leave a group. Host cannot leave if other members remain."""
     try:
         user_id = current_user['uid']
         group_ref = db.collection("groups").document(group_id)
-        group_doc = group_ref.get()
-        if not group_doc.exists:
-            raise HTTPException(status_code=404, detail="Group not found")
-        group = group_doc.to_dict()
-        
-        if group.get("host_id") == user_id:
-            # Count members
-            members = db.collection("groups").document(group_id).collection("members").get()
-            if len(members) > 1:
-                raise HTTPException(status_code=400, detail="Host cannot leave while other members remain")
-            # Single-member group: delete membership and group
-            try:
-                db.collection("groups").document(group_id).collection("members").document(user_id).delete()
-            except Exception:
-                pass
-            group_ref.delete()
+        deleted = await run_db(leave_group_transaction, db.transaction(), group_ref, user_id)
+        await doc_cache.invalidate(group_ref, get_group_member_ref(group_id, user_id))
+        events.publish([f"user:{user_id}"], "group_left", {"group_id": group_id})
+        events.publish([f"group:{group_id}"], "member_left", {"group_id": group_id, "user_id": user_id})
+        if deleted:
             return {"message": "Group deleted"}
-        
-        # Remove member entry
-        db.collection("groups").document(group_id).collection("members").document(user_id).delete()
         return {"message": "Left group successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error leaving group: {e}")
+        log_event("error", "Error leaving group", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Enhanced Task Management
@@ -815,6 +2053,12 @@ async def create_task(task: TaskCreate, current_user: dict = Depends(get_current
         user_id = await ensure_user_exists(current_user)
         today = get_today_date()
         
+        # Group tasks are published to the group's streams, so only its members may tag one
+        if task.group_id:
+            member_doc = await doc_cache.get(get_group_member_ref(task.group_id, user_id))
+            if not member_doc.exists:
+                raise HTTPException(status_code=403, detail="Not a member of this group")
+        
         task_data = {
             "title": task.title,
             "description": task.description,
@@ -825,37 +2069,67 @@ async def create_task(task: TaskCreate, current_user: dict = Depends(get_current
             "group_id": task.group_id
         }
         
-        doc_ref = get_user_tasks_collection(user_id, today).add(task_data)
-        # Fetch created doc to avoid Sentinel in response
-        new_doc = get_user_tasks_collection(user_id, today).document(doc_ref[1].id).get()
-        created_task = new_doc.to_dict() or {}
-        created_task["id"] = new_doc.id
+        task_ref = get_user_tasks_collection(user_id, today).document()
+        batch = db.batch()
+        batch.set(task_ref, task_data)
+        record_progress(batch, user_id, today, task.group_id, total=1)
+        write_results = await run_db(batch.commit)
+        created_task = created_payload(task_ref.id, task_data, write_results[0].update_time)
+        publish_task_event("task_created", user_id, task.group_id, {"task": created_task})
         
         return {"message": "Task created successfully", "task": created_task}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error creating task: {e}")
+        log_event("error", "Error creating task", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tasks/today")
-async def get_today_tasks(current_user: dict = Depends(get_current_user)):
+async def get_today_tasks(
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """Get all personal tasks for today"""
     try:
         user_id = current_user['uid']
         today = get_today_date()
+        task_fields = parse_fields(fields)
         
-        tasks = []
-        docs = get_user_tasks_collection(user_id, today).stream()
+        etag = make_etag("tasks", user_id, today, await get_tasks_version(user_id, today), task_fields)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
         
-        for doc in docs:
-            task_data = doc.to_dict()
-            task_data["id"] = doc.id
-            tasks.append(task_data)
+        docs = await run_db(select_fields(get_user_tasks_collection(user_id, today), task_fields).get)
+        tasks = [doc_payload(doc, task_fields) for doc in docs]
         
         return {"tasks": tasks, "date": today}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error getting today's tasks: {e}")
+        log_event("error", "Error getting today's tasks", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@firestore.transactional
+@counts_usage
+def update_task_transaction(transaction, user_id: str, date: str, task_id: str, completed: bool):
+    """Toggle a task and move the rollups' completed count by the same amount"""
+    task_ref = get_user_tasks_collection(user_id, date).document(task_id)
+    task_doc = transaction_read(transaction, task_ref.get(transaction=transaction))
+    if not task_doc.exists:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task = task_doc.to_dict()
+    
+    transaction.update(task_ref, {
+        "completed": completed,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    })
+    change = (1 if completed else -1) if bool(task.get("completed", False)) != completed else 0
+    record_progress(transaction, user_id, date, task.get("group_id"), completed=change)
+    return task.get("group_id")
+
 @app.put("/api/tasks/{task_id}")
 async def update_task(task_id: str, task_update: TaskUpdate, current_user: dict = Depends(get_current_user)):
     """Update a task (mark as completed/incomplete)"""
@@ -863,24 +2137,30 @@ async def update_task(task_id: str, task_update: TaskUpdate, current_user: dict
         user_id = current_user['uid']
         today = get_today_date()
         
-        task_ref = get_user_tasks_collection(user_id, today).document(task_id)
-        task_doc = task_ref.get()
-        
-        if not task_doc.exists:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        task_ref.update({
-            "completed": task_update.completed,
-            "updated_at": firestore.SERVER_TIMESTAMP
-        })
+        group_id = await run_db(update_task_transaction, db.transaction(), user_id, today, task_id, task_update.completed)
+        publish_task_event("task_updated", user_id, group_id, {"task_id": task_id, "completed": task_update.completed})
         
         return {"message": "Task updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error updating task: {e}")
+        log_event("error", "Error updating task", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@firestore.transactional
+@counts_usage
+def delete_task_transaction(transaction, user_id: str, date: str, task_id: str):
+    """Delete a task and take it back out of the rollups"""
+    task_ref = get_user_tasks_collection(user_id, date).document(task_id)
+    task_doc = transaction_read(transaction, task_ref.get(transaction=transaction))
+    if not task_doc.exists:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task = task_doc.to_dict()
+    
+    transaction.delete(task_ref)
+    record_progress(transaction, user_id, date, task.get("group_id"), total=-1, completed=-1 if task.get("completed") else 0)
+    return task.get("group_id")
+
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a task"""
@@ -888,18 +2168,159 @@ async def delete_task(task_id: str, current_user: dict = Depends(get_current_use
         user_id = current_user['uid']
         today = get_today_date()
         
-        task_ref = get_user_tasks_collection(user_id, today).document(task_id)
-        task_doc = task_ref.get()
-        
-        if not task_doc.exists:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        task_ref.delete()
+        group_id = await run_db(delete_task_transaction, db.transaction(), user_id, today, task_id)
+        publish_task_event("task_deleted", user_id, group_id, {"task_id": task_id})
         return {"message": "Task deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error deleting task: {e}")
+        log_event("error", "Error deleting task", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Firestore caps a commit at 500 writes; each chunk also carries its two rollup writes
+BATCH_WRITE_LIMIT = 500
+TASK_BATCH_CHUNK_SIZE = BATCH_WRITE_LIMIT - 2
+
+def batch_result(index: int, op: str, status_code: int, **fields):
+    return {"index": index, "op": op, "ok": status_code < 400, "status_code": status_code, **fields}
+
+def validate_task_operation(index: int, operation: TaskOperation):
+    """Per-item validation, so one bad entry doesn't reject the whole batch"""
+    if operation.op == "create":
+        try:
+            TaskCreate(title=operation.title, description=operation.description, priority=operation.priority, group_id=operation.group_id)
+        except ValidationError as e:
+            return batch_result(index, operation.op, 400, task_id=None, error=e.errors()[0]["msg"])
+    elif not operation.task_id:
+        return batch_result(index, operation.op, 400, task_id=None, error="task_id is required")
+    elif operation.op == "update" and operation.completed is None:
+        return batch_result(index, operation.op, 400, task_id=operation.task_id, error="completed is required")
+    return None
+
+def apply_task_operations(writer, user_id: str, date: str, items: List[tuple], snapshots: Dict[str, Any], created_at=firestore.SERVER_TIMESTAMP):
+    """Queue a chunk of (index, TaskOperation) onto writer with one combined rollup update.
+    snapshots holds the current update/delete targets; later items see earlier items' effects."""
+    tasks_collection = get_user_tasks_collection(user_id, date)
+    current = {task_id: snap.to_dict() for task_id, snap in snapshots.items() if snap.exists}
+    deltas: Dict[Optional[str], list] = {}
+    results = []
+    
+    def track(group_id, total, completed):
+        delta = deltas.setdefault(group_id, [0, 0])
+        delta[0] += total
+        delta[1] += completed
+    
+    for index, operation in items:
+        if operation.op == "create":
+            task_ref = tasks_collection.document()
+            task_data = {
+                "title": operation.title,
+                "description": operation.description,
+                "priority": operation.priority,
+                "completed": False,
+                "created_at": created_at,
+                "user_id": user_id,
+                "group_id": operation.group_id
+            }
+            writer.set(task_ref, task_data)
+            track(operation.group_id, 1, 0)
+            results.append(batch_result(index, "create", 201, task_id=task_ref.id, group_id=operation.group_id, task={**task_data, "id": task_ref.id}))
+            continue
+        
+        task = current.get(operation.task_id)
+        if task is None:
+            results.append(batch_result(index, operation.op, 404, task_id=operation.task_id, error="Task not found"))
+            continue
+        task_ref = tasks_collection.document(operation.task_id)
+        group_id = task.get("group_id")
+        if operation.op == "update":
+            writer.update(task_ref, {"completed": operation.completed, "updated_at": firestore.SERVER_TIMESTAMP})
+            if bool(task.get("completed", False)) != operation.completed:
+                track(group_id, 0, 1 if operation.completed else -1)
+            task["completed"] = operation.completed
+            results.append(batch_result(index, "update", 200, task_id=operation.task_id, group_id=group_id, completed=operation.completed))
+        else:
+            writer.delete(task_ref)
+            track(group_id, -1, -1 if task.get("completed") else 0)
+            del current[operation.task_id]
+            results.append(batch_result(index, "delete", 200, task_id=operation.task_id, group_id=group_id))
+    
+    record_progress_many(writer, user_id, date, {gid: tuple(delta) for gid, delta in deltas.items()})
+    return results
+
+@firestore.transactional
+@counts_usage
+def task_batch_transaction(transaction, user_id: str, date: str, items: List[tuple], created_at: datetime):
+    """Read every update/delete target in one round-trip, then apply the chunk atomically.
+    The transactional wrapper doesn't expose its commit time, so creates are stamped with created_at."""
+    tasks_collection = get_user_tasks_collection(user_id, date)
+    task_ids = list(dict.fromkeys(operation.task_id for _, operation in items if operation.op != "create"))
+    snapshots = {snap.id: snap for snap in transaction_read(transaction, list(transaction.get_all([tasks_collection.document(task_id) for task_id in task_ids])))}
+    return apply_task_operations(transaction, user_id, date, items, snapshots, created_at)
+
+@app.post("/api/tasks/batch")
+async def batch_tasks(batch: TaskBatch, current_user: dict = Depends(get_current_user)):
+    """Create, complete and delete many of today's tasks in one request, with a result per item"""
+    try:
+        user_id = await ensure_user_exists(current_user)
+        today = get_today_date()
+        
+        results = []
+        pending = []
+        for index, operation in enumerate(batch.operations):
+            invalid = validate_task_operation(index, operation)
+            if invalid:
+                results.append(invalid)
+            else:
+                pending.append((index, operation))
+        
+        # As in create_task, a create may only tag a group the caller belongs to
+        group_ids = list(dict.fromkeys(operation.group_id for _, operation in pending if operation.op == "create" and operation.group_id))
+        if group_ids:
+            member_docs = await doc_cache.get_many([get_group_member_ref(group_id, user_id) for group_id in group_ids])
+            member_of = {group_id for group_id, member_doc in zip(group_ids, member_docs) if member_doc.exists}
+            allowed = []
+            for index, operation in pending:
+                if operation.op == "create" and operation.group_id and operation.group_id not in member_of:
+                    results.append(batch_result(index, operation.op, 403, task_id=None, error="Not a member of this group"))
+                else:
+                    allowed.append((index, operation))
+            pending = allowed
+        
+        for start in range(0, len(pending), TASK_BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + TASK_BATCH_CHUNK_SIZE]
+            try:
+                if all(operation.op == "create" for _, operation in chunk):
+                    # Nothing to read, so a plain WriteBatch is enough
+                    writer = db.batch()
+                    chunk_results = apply_task_operations(writer, user_id, today, chunk, {})
+                    committed_at = (await run_db(writer.commit))[0].update_time
+                else:
+                    # Stored and reported creation times must match, so stamp them here
+                    committed_at = datetime.now(timezone.utc)
+                    chunk_results = await run_db(task_batch_transaction, db.transaction(), user_id, today, chunk, committed_at)
+            except Exception as e:
+                log_event("error", "Error committing task batch chunk", error=str(e))
+                results.extend(batch_result(index, operation.op, 500, task_id=operation.task_id, error=str(e)) for index, operation in chunk)
+                continue
+            
+            for result in chunk_results:
+                if not result["ok"]:
+                    continue
+                if result["op"] == "create":
+                    result["task"]["created_at"] = committed_at
+                    publish_task_event("task_created", user_id, result["group_id"], {"task": result["task"]})
+                elif result["op"] == "update":
+                    publish_task_event("task_updated", user_id, result["group_id"], {"task_id": result["task_id"], "completed": result["completed"]})
+                else:
+                    publish_task_event("task_deleted", user_id, result["group_id"], {"task_id": result["task_id"]})
+            results.extend(chunk_results)
+        
+        results.sort(key=lambda result: result["index"])
+        succeeded = sum(1 for result in results if result["ok"])
+        return {"message": f"{succeeded} of {len(results)} operations applied", "results": results, "date": today}
+    except Exception as e:
+        log_event("error", "Error applying task batch", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Group Task Management
@@ -910,7 +2331,7 @@ async def create_group_task(group_id: str, task: GroupTaskCreate, current_user:
         user_id = current_user['uid']
         
         # Verify user is group host
-        group_doc = db.collection("groups").document(group_id).get()
+        group_doc = await doc_cache.get(db.collection("groups").document(group_id))
         if not group_doc.exists:
             raise HTTPException(status_code=404, detail="Group not found")
         
@@ -927,17 +2348,22 @@ async def create_group_task(group_id: str, task: GroupTaskCreate, current_user:
             "created_at": firestore.SERVER_TIMESTAMP
         }
         
-        doc_ref = db.collection("groups").document(group_id).collection("tasks").add(task_data)
-        # Fetch created doc to avoid Sentinel
-        new_doc = db.collection("groups").document(group_id).collection("tasks").document(doc_ref[1].id).get()
-        created_task = new_doc.to_dict() or {}
-        created_task["id"] = new_doc.id
+        # The group doc's tasks_version is the ETag validator for the group's task list
+        group_ref = db.collection("groups").document(group_id)
+        task_ref = group_ref.collection("tasks").document()
+        batch = db.batch()
+        batch.set(task_ref, task_data)
+        batch.update(group_ref, {"tasks_version": firestore.Increment(1)})
+        write_results = await run_db(batch.commit)
+        await doc_cache.invalidate(group_ref)
+        created_task = created_payload(task_ref.id, task_data, write_results[0].update_time)
+        events.publish([f"group:{group_id}"], "group_task_created", {"group_id": group_id, "task": created_task})
         
         return {"message": "Group task created successfully", "task": created_task}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error creating group task: {e}")
+        log_event("error", "Error creating group task", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/groups/{group_id}/tasks/{task_id}")
@@ -945,14 +2371,14 @@ async def update_group_task(group_id: str, task_id: str, task_update: GroupTaskU
     """Update a group task (host only)."""
     try:
         user_id = current_user['uid']
-        group_doc = db.collection("groups").document(group_id).get()
+        group_doc = await doc_cache.get(db.collection("groups").document(group_id))
         if not group_doc.exists:
             raise HTTPException(status_code=404, detail="Group not found")
         if group_doc.to_dict().get("host_id") != user_id:
             raise HTTPException(status_code=403, detail="Only group host can update group tasks")
         
         task_ref = db.collection("groups").document(group_id).collection("tasks").document(task_id)
-        task_doc = task_ref.get()
+        task_doc = await run_db(task_ref.get)
         if not task_doc.exists:
             raise HTTPException(status_code=404, detail="Task not found")
         
@@ -967,15 +2393,18 @@ async def update_group_task(group_id: str, task_id: str, task_update: GroupTaskU
             return {"message": "No changes"}
         update_data["updated_at"] = firestore.SERVER_TIMESTAMP
         
-        task_ref.update(update_data)
-        new_doc = task_ref.get()
-        task_data = new_doc.to_dict()
-        task_data["id"] = new_doc.id
+        batch = db.batch()
+        batch.update(task_ref, update_data)
+        batch.update(group_doc.reference, {"tasks_version": firestore.Increment(1)})
+        write_results = await run_db(batch.commit)
+        await doc_cache.invalidate(group_doc.reference)
+        task_data = created_payload(task_id, {**task_doc.to_dict(), **update_data}, write_results[0].update_time)
+        events.publish([f"group:{group_id}"], "group_task_updated", {"group_id": group_id, "task": task_data})
         return {"message": "Group task updated", "task": task_data}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error updating group task: {e}")
+        log_event("error", "Error updating group task", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/groups/{group_id}/tasks/{task_id}")
@@ -983,102 +2412,133 @@ async def delete_group_task(group_id: str, task_id: str, current_user: dict = De
     """Delete a group task (host only)."""
     try:
         user_id = current_user['uid']
-        group_doc = db.collection("groups").document(group_id).get()
+        group_doc = await doc_cache.get(db.collection("groups").document(group_id))
         if not group_doc.exists:
             raise HTTPException(status_code=404, detail="Group not found")
         if group_doc.to_dict().get("host_id") != user_id:
             raise HTTPException(status_code=403, detail="Only group host can delete group tasks")
         
         task_ref = db.collection("groups").document(group_id).collection("tasks").document(task_id)
-        task_doc = task_ref.get()
+        task_doc = await run_db(task_ref.get)
         if not task_doc.exists:
             raise HTTPException(status_code=404, detail="Task not found")
-        task_ref.delete()
+        batch = db.batch()
+        batch.delete(task_ref)
+        batch.update(group_doc.reference, {"tasks_version": firestore.Increment(1)})
+        await run_db(batch.commit)
+        await doc_cache.invalidate(group_doc.reference)
+        events.publish([f"group:{group_id}"], "group_task_deleted", {"group_id": group_id, "task_id": task_id})
         return {"message": "Group task deleted"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error deleting group task: {e}")
+        log_event("error", "Error deleting group task", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/groups/{group_id}/tasks")
-async def get_group_tasks(group_id: str, current_user: dict = Depends(get_current_user)):
-    """Get all tasks for a group"""
+async def get_group_tasks(
+    group_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=PAGE_MAX_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a group's tasks, oldest first, a page at a time"""
     try:
         user_id = current_user['uid']
         
         # Verify user is group member
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
-        tasks = []
-        task_docs = db.collection("groups").document(group_id).collection("tasks").get()
-        
-        for doc in task_docs:
-            task_data = doc.to_dict()
-            task_data["id"] = doc.id
-            tasks.append(task_data)
-        
-        return {"tasks": tasks, "group_id": group_id}
+        # Every group task write bumps the group doc's tasks_version; read it uncached
+        task_fields = parse_fields(fields)
+        group_doc = await run_db(db.collection("groups").document(group_id).get)
+        tasks_version = (group_doc.to_dict() or {}).get("tasks_version") if group_doc.exists else None
+        etag = make_etag("group_tasks", group_id, tasks_version, limit, cursor, task_fields)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        
+        # The cursor is built from created_at, so a projection always fetches it
+        task_query = select_fields(db.collection("groups").document(group_id).collection("tasks"), task_fields, "created_at")
+        task_docs, next_cursor = await fetch_page(task_query, "created_at", firestore.Query.ASCENDING, limit, cursor)
+        tasks = [doc_payload(doc, task_fields) for doc in task_docs]
+        
+        return {"tasks": tasks, "group_id": group_id, "next_cursor": next_cursor}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting group tasks: {e}")
+        log_event("error", "Error getting group tasks", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/groups/{group_id}/progress")
-async def get_group_progress(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_group_progress(
+    group_id: str,
+    include_tasks: bool = Query(False, description="Include each member's task list; without it stats come from the daily rollups"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
     """Get progress of all group members on group tasks"""
     try:
         user_id = current_user['uid']
+        today = get_today_date()
         
-        # Verify user is group member
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        # Verify membership with one (cached) read before loading the group's members and tasks
+        task_fields = parse_fields(fields)
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
-        today = get_today_date()
-        
-        # Get all group members
-        member_docs = db.collection("groups").document(group_id).collection("members").get()
-        
-        # Get group tasks
-        group_task_docs = db.collection("groups").document(group_id).collection("tasks").get()
-        group_tasks = [{"id": doc.id, **doc.to_dict()} for doc in group_task_docs]
+        group_ref = db.collection("groups").document(group_id)
+        member_docs, group_task_docs = await asyncio.gather(
+            run_db(group_ref.collection("members").select(["user_id", "role"]).get),
+            run_db(select_fields(group_ref.collection("tasks"), task_fields).get)
+        )
+        member_ids = [doc.to_dict()["user_id"] for doc in member_docs]
+        group_tasks = [doc_payload(doc, task_fields) for doc in group_task_docs]
+        
+        # Each member's task query is independent of the others and of the profile lookup
+        if include_tasks:
+            profiles, task_lists = await asyncio.gather(
+                users.load_many(member_ids),
+                fan_out(lambda member_id: run_db(select_fields(get_user_tasks_collection(member_id, today).where(field_path="group_id", op_string="==", value=group_id), task_fields, "completed").get), member_ids)
+            )
+            summaries = {}
+        else:
+            profiles, summaries = await asyncio.gather(users.load_many(member_ids), load_daily_summaries(member_ids, today))
+            task_lists = [None] * len(member_ids)
         
         members_progress = []
-        for member_doc in member_docs:
+        for member_doc, member_tasks in zip(member_docs, task_lists):
             member_data = member_doc.to_dict()
             member_id = member_data["user_id"]
             
             # Get member info
-            member_info = await get_user_data(member_id)
+            member_info = profiles.get(member_id)
             if not member_info:
                 continue
             
-            # Get member's personal tasks that are related to group tasks
-            member_tasks = get_user_tasks_collection(member_id, today).where(field_path="group_id", op_string="==", value=group_id).get()
-            
-            tasks = []
-            for task_doc in member_tasks:
-                task_data = task_doc.to_dict()
-                task_data["id"] = task_doc.id
-                tasks.append(task_data)
+            if not include_tasks:
+                members_progress.append({
+                    "member": member_info,
+                    "role": member_data["role"],
+                    "stats": summary_stats(summaries.get(member_id), group_id)
+                })
+                continue
             
-            completed_tasks = len([t for t in tasks if t.get("completed", False)])
-            total_tasks = len(tasks)
-            completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+            completed_tasks = len([doc for doc in member_tasks if doc.to_dict().get("completed", False)])
+            tasks = [doc_payload(doc, task_fields) for doc in member_tasks]
             
             members_progress.append({
                 "member": member_info,
                 "role": member_data["role"],
                 "tasks": tasks,
-                "stats": {
-                    "total_tasks": total_tasks,
-                    "completed_tasks": completed_tasks,
-                    "completion_percentage": round(completion_percentage)
-                }
+                "stats": progress_stats(len(tasks), completed_tasks)
             })
         
         return {
@@ -1089,7 +2549,7 @@ async def get_group_progress(group_id: str, current_user: dict = Depends(get_cur
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting group progress: {e}")
+        log_event("error", "Error getting group progress", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Enhanced Motivational Notes
@@ -1108,15 +2568,14 @@ async def send_motivational_note(body: MotivationalNoteBody, current_user: dict
         # Verify relationship (friend or group member)
         if group_id:
             # Check if both users are in the same group
-            sender_member = db.collection("groups").document(group_id).collection("members").document(user_id).get()
-            recipient_member = db.collection("groups").document(group_id).collection("members").document(to_user_id).get()
+            sender_member, recipient_member = await doc_cache.get_many([get_group_member_ref(group_id, user_id), get_group_member_ref(group_id, to_user_id)])
             
             if not (sender_member.exists and recipient_member.exists):
                 raise HTTPException(status_code=403, detail="Both users must be in the same group")
         else:
             # Check if users are friends
-            friendship = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).where(field_path="friend_id", op_string="==", value=to_user_id).limit(1).get()
-            if not friendship:
+            friendship = await doc_cache.get(get_friendship_ref(user_id, to_user_id))
+            if not friendship.exists:
                 raise HTTPException(status_code=403, detail="Can only send notes to friends")
         
         note_data = {
@@ -1128,17 +2587,15 @@ async def send_motivational_note(body: MotivationalNoteBody, current_user: dict
             "created_at": firestore.SERVER_TIMESTAMP
         }
         
-        doc_ref = db.collection("motivational_notes").add(note_data)
-        # Fetch created note to avoid Sentinel
-        new_doc = db.collection("motivational_notes").document(doc_ref[1].id).get()
-        note_payload = new_doc.to_dict() or {}
-        note_payload["id"] = new_doc.id
+        write_time, doc_ref = await run_db(db.collection("motivational_notes").add, note_data)
+        note_payload = created_payload(doc_ref.id, note_data, write_time)
+        events.publish([f"user:{to_user_id}"], "motivational_note", {"note": note_payload})
         
         return {"message": "Motivational note sent successfully", "note": note_payload}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error sending motivational note: {e}")
+        log_event("error", "Error sending motivational note", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/motivational-notes/{note_id}/read")
@@ -1147,45 +2604,107 @@ async def mark_note_as_read(note_id: str, current_user: dict = Depends(get_curre
     try:
         user_id = current_user['uid']
         note_ref = db.collection("motivational_notes").document(note_id)
-        note_doc = note_ref.get()
+        note_doc = await run_db(note_ref.get)
         if not note_doc.exists:
             raise HTTPException(status_code=404, detail="Note not found")
         note = note_doc.to_dict()
         if note.get("to_user_id") != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to mark this note")
-        note_ref.update({"read": True, "updated_at": firestore.SERVER_TIMESTAMP})
+        await run_db(note_ref.update, {"read": True, "updated_at": firestore.SERVER_TIMESTAMP})
         return {"message": "Note marked as read"}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error marking note as read: {e}")
+        log_event("error", "Error marking note as read", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/motivational-notes")
-async def get_motivational_notes(current_user: dict = Depends(get_current_user)):
-    """Get motivational notes for current user"""
+async def get_motivational_notes(
+    limit: int = Query(50, ge=1, le=PAGE_MAX_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
+    """Get motivational notes for current user, newest first"""
     try:
         user_id = current_user['uid']
         
         notes = []
-        note_docs = db.collection("motivational_notes").where(field_path="to_user_id", op_string="==", value=user_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(50).get()
+        note_docs, next_cursor = await fetch_page(db.collection("motivational_notes").where(field_path="to_user_id", op_string="==", value=user_id), "created_at", firestore.Query.DESCENDING, limit, cursor)
+        
+        # Get sender info in one batch
+        senders = await users.load_many([doc.to_dict()["from_user_id"] for doc in note_docs])
         
         for doc in note_docs:
             note_data = doc.to_dict()
             note_data["id"] = doc.id
-            
-            # Get sender info
-            sender_info = await get_user_data(note_data["from_user_id"])
-            note_data["from_user"] = sender_info
+            note_data["from_user"] = senders.get(note_data["from_user_id"])
             
             notes.append(note_data)
         
-        return {"notes": notes}
+        return {"notes": notes, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error getting motivational notes: {e}")
+        log_event("error", "Error getting motivational notes", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+DASHBOARD_SECTIONS = ("profile", "tasks", "friends_progress", "groups", "notes")
+
+@app.get("/api/dashboard")
+async def get_dashboard(
+    sections: Optional[str] = Query(None, description=f"Comma-separated sections to build, any of {', '.join(DASHBOARD_SECTIONS)}; omit for all"),
+    include_tasks: bool = Query(False, description="Include each friend's task list in friends_progress"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    notes_limit: int = Query(50, ge=1, le=PAGE_MAX_SIZE),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
+    """The home screen in one request: each section is the body its own endpoint returns"""
+    try:
+        wanted = list(dict.fromkeys(name.strip() for name in sections.split(",") if name.strip())) if sections is not None else list(DASHBOARD_SECTIONS)
+        unknown = [name for name in wanted if name not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown dashboard sections: {', '.join(unknown)}")
+        
+        # Sections are independent, so they're built concurrently; they share one
+        # authenticated user and one UserLoader, so each profile is read once
+        builders = {
+            "profile": lambda: get_user_profile(current_user=current_user),
+            "tasks": lambda: get_today_tasks(response=Response(), fields=fields, if_none_match=None, current_user=current_user),
+            "friends_progress": lambda: get_friends_progress(include_tasks=include_tasks, fields=fields, current_user=current_user, users=users),
+            "groups": lambda: get_user_groups(response=Response(), if_none_match=None, current_user=current_user, users=users),
+            "notes": lambda: get_motivational_notes(limit=notes_limit, cursor=None, current_user=current_user, users=users),
+        }
+        results = await asyncio.gather(*(builders[name]() for name in wanted))
+        
+        return dict(zip(wanted, results))
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_event("error", "Error building dashboard", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 # Group Messaging
+async def post_group_message(group_id: str, user_id: str, text: str):
+    """Store a chat message and broadcast it, with its sender's profile, to the group's live clients"""
+    message_data = {
+        "user_id": user_id,
+        "message": text,
+        "group_id": group_id,
+        "created_at": firestore.SERVER_TIMESTAMP
+    }
+    
+    # The sender profile lookup doesn't depend on the write, so it shares the round trip
+    (write_time, doc_ref), sender = await asyncio.gather(
+        run_db(db.collection("groups").document(group_id).collection("messages").add, message_data),
+        get_user_data(user_id)
+    )
+    message_payload = created_payload(doc_ref.id, message_data, write_time)
+    message_payload["user"] = sender
+    events.publish([f"group:{group_id}"], "group_message", {"group_message": message_payload})
+    return message_payload
+
 @app.post("/api/groups/{group_id}/messages")
 async def send_group_message(group_id: str, body: MessageBody, current_user: dict = Depends(get_current_user)):
     """Send a message to group chat (accept JSON body)"""
@@ -1193,93 +2712,562 @@ async def send_group_message(group_id: str, body: MessageBody, current_user: dic
         user_id = current_user['uid']
         
         # Verify user is group member
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
-        message_data = {
-            "user_id": user_id,
-            "message": body.message,
-            "group_id": group_id,
-            "created_at": firestore.SERVER_TIMESTAMP
-        }
-        
-        doc_ref = db.collection("groups").document(group_id).collection("messages").add(message_data)
-        # Fetch created doc to avoid Sentinel
-        new_doc = db.collection("groups").document(group_id).collection("messages").document(doc_ref[1].id).get()
-        message_payload = new_doc.to_dict() or {}
-        message_payload["id"] = new_doc.id
-        message_payload["user"] = await get_user_data(user_id)
+        message_payload = await post_group_message(group_id, user_id, body.message)
         
         return {"message": "Message sent successfully", "group_message": message_payload}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error sending group message: {e}")
+        log_event("error", "Error sending group message", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/groups/{group_id}/messages")
-async def get_group_messages(group_id: str, limit: int = 50, current_user: dict = Depends(get_current_user)):
-    """Get group chat messages"""
+async def get_group_messages(
+    group_id: str,
+    limit: int = Query(50, ge=1, le=PAGE_MAX_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page, for older messages"),
+    current_user: dict = Depends(get_current_user),
+    users: UserLoader = Depends(UserLoader)
+):
+    """Get a page of group chat messages (newest page first, chronological within a page)"""
     try:
         user_id = current_user['uid']
         
         # Verify user is group member
-        member_doc = db.collection("groups").document(group_id).collection("members").document(user_id).get()
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
         if not member_doc.exists:
             raise HTTPException(status_code=403, detail="Not a member of this group")
         
         messages = []
-        message_docs = db.collection("groups").document(group_id).collection("messages").order_by("created_at", direction=firestore.Query.DESCENDING).limit(limit).get()
+        message_docs, next_cursor = await fetch_page(db.collection("groups").document(group_id).collection("messages"), "created_at", firestore.Query.DESCENDING, limit, cursor)
+        
+        # Get user info for every sender in one batch
+        senders = await users.load_many([doc.to_dict()["user_id"] for doc in message_docs])
         
-        for doc in reversed(list(message_docs)):  # Reverse to get chronological order
+        for doc in reversed(message_docs):  # Reverse the page to get chronological order
             message_data = doc.to_dict()
             message_data["id"] = doc.id
-            
-            # Get user info
-            message_data["user"] = await get_user_data(message_data["user_id"])
+            message_data["user"] = senders.get(message_data["user_id"])
             
             messages.append(message_data)
         
-        return {"messages": messages, "group_id": group_id}
+        return {"messages": messages, "group_id": group_id, "next_cursor": next_cursor}
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting group messages: {e}")
+        log_event("error", "Error getting group messages", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Live Updates
+@app.post("/api/stream/ticket")
+async def create_stream_ticket(current_user: dict = Depends(get_current_user)):
+    """Single-use ticket for opening /api/stream or a group chat socket without an Authorization header"""
+    ticket = secrets.token_urlsafe(32)
+    await stream_tickets.set_many({ticket: {"uid": current_user['uid'], "email": current_user.get('email')}}, STREAM_TICKET_TTL)
+    return {"ticket": ticket, "expires_in": int(STREAM_TICKET_TTL)}
+
+@app.get("/api/stream")
+async def stream_updates(request: Request, current_user: dict = Depends(get_stream_user)):
+    """Server-sent events for friends' progress, friend requests, notes and group activity"""
+    try:
+        user_id = current_user['uid']
+        topics = await stream_topics(user_id)
+    except Exception as e:
+        log_event("error", "Error opening event stream", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+    
+    subscription = events.subscribe(topics)
+    return StreamingResponse(
+        sse_events(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Close codes for group chat sockets the server ends
+WS_TRY_AGAIN_LATER = 1013
+
+def socket_error(detail: str):
+    return orjson.dumps({"type": "error", "data": {"detail": detail}}).decode()
+
+async def forward_group_events(websocket: WebSocket, subscription: Subscription, user_id: str):
+    """Send the group's events to one socket, in order.
+
+    The hub never waits for a socket: one that falls a whole queue behind has lost
+    events, so it is closed and the client reconnects and reloads the history page.
+    """
+    while True:
+        event = await subscription.queue.get()
+        if subscription.dropped:
+            await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Fell behind; reconnect and reload messages")
+            return
+        await websocket.send_text(event.frame)
+        if event.type == "member_left" and event.data.get("user_id") == user_id:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="No longer a member of this group")
+            return
+
+async def receive_group_messages(websocket: WebSocket, group_id: str, user_id: str):
+    """Store and broadcast every {"message": ...} frame the socket sends, until it disconnects.
+    Membership is re-checked (through the doc cache) before each post, so leaving the group
+    through another worker also ends the socket's right to post."""
+    while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", status.WS_1000_NORMAL_CLOSURE))
+        try:
+            payload = orjson.loads(frame["text"]) if frame.get("text") is not None else None
+        except orjson.JSONDecodeError:
+            payload = None
+        if not isinstance(payload, dict):
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason="Frames must be JSON objects sent as text")
+            return
+        try:
+            body = MessageBody.model_validate(payload)
+        except ValidationError as e:
+            await websocket.send_text(socket_error(e.errors()[0]["msg"]))
+            continue
+        try:
+            member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
+            if not member_doc.exists:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="No longer a member of this group")
+                return
+            await post_group_message(group_id, user_id, body.message)
+        except Exception as e:
+            log_event("error", "Error sending group message", group_id=group_id, error=str(e))
+            await websocket.send_text(socket_error("Message could not be sent"))
+
+@app.websocket("/ws/groups/{group_id}")
+async def group_chat_socket(websocket: WebSocket, group_id: str):
+    """Live group chat. Membership is checked at connect and again before each post; the socket
+    receives every group event as {"id", "type", "data"} and posts {"message": ...} frames to the chat."""
+    try:
+        current_user = await get_stream_user(websocket.query_params.get("ticket"), websocket.headers.get("authorization"))
+        user_id = current_user['uid']
+        member_doc = await doc_cache.get(get_group_member_ref(group_id, user_id))
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    except Exception as e:
+        log_event("error", "Error opening group chat socket", group_id=group_id, error=str(e))
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+    if not member_doc.exists:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not a member of this group")
+        return
+    
+    # Subscribe before the handshake completes so nothing published after it is missed
+    subscription = events.subscribe([f"group:{group_id}"])
+    try:
+        await websocket.accept()
+        loops = [
+            asyncio.create_task(forward_group_events(websocket, subscription, user_id)),
+            asyncio.create_task(receive_group_messages(websocket, group_id, user_id))
+        ]
+        # Either side ending (client gone, server closed the socket) ends the other
+        done, pending = await asyncio.wait(loops, return_when=asyncio.FIRST_COMPLETED)
+        for loop in pending:
+            loop.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for loop in done:
+            error = loop.exception()
+            if error is not None and not isinstance(error, (WebSocketDisconnect, RuntimeError)):
+                log_event("error", "Group chat socket failed", group_id=group_id, user_id=user_id, error=str(error))
+    finally:
+        subscription.close()
+
+# History
+HISTORY_MAX_DAYS = 366
+HISTORY_MAX_PAGE_SIZE = 100
+STREAK_THRESHOLD = 80  # completion percentage a day needs to extend a streak
+
+def parse_history_range(start: Optional[str], end: Optional[str]):
+    """Resolve the requested range, defaulting to the last 30 days"""
+    try:
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else datetime.now(timezone.utc).date()
+        start_day = datetime.strptime(start, "%Y-%m-%d").date() if start else end_day - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be formatted YYYY-MM-DD")
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end_day - start_day).days >= HISTORY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"History range is limited to {HISTORY_MAX_DAYS} days")
+    return start_day, end_day
+
+async def build_history(user_id: str, start: Optional[str], end: Optional[str], limit: int, cursor: Optional[str]):
+    """Per-day stats and streaks for a date range, read from the monthly history archive.
+    A full year costs at most 13 document reads no matter how many tasks it holds."""
+    start_day, end_day = parse_history_range(start, end)
+    span = (end_day - start_day).days + 1
+    months = sorted({(start_day + timedelta(days=i)).strftime("%Y-%m") for i in range(span)})
+    refs = [get_history_month_ref(user_id, month) for month in months]
+    snapshots = await run_db(get_all_docs, refs)
+    
+    days: Dict[str, dict] = {}
+    for snap in snapshots:
+        if snap.exists:
+            for day, counts in ((snap.to_dict() or {}).get("days") or {}).items():
+                days[f"{snap.id}-{day}"] = counts
+    
+    # Walk the range oldest to newest so streaks can be counted in one pass
+    entries = []
+    streak_on: Dict[str, int] = {}
+    best_streak = run = 0
+    for i in range(span):
+        date = (start_day + timedelta(days=i)).isoformat()
+        counts = days.get(date) or {}
+        if counts.get("total_tasks", 0) > 0:
+            entry = {"date": date, **progress_stats(counts["total_tasks"], counts.get("completed_tasks", 0))}
+            entries.append(entry)
+            run = run + 1 if entry["completion_percentage"] >= STREAK_THRESHOLD else 0
+        else:
+            run = 0
+        streak_on[date] = run
+        best_streak = max(best_streak, run)
+    
+    # Today still counts as in progress, so an unfinished today doesn't break the streak
+    end_key = end_day.isoformat()
+    current_streak = streak_on[end_key]
+    if current_streak == 0 and end_key == get_today_date() and span > 1:
+        current_streak = streak_on[(end_day - timedelta(days=1)).isoformat()]
+    
+    entries.reverse()
+    if cursor:
+        entries = [entry for entry in entries if entry["date"] < cursor]
+    page = entries[:limit]
+    
+    return {
+        "history": page,
+        "streaks": {"current": current_streak, "best": best_streak, "threshold": STREAK_THRESHOLD},
+        "start": start_day.isoformat(),
+        "end": end_key,
+        "next_cursor": page[-1]["date"] if len(entries) > limit else None
+    }
 
-# History endpoints
 @app.get("/api/history")
-async def get_user_history(current_user: dict = Depends(get_current_user)):
-    """Get user's task completion history"""
+async def get_user_history(
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD), defaults to 29 days before end"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD), defaults to today"),
+    limit: int = Query(31, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get user's task completion history, newest day first"""
     try:
         user_id = current_user['uid']
-        
-        # Get user's daily tasks for the last 30 days
-        history = []
-        
-        # For now, return empty history - can be expanded later
-        return {"history": history}
+        return await build_history(user_id, start, end, limit, cursor)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error getting user history: {e}")
-        return {"history": []}
+        log_event("error", "Error getting user history", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/friend/{friend_id}")
-async def get_friend_history(friend_id: str, current_user: dict = Depends(get_current_user)):
-    """Return friend's history (placeholder empty list) if users are friends"""
+async def get_friend_history(
+    friend_id: str,
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD), defaults to 29 days before end"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD), defaults to today"),
+    limit: int = Query(31, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Return friend's history if users are friends"""
     try:
         user_id = current_user['uid']
         # Verify friendship
-        friendship = db.collection("friendships").where(field_path="user_id", op_string="==", value=user_id).where(field_path="friend_id", op_string="==", value=friend_id).limit(1).get()
-        if not friendship:
+        friendship = await doc_cache.get(get_friendship_ref(user_id, friend_id))
+        if not friendship.exists:
+            raise HTTPException(status_code=403, detail="Not friends")
+        return await build_history(friend_id, start, end, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_event("error", "Error getting friend's history", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+def check_day(date: str):
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be formatted YYYY-MM-DD")
+
+def task_order(task: dict):
+    return (task.get("created_at") or datetime.min.replace(tzinfo=timezone.utc), task["id"])
+
+async def build_day(user_id: str, date: str):
+    """One day's tasks and stats: a single read once the day is archived, its task docs until then"""
+    check_day(date)
+    summary = await run_db(get_daily_summary_ref(user_id, date).get)
+    data = (summary.to_dict() or {}) if summary.exists else {}
+    if "tasks" in data:
+        tasks = data["tasks"]
+    else:
+        docs = await run_db(get_user_tasks_collection(user_id, date).get)
+        tasks = sorted((doc_payload(doc) for doc in docs), key=task_order)
+    completed = sum(1 for task in tasks if task.get("completed"))
+    return {"date": date, "tasks": tasks, "stats": progress_stats(len(tasks), completed), "archived": data.get("archived") is True}
+
+@app.get("/api/history/{date}")
+async def get_user_history_day(date: str, current_user: dict = Depends(get_current_user)):
+    """Get one past day's tasks"""
+    try:
+        return await build_day(current_user['uid'], date)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_event("error", "Error getting history day", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/history/friend/{friend_id}/{date}")
+async def get_friend_history_day(friend_id: str, date: str, current_user: dict = Depends(get_current_user)):
+    """Return one of a friend's past days if users are friends"""
+    try:
+        user_id = current_user['uid']
+        friendship = await doc_cache.get(get_friendship_ref(user_id, friend_id))
+        if not friendship.exists:
             raise HTTPException(status_code=403, detail="Not friends")
-        return []
+        return await build_day(friend_id, date)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting friend's history: {e}")
+        log_event("error", "Error getting friend's history day", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+# Day rollover archive. Every task write goes to today, so once a day is over its tasks are
+# final: the archiver copies them into the day's rollup doc (users/{uid}/daily_tasks/{date},
+# with recomputed stats) and deletes the task docs, so a past day costs one read and storage
+# grows with days rather than tasks. A pass walks users in pages and records a checkpoint
+# after each page; a lease on the checkpoint keeps two workers (or a worker and a cron run of
+# `manage.py archive-days`) from walking at the same time, and a stopped pass resumes where it left off.
+ARCHIVE_MIN_AGE_DAYS = int(os.getenv("ARCHIVE_MIN_AGE_DAYS", "2"))
+ARCHIVE_USER_PAGE = int(os.getenv("ARCHIVE_USER_PAGE", "100"))
+ARCHIVE_BATCH_SIZE = 400  # writes per commit; Firestore allows 500
+ARCHIVE_MAX_BYTES = 900_000  # encoded size of a day's tasks; the archive doc has to fit in 1 MiB
+ARCHIVE_LEASE_SECONDS = 300
+ARCHIVE_ON_ROLLOVER = os.getenv("ARCHIVE_ON_ROLLOVER", "false").lower() == "true"
+ARCHIVE_USERS_PER_RUN = int(os.getenv("ARCHIVE_USERS_PER_RUN", "1000"))
+ARCHIVE_PAUSE_SECONDS = 1.0
+ARCHIVE_RETRY_SECONDS = 600.0
+# A pass is one long blocking job; it gets its own thread instead of holding a db_executor slot
+archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+
+metrics.describe("archived_days_total", "counter", "Finished days folded into their rollup doc by the archiver")
+metrics.describe("archived_tasks_total", "counter", "Task docs removed by the archiver")
+
+def get_archive_checkpoint_ref():
+    return db.collection("maintenance").document("task_archive")
+
+def archive_cutoff():
+    """The newest day old enough to archive"""
+    return (datetime.now(timezone.utc).date() - timedelta(days=ARCHIVE_MIN_AGE_DAYS)).isoformat()
+
+@firestore.transactional
+@counts_usage
+def archive_day_transaction(transaction, user_id: str, date: str):
+    """Copy a day's task docs into its rollup doc, reading both in one snapshot so that another
+    archiver's deletes can never leave a partial task list behind.
+
+    Returns (task docs deleted here, refs still to delete, whether the day is marked archived),
+    or None for a day too large to archive. Days that fit in one commit are archived and deleted
+    atomically; bigger ones are marked archived by archive_day once the last delete commits.
+    """
+    summary_ref = get_daily_summary_ref(user_id, date)
+    tasks_collection = get_user_tasks_collection(user_id, date)
+    summary_doc = transaction_read(transaction, summary_ref.get(transaction=transaction))
+    summary = (summary_doc.to_dict() or {}) if summary_doc.exists else {}
+    if summary.get("archived") is True:
+        return 0, [], True
+    if "tasks" in summary:
+        # An earlier run wrote the archive but stopped before its last deletes
+        return 0, [doc.reference for doc in transaction_read(transaction, list(transaction.get(tasks_collection.select(["__name__"]))))], False
+    
+    task_docs = transaction_read(transaction, list(transaction.get(tasks_collection.order_by("__name__"))))
+    tasks = sorted((doc_payload(doc) for doc in task_docs), key=task_order)
+    size = len(orjson.dumps(tasks, default=json_default))
+    if size > ARCHIVE_MAX_BYTES:
+        log_event("warning", "Day too large to archive", user_id=user_id, date=date, tasks=len(tasks), bytes=size)
+        return None
+    counts = {"total_tasks": len(tasks), "completed_tasks": sum(1 for task in tasks if task.get("completed"))}
+    groups: Dict[str, dict] = {}
+    for task in tasks:
+        if task.get("group_id"):
+            group_counts = groups.setdefault(task["group_id"], {"total_tasks": 0, "completed_tasks": 0})
+            group_counts["total_tasks"] += 1
+            group_counts["completed_tasks"] += 1 if task.get("completed") else 0
+    
+    task_refs = [doc.reference for doc in task_docs]
+    finished = len(task_refs) + 2 <= ARCHIVE_BATCH_SIZE
+    archive = {"date": date, **counts, "groups": groups, "tasks": tasks, "archived": finished, "archived_at": firestore.SERVER_TIMESTAMP}
+    transaction.set(summary_ref, archive, merge=list(archive))
+    transaction.set(get_history_month_ref(user_id, date[:7]), {"month": date[:7], "days": {date[8:]: counts}}, merge=True)
+    if finished:
+        for ref in task_refs:
+            transaction.delete(ref)
+        return len(task_refs), [], True
+    return 0, task_refs, False
+
+def archive_day(user_id: str, date: str) -> Optional[int]:
+    """Fold one finished day's task docs into its rollup doc and delete them.
+    Returns the task docs removed, or None if the day was skipped (and logged)."""
+    try:
+        archived = archive_day_transaction(db.transaction(), user_id, date)
+    except InvalidArgument as e:
+        # Over a Firestore limit despite the size estimate: leave the day as task docs
+        log_event("warning", "Day could not be archived", user_id=user_id, date=date, error=str(e))
+        return None
+    if archived is None:
+        return None
+    removed, task_refs, finished = archived
+    if finished:
+        return removed
+    
+    for start in range(0, len(task_refs), ARCHIVE_BATCH_SIZE):
+        batch = db.batch()
+        for ref in task_refs[start:start + ARCHIVE_BATCH_SIZE]:
+            batch.delete(ref)
+        batch.commit()
+    get_daily_summary_ref(user_id, date).update({"archived": True})
+    return len(task_refs)
+
+def archive_user(user_id: str, since: Optional[str], cutoff: str):
+    """Archive a user's finished days up to cutoff; returns (days, tasks).
+    After the first pass only days since the last one are looked at, and since every task
+    write also writes its day's rollup, a day without one has nothing to archive."""
+    days_collection = db.collection("users").document(user_id).collection("daily_tasks")
+    if since is None:
+        refs = [ref for ref in days_collection.list_documents() if ref.id <= cutoff]
+    else:
+        first = datetime.strptime(since, "%Y-%m-%d").date() + timedelta(days=1)
+        span = (datetime.strptime(cutoff, "%Y-%m-%d").date() - first).days + 1
+        refs = [days_collection.document((first + timedelta(days=i)).isoformat()) for i in range(span)]
+    days = tasks = 0
+    # Only used to skip finished days cheaply; archive_day re-reads each day in its transaction
+    for snap in (get_all_docs(refs) if refs else []):
+        summary = (snap.to_dict() or {}) if snap.exists else None
+        if (summary is None and since is not None) or (summary or {}).get("archived") is True:
+            continue
+        removed = archive_day(user_id, snap.id)
+        if removed is not None:
+            tasks += removed
+            days += 1
+    return days, tasks
+
+@firestore.transactional
+@counts_usage
+def claim_archive_lease(transaction, owner: str, cutoff: str):
+    """Take the archive lease and return the pass to work on, or None.
+    A pass in progress keeps its cutoff until it finishes; a new one starts when the cutoff moves."""
+    ref = get_archive_checkpoint_ref()
+    snap = transaction_read(transaction, ref.get(transaction=transaction))
+    checkpoint = (snap.to_dict() or {}) if snap.exists else {}
+    now = datetime.now(timezone.utc)
+    if checkpoint.get("lease_owner") not in (None, owner) and checkpoint.get("lease_until") and checkpoint["lease_until"] > now:
+        return None
+    if not checkpoint.get("cutoff"):
+        if (checkpoint.get("archived_through") or "") >= cutoff:
+            return None
+        checkpoint.update({"cutoff": cutoff, "cursor": None, "users": 0, "days": 0, "tasks": 0, "started_at": now})
+    checkpoint.update({"lease_owner": owner, "lease_until": now + timedelta(seconds=ARCHIVE_LEASE_SECONDS)})
+    transaction.set(ref, checkpoint)
+    return checkpoint
+
+@firestore.transactional
+@counts_usage
+def update_archive_checkpoint(transaction, owner: str, fields: dict) -> bool:
+    """Write fields to the checkpoint and extend the lease, unless another runner has taken it over"""
+    ref = get_archive_checkpoint_ref()
+    snap = transaction_read(transaction, ref.get(transaction=transaction))
+    if not snap.exists or (snap.to_dict() or {}).get("lease_owner") != owner:
+        return False
+    lease = {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}
+    transaction.update(ref, {**lease, **fields})
+    return True
+
+def archive_finished_days(max_users: Optional[int] = None, owner: Optional[str] = None):
+    """Run or resume the archive pass, a page of users per checkpoint, stopping after max_users.
+    Returns the pass's progress (archived_days and archived_tasks count this run alone); done is
+    True once every user has been archived up to the cutoff. Runs off the event loop, so it
+    leaves the metrics to its caller."""
+    owner = owner or f"{platform.node()}:{os.getpid()}"
+    checkpoint = claim_archive_lease(db.transaction(), owner, archive_cutoff())
+    if checkpoint is None:
+        return None
+    cutoff, since, cursor = checkpoint["cutoff"], checkpoint.get("archived_through"), checkpoint.get("cursor")
+    run = {"archived_days": 0, "archived_tasks": 0}
+    processed = 0
+    # Renew well before the lease runs out, checking between users that nobody took it over
+    renew_at = time.monotonic() + ARCHIVE_LEASE_SECONDS / 2
+    while max_users is None or processed < max_users:
+        query = db.collection("users").order_by("__name__").select(["__name__"]).limit(ARCHIVE_USER_PAGE)
+        if cursor:
+            query = query.start_after({"__name__": cursor})
+        user_ids = [doc.id for doc in query.get()]
+        days = tasks = 0
+        for user_id in user_ids:
+            if time.monotonic() >= renew_at:
+                if not update_archive_checkpoint(db.transaction(), owner, {}):
+                    log_event("warning", "Archive lease lost; stopping", cutoff=cutoff, cursor=cursor)
+                    return {**checkpoint, **run, "cursor": cursor, "done": False}
+                renew_at = time.monotonic() + ARCHIVE_LEASE_SECONDS / 2
+            user_days, user_tasks = archive_user(user_id, since, cutoff)
+            days, tasks = days + user_days, tasks + user_tasks
+        run["archived_days"] += days
+        run["archived_tasks"] += tasks
+        processed += len(user_ids)
+        for key, value in (("users", len(user_ids)), ("days", days), ("tasks", tasks)):
+            checkpoint[key] = checkpoint.get(key, 0) + value
+        totals = {key: checkpoint[key] for key in ("users", "days", "tasks")}
+        if len(user_ids) < ARCHIVE_USER_PAGE:
+            update_archive_checkpoint(db.transaction(), owner, {"archived_through": cutoff, "cutoff": None, "cursor": None, **totals, "completed_at": firestore.SERVER_TIMESTAMP, "lease_owner": None, "lease_until": None})
+            log_event("info", "Archive pass complete", cutoff=cutoff, **totals)
+            return {**checkpoint, **run, "cursor": None, "done": True}
+        cursor = user_ids[-1]
+        if not update_archive_checkpoint(db.transaction(), owner, {"cursor": cursor, **totals}):
+            log_event("warning", "Archive lease lost; stopping", cutoff=cutoff, cursor=cursor)
+            return {**checkpoint, **run, "cursor": cursor, "done": False}
+        renew_at = time.monotonic() + ARCHIVE_LEASE_SECONDS / 2
+    update_archive_checkpoint(db.transaction(), owner, {"lease_owner": None, "lease_until": None})
+    return {**checkpoint, **run, "cursor": cursor, "done": False}
+
+class RolloverArchiver:
+    """Starts the archive in the background on the first request after the cutoff moves (ARCHIVE_ON_ROLLOVER)"""
+
+    def __init__(self):
+        self.cutoff = None
+        self.retry_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def poke(self):
+        cutoff = archive_cutoff()
+        if cutoff == self.cutoff or time.monotonic() < self.retry_at or (self.task and not self.task.done()):
+            return
+        self.cutoff = cutoff
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        # The job isn't part of the request that happened to start it
+        current_usage.set(None)
+        try:
+            while True:
+                progress = await asyncio.get_running_loop().run_in_executor(archive_executor, archive_finished_days, ARCHIVE_USERS_PER_RUN)
+                if progress is None:
+                    return
+                metrics.inc("archived_days_total", progress["archived_days"])
+                metrics.inc("archived_tasks_total", progress["archived_tasks"])
+                # A pass that was resumed finishes at its old cutoff, so go again for the new one
+                if progress["done"] and progress["cutoff"] == archive_cutoff():
+                    return
+                await asyncio.sleep(ARCHIVE_PAUSE_SECONDS)
+        except Exception as e:
+            # The checkpoint keeps the progress made so far; try again after a while, not on the next request
+            self.cutoff = None
+            self.retry_at = time.monotonic() + ARCHIVE_RETRY_SECONDS
+            log_event("error", "Archive run failed", error=str(e))
+
+rollover_archiver = RolloverArchiver()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
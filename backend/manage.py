@@ -0,0 +1,182 @@
+"""
+Maintenance commands for the backend's Firestore data.
+
+    python manage.py backfill-memberships
+    python manage.py repair-group-counters
+    python manage.py rebuild-daily-summaries [--date YYYY-MM-DD | --all]
+    python manage.py backfill-search-tokens
+    python manage.py migrate-friendships
+    python manage.py archive-days [--max-users N]
+
+Every command is idempotent and safe to re-run.
+"""
+import argparse
+
+from firebase_admin import firestore
+
+from main import USER_SEARCH_FIELDS, archive_finished_days, db, get_daily_summary_ref, get_friendship_ref, get_history_month_ref, get_today_date, get_user_memberships_collection, get_user_search_ref, get_user_tasks_collection, user_search_entry
+
+
+def backfill_memberships(args):
+    """Mirror every groups/{gid}/members/{uid} doc into users/{uid}/group_memberships/{gid}"""
+    writer = db.bulk_writer()
+    groups = members = 0
+    for group_doc in db.collection("groups").stream():
+        groups += 1
+        for member_doc in group_doc.reference.collection("members").stream():
+            member = member_doc.to_dict() or {}
+            writer.set(get_user_memberships_collection(member_doc.id).document(group_doc.id), {
+                "group_id": group_doc.id,
+                "role": member.get("role", "member"),
+                "joined_at": member.get("joined_at"),
+            })
+            members += 1
+    writer.close()
+    print(f"✅ Indexed {members} memberships across {groups} groups")
+
+
+def repair_group_counters(args):
+    """Recompute member_count/member_ids on every group doc from its members subcollection,
+    and drop the retired profiles_version counter"""
+    writer = db.bulk_writer()
+    checked = repaired = 0
+    for group_doc in db.collection("groups").stream():
+        checked += 1
+        group = group_doc.to_dict() or {}
+        member_ids = sorted(doc.id for doc in group_doc.reference.collection("members").stream())
+        if group.get("member_count") == len(member_ids) and sorted(group.get("member_ids") or []) == member_ids and "profiles_version" not in group:
+            continue
+        update = {"member_count": len(member_ids), "member_ids": member_ids}
+        if "profiles_version" in group:
+            update["profiles_version"] = firestore.DELETE_FIELD
+        writer.update(group_doc.reference, update)
+        repaired += 1
+    writer.close()
+    print(f"✅ Repaired {repaired} of {checked} groups")
+
+
+def rebuild_daily_summaries(args):
+    """Recompute daily progress rollups and their history archive entries from task docs.
+    A day whose tasks are all gone gets zero counts; archived days (their rollup holds the
+    tasks) are skipped and keep their archived counts."""
+    writer = db.bulk_writer()
+    rebuilt = archived = 0
+    for user_ref in db.collection("users").list_documents():
+        if args.all:
+            dates = [day_ref.id for day_ref in user_ref.collection("daily_tasks").list_documents()]
+        else:
+            dates = [args.date or get_today_date()]
+        if not dates:
+            continue
+        summaries = {snap.id: snap for snap in db.get_all([get_daily_summary_ref(user_ref.id, date) for date in dates])}
+        for date in dates:
+            summary = (summaries[date].to_dict() or {}) if summaries[date].exists else None
+            if summary is not None and "tasks" in summary:
+                archived += 1
+                continue
+            total = completed = 0
+            groups = {}
+            for task_doc in get_user_tasks_collection(user_ref.id, date).stream():
+                task = task_doc.to_dict() or {}
+                done = 1 if task.get("completed") else 0
+                total += 1
+                completed += done
+                if task.get("group_id"):
+                    counts = groups.setdefault(task["group_id"], {"total_tasks": 0, "completed_tasks": 0})
+                    counts["total_tasks"] += 1
+                    counts["completed_tasks"] += done
+            if not total and summary is None:
+                continue
+            summary = {"date": date, "total_tasks": total, "completed_tasks": completed, "groups": groups}
+            writer.set(get_daily_summary_ref(user_ref.id, date), summary, merge=list(summary))
+            writer.set(get_history_month_ref(user_ref.id, date[:7]), {
+                "month": date[:7],
+                "days": {date[8:]: {"total_tasks": total, "completed_tasks": completed}},
+            }, merge=True)
+            rebuilt += 1
+    writer.close()
+    print(f"✅ Rebuilt {rebuilt} daily summaries, skipped {archived} archived days")
+
+
+def backfill_search_tokens(args):
+    """Write user_search/{uid} (the n-grams /api/users/search queries) for every user.
+    Also drops the search_tokens array user docs used to carry."""
+    writer = db.bulk_writer()
+    indexed = cleaned = 0
+    for user_doc in db.collection("users").select(USER_SEARCH_FIELDS + ["search_tokens"]).stream():
+        user = user_doc.to_dict() or {}
+        writer.set(get_user_search_ref(user_doc.id), user_search_entry(user.get("email"), user.get("username"), user.get("display_name")))
+        indexed += 1
+        if "search_tokens" in user:
+            writer.update(user_doc.reference, {"search_tokens": firestore.DELETE_FIELD})
+            cleaned += 1
+    writer.close()
+    print(f"✅ Indexed {indexed} users for search, removed the old token array from {cleaned} user docs")
+
+
+def migrate_friendships(args):
+    """Move friendship docs to their deterministic {user_id}_{friend_id} IDs.
+
+    Duplicates left by retried accepts collapse into one doc (the earliest), and a
+    friendship missing its reverse direction gets one.
+    """
+    edges = {}
+    for doc in db.collection("friendships").stream():
+        data = doc.to_dict() or {}
+        if data.get("user_id") and data.get("friend_id"):
+            edges.setdefault((data["user_id"], data["friend_id"]), []).append(doc)
+    writer = db.bulk_writer()
+    moved = removed = added = 0
+    for (user_id, friend_id), docs in edges.items():
+        target = get_friendship_ref(user_id, friend_id)
+        stale = [doc for doc in docs if doc.id != target.id]
+        created_at = min((doc.to_dict().get("created_at") for doc in docs if doc.to_dict().get("created_at")), default=None)
+        if stale:
+            writer.set(target, {"user_id": user_id, "friend_id": friend_id, "created_at": created_at})
+            for doc in stale:
+                writer.delete(doc.reference)
+            moved += 1
+            removed += len(docs) - 1
+        if (friend_id, user_id) not in edges:
+            writer.set(get_friendship_ref(friend_id, user_id), {
+                "user_id": friend_id,
+                "friend_id": user_id,
+                "created_at": created_at,
+            })
+            added += 1
+    writer.close()
+    print(f"✅ Re-keyed {moved} of {len(edges)} friendships, removed {removed} duplicates, added {added} missing reverse edges")
+
+
+def archive_days(args):
+    """Fold finished days' task docs into their rollup docs (run daily from cron).
+
+    Resumes from the checkpoint a stopped run left, and does nothing while another
+    runner holds the lease. --max-users bounds one invocation; run it again to continue.
+    """
+    progress = archive_finished_days(args.max_users)
+    if progress is None:
+        print("Nothing to archive, or another run holds the lease")
+        return
+    state = "done" if progress["done"] else f"stopped after user {progress['cursor']}, run again to continue"
+    print(f"✅ Archived {progress['days']} days ({progress['tasks']} task docs) for {progress['users']} users through {progress['cutoff']}: {state}")
+
+
+COMMANDS = {
+    "backfill-memberships": backfill_memberships,
+    "repair-group-counters": repair_group_counters,
+    "rebuild-daily-summaries": rebuild_daily_summaries,
+    "backfill-search-tokens": backfill_search_tokens,
+    "migrate-friendships": migrate_friendships,
+    "archive-days": archive_days,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily Check-In maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--date", help="day to process (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--all", action="store_true", help="process every day that has tasks")
+    parser.add_argument("--max-users", type=int, help="archive-days: stop after this many users")
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
@@ -0,0 +1,50 @@
+"""Unit tests import main without a Firebase project: the app is pointed at the
+emulator's address but nothing here talks to Firestore. Route tests swap main.db
+for the in-memory client in fake_firestore."""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+sys.path.insert(0, BACKEND_DIR)
+
+from common import use_emulator  # noqa: E402
+
+use_emulator(required=False)
+
+import main  # noqa: E402
+from fake_firestore import FakeClient  # noqa: E402
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """main running on an empty in-memory Firestore, with fresh caches and event hub"""
+    client = FakeClient()
+    monkeypatch.setattr(main, "db", client)
+    monkeypatch.setattr(main, "doc_cache", main.DocCache(main.MemoryCacheBackend(1000), 60))
+    monkeypatch.setattr(main, "events", main.EventHub(100))
+    monkeypatch.setattr(main, "known_users", main.RecentSet(1000))
+    monkeypatch.setattr(main, "idempotency_store", main.MemoryCacheBackend(1000))
+    return client
+
+
+@pytest.fixture
+def db_calls(monkeypatch):
+    """Every Firestore call made through run_db, as (method name, paths it touches)"""
+    calls = []
+    original = main.run_db
+
+    async def recording_run_db(fn, *args, **kwargs):
+        if fn is not main.auth.verify_id_token:
+            owner = getattr(fn, "__self__", None)
+            if fn is main.get_all_docs:
+                paths = [ref.path for ref in args[0]]
+            else:
+                paths = [getattr(owner, "path", getattr(owner, "_path", None))]
+            calls.append((getattr(fn, "__name__", repr(fn)), paths))
+        return await original(fn, *args, **kwargs)
+
+    monkeypatch.setattr(main, "run_db", recording_run_db)
+    return calls
+
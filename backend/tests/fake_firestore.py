@@ -0,0 +1,286 @@
+"""In-memory stand-in for the parts of the Firestore client main.py uses, so route
+functions can run in unit tests without the emulator. Documents live in one dict
+keyed by path; every commit applies its writes atomically and stamps them with a
+strictly increasing update time."""
+import copy
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+
+class WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class Snapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = copy.deepcopy(data)
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        value = self._data
+        for part in field.split("."):
+            value = value[part]
+        return value
+
+
+def resolve(value, current, now):
+    """A written value with its transforms (SERVER_TIMESTAMP, Increment, ArrayUnion/Remove) applied"""
+    if value is transforms.SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, transforms.Increment):
+        return (current or 0) + value.value
+    if isinstance(value, transforms.ArrayUnion):
+        existing = list(current or [])
+        return existing + [item for item in value.values if item not in existing]
+    if isinstance(value, transforms.ArrayRemove):
+        return [item for item in (current or []) if item not in value.values]
+    if isinstance(value, dict):
+        return {key: resolve(item, None, now) for key, item in value.items()}
+    return copy.deepcopy(value)
+
+
+def merge(current: dict, data: dict, now):
+    merged = dict(current)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value, now)
+        else:
+            merged[key] = resolve(value, merged.get(key), now)
+    return merged
+
+
+class DocumentReference:
+    def __init__(self, client, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name: str):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None):
+        return self._client.snapshot(self)
+
+    def set(self, data, merge=False):
+        return self._client.commit([("set", self, data, merge)])[0]
+
+    def create(self, data):
+        return self._client.commit([("create", self, data, False)])[0]
+
+    def update(self, data):
+        return self._client.commit([("update", self, data, False)])[0]
+
+    def delete(self):
+        return self._client.commit([("delete", self, None, False)])[0]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class AggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self):
+        return [[AggregationResult(self._alias, len(self._query.get()))]]
+
+
+class Query:
+    def __init__(self, client, path: str, filters=(), orders=(), limit=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = {"filters": self._filters, "orders": self._orders, "limit": self._limit, **changes}
+        return Query(self._client, self._path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None):
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def select(self, field_paths):
+        return self
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def count(self, alias=None):
+        return AggregationQuery(self._copy(limit=None), alias)
+
+    def _matches(self, data: dict):
+        for field, op, value in self._filters:
+            if op == "==" and data.get(field) != value:
+                return False
+            if op == "array_contains" and value not in (data.get(field) or []):
+                return False
+        return True
+
+    def get(self, transaction=None):
+        snapshots = [snap for snap in self._client.list_collection(self._path) if self._matches(snap.to_dict())]
+        for field, direction in reversed(self._orders):
+            key = (lambda snap: snap.id) if field == "__name__" else (lambda snap, field=field: snap.to_dict().get(field))
+            snapshots.sort(key=key, reverse=direction == "DESCENDING")
+        return snapshots[:self._limit] if self._limit is not None else snapshots
+
+    def stream(self, transaction=None):
+        return iter(self.get())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path: str):
+        super().__init__(client, path)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return DocumentReference(self._client, self.path.rsplit("/", 1)[0]) if "/" in self.path else None
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, data):
+        ref = self.document()
+        return ref.set(data).update_time, ref
+
+    def list_documents(self):
+        return [snap.reference for snap in self._client.list_collection(self.path)]
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._write_pbs = []
+
+    def set(self, reference, data, merge=False):
+        self._write_pbs.append(("set", reference, data, merge))
+
+    def create(self, reference, data):
+        self._write_pbs.append(("create", reference, data, False))
+
+    def update(self, reference, data):
+        self._write_pbs.append(("update", reference, data, False))
+
+    def delete(self, reference):
+        self._write_pbs.append(("delete", reference, None, False))
+
+    def commit(self):
+        return self._client.commit(self._write_pbs)
+
+
+class Transaction(WriteBatch):
+    """Enough of Transaction for @firestore.transactional: one attempt, writes applied on commit"""
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    def _clean_up(self):
+        self._write_pbs = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        results = self._client.commit(self._write_pbs)
+        self._clean_up()
+        return results
+
+    def _rollback(self):
+        self._clean_up()
+
+    def get(self, ref_or_query):
+        return iter(ref_or_query.get())
+
+    def get_all(self, references):
+        return self._client.get_all(references)
+
+
+class FakeClient:
+    def __init__(self):
+        self.docs = {}
+        self._update_times = {}
+        self._lock = threading.Lock()
+        self._clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def collection(self, name: str):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self):
+        return Transaction(self)
+
+    def get_all(self, references, transaction=None):
+        return [self.snapshot(ref) for ref in references]
+
+    def snapshot(self, reference):
+        with self._lock:
+            return Snapshot(reference, self.docs.get(reference.path), self._update_times.get(reference.path))
+
+    def list_collection(self, path: str):
+        with self._lock:
+            return [
+                Snapshot(DocumentReference(self, doc_path), data, self._update_times[doc_path])
+                for doc_path, data in sorted(self.docs.items())
+                if doc_path.rsplit("/", 1)[0] == path
+            ]
+
+    def commit(self, writes):
+        """Apply writes all or nothing; returns one WriteResult per write"""
+        with self._lock:
+            self._clock += timedelta(microseconds=1)
+            now = self._clock
+            docs = dict(self.docs)
+            for kind, reference, data, merge_fields in writes:
+                current = docs.get(reference.path)
+                if kind == "create" and current is not None:
+                    raise AlreadyExists(f"Document already exists: {reference.path}")
+                if kind == "update" and current is None:
+                    raise NotFound(f"No document to update: {reference.path}")
+                if kind == "delete":
+                    docs.pop(reference.path, None)
+                elif kind == "update":
+                    docs[reference.path] = {**current, **{key: resolve(value, current.get(key), now) for key, value in data.items()}}
+                elif merge_fields and current is not None:
+                    docs[reference.path] = merge(current, data, now)
+                else:
+                    docs[reference.path] = resolve(data, None, now)
+            self.docs = docs
+            for _, reference, _, _ in writes:
+                self._update_times[reference.path] = now
+            return [WriteResult(now) for _ in writes]
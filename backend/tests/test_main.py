@@ -0,0 +1,556 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+from fastapi.testclient import TestClient
+
+import main
+from fake_firestore import FakeClient
+
+WRITES = {"add", "set", "create", "update", "delete", "commit"}
+
+
+class FakeSnapshot:
+    """The parts of a DocumentSnapshot the code under test reads"""
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data[field]
+
+
+def user(uid: str):
+    """The decoded ID token get_current_user hands a route"""
+    return {"uid": uid, "email": f"{uid}@test.local", "name": uid}
+
+
+def put(client, path: str, data: dict):
+    """Store a document in the fake client directly, bypassing run_db and the caches"""
+    collection, doc_id = path.rsplit("/", 1)
+    client.collection(collection).document(doc_id).set(data)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# Create endpoints: one write round trip each, and no reading back what was just written
+
+def check_single_write(calls, created_path: str):
+    writes = [name for name, _ in calls if name in WRITES]
+    read_backs = [name for name, paths in calls if name not in WRITES and created_path in paths]
+    assert len(writes) == 1, calls
+    assert read_backs == [], calls
+
+
+@pytest.fixture
+def circle(fake_db):
+    """u1 and u2 are friends and share group g1, hosted by u1; both profiles exist"""
+    for uid in ("u1", "u2"):
+        put(fake_db, f"users/{uid}", {"email": f"{uid}@test.local", "display_name": uid, "updated_at": None})
+        main.known_users.add(uid)
+    put(fake_db, "friendships/u1_u2", {"user_id": "u1", "friend_id": "u2"})
+    put(fake_db, "friendships/u2_u1", {"user_id": "u2", "friend_id": "u1"})
+    put(fake_db, "groups/g1", {"name": "Group", "host_id": "u1", "member_count": 2, "member_ids": ["u1", "u2"]})
+    put(fake_db, "groups/g1/members/u1", {"user_id": "u1", "role": "host"})
+    put(fake_db, "groups/g1/members/u2", {"user_id": "u2", "role": "member"})
+    return fake_db
+
+
+def test_create_task_makes_one_write(circle, db_calls):
+    result = run(main.create_task(main.TaskCreate(title="Run", group_id="g1"), current_user=user("u1")))
+    task = result["task"]
+    assert task["created_at"] is not None and task["group_id"] == "g1"
+    check_single_write(db_calls, f"users/u1/daily_tasks/{main.get_today_date()}/tasks/{task['id']}")
+
+
+def test_create_group_task_makes_one_write(circle, db_calls):
+    result = run(main.create_group_task("g1", main.GroupTaskCreate(title="Stretch"), current_user=user("u1")))
+    check_single_write(db_calls, f"groups/g1/tasks/{result['task']['id']}")
+
+
+def test_create_group_makes_one_write(circle, db_calls):
+    result = run(main.create_group(main.GroupCreate(name="New"), current_user=user("u1")))
+    group = result["group"]
+    assert group["host"]["id"] == "u1" and group["member_count"] == 1 and group["created_at"] is not None
+    check_single_write(db_calls, f"groups/{group['id']}")
+
+
+def test_send_friend_request_makes_one_write(circle, db_calls):
+    put(circle, "users/u3", {"email": "u3@test.local", "display_name": "u3"})
+    result = run(main.send_friend_request(main.FriendRequestCreate(user_email="u3@test.local"), current_user=user("u1"), idempotency_key=None))
+    request = result["request"]
+    assert request["status"] == "pending" and request["created_at"] is not None
+    check_single_write(db_calls, f"friend_requests/{request['id']}")
+
+
+def test_send_motivational_note_makes_one_write(circle, db_calls):
+    result = run(main.send_motivational_note(main.MotivationalNoteBody(to_user_id="u2", message="Go!"), current_user=user("u1")))
+    check_single_write(db_calls, f"motivational_notes/{result['note']['id']}")
+
+
+def test_send_group_message_makes_one_write(circle, db_calls):
+    result = run(main.send_group_message("g1", main.MessageBody(message="hi"), current_user=user("u2")))
+    message = result["group_message"]
+    assert message["user"]["id"] == "u2"
+    check_single_write(db_calls, f"groups/g1/messages/{message['id']}")
+
+
+def test_setup_user_makes_one_write(circle, db_calls):
+    result = run(main.setup_user(main.UserCreate(display_name="One", username="one"), current_user=user("u1")))
+    assert result["user"]["updated_at"] == result["user"]["created_at"] is not None
+    check_single_write(db_calls, "users/u1")
+
+
+# Live events
+
+def test_event_hub_drops_oldest_events_for_slow_subscribers():
+    async def scenario():
+        hub = main.EventHub(queue_size=3)
+        slow = hub.subscribe(["group:g1"])
+        for n in range(5):
+            assert hub.publish(["group:g1"], "group_message", {"n": n}) == 1
+        received = [slow.queue.get_nowait().data["n"] for _ in range(slow.queue.qsize())]
+        return slow, received
+
+    slow, received = run(scenario())
+    assert received == [2, 3, 4]
+    assert slow.dropped == 2
+
+
+def test_event_hub_delivers_once_and_follows_topic_changes():
+    async def scenario():
+        hub = main.EventHub(queue_size=10)
+        subscription = hub.subscribe(["user:u1", "progress:u2"])
+        # Listed under both topics, delivered once
+        assert hub.publish(["user:u1", "progress:u2"], "task_created", {"user_id": "u2"}) == 1
+        hub.publish(["user:u1"], "friend_added", {"friend_id": "u3"})
+        followed = hub.publish(["progress:u3"], "task_created", {"user_id": "u3"})
+        hub.publish(["user:u1"], "friend_removed", {"friend_id": "u3"})
+        unfollowed = hub.publish(["progress:u3"], "task_created", {"user_id": "u3"})
+        subscription.close()
+        return subscription, followed, unfollowed, hub.stats()
+
+    subscription, followed, unfollowed, stats = run(scenario())
+    assert (followed, unfollowed) == (1, 0)
+    assert subscription.queue.qsize() == 4
+    assert stats["topics"] == 0 and stats["subscribers"] == 0
+
+
+def received(subscription):
+    """(type, data) of every event waiting in a subscription's queue"""
+    events = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+    return [(event.type, event.data) for event in events]
+
+
+def test_remove_friend_deletes_both_edges_and_tells_both_users(circle):
+    inboxes = {uid: main.events.subscribe([f"user:{uid}"]) for uid in ("u1", "u2")}
+    run(main.remove_friend("u2", current_user=user("u1")))
+    assert "friendships/u1_u2" not in circle.docs and "friendships/u2_u1" not in circle.docs
+    assert received(inboxes["u1"]) == [("friend_removed", {"friend_id": "u2"})]
+    assert received(inboxes["u2"]) == [("friend_removed", {"friend_id": "u1"})]
+
+
+def test_remove_friend_rejects_a_stranger_without_events(circle):
+    put(circle, "users/u3", {"email": "u3@test.local"})
+    inbox = main.events.subscribe(["user:u3"])
+    with pytest.raises(HTTPException) as error:
+        run(main.remove_friend("u3", current_user=user("u1")))
+    assert error.value.status_code == 404
+    assert received(inbox) == []
+
+
+def test_leave_group_rejects_a_non_member_without_events(circle):
+    put(circle, "users/u3", {"email": "u3@test.local"})
+    group_stream = main.events.subscribe(["group:g1"])
+    with pytest.raises(HTTPException) as error:
+        run(main.leave_group("g1", current_user=user("u3")))
+    assert error.value.status_code == 404
+    assert received(group_stream) == []
+    assert circle.docs["groups/g1"]["member_count"] == 2
+
+
+def test_leave_group_removes_the_member_and_tells_the_group(circle):
+    group_stream = main.events.subscribe(["group:g1"])
+    run(main.leave_group("g1", current_user=user("u2")))
+    assert "groups/g1/members/u2" not in circle.docs
+    assert circle.docs["groups/g1"]["member_count"] == 1 and circle.docs["groups/g1"]["member_ids"] == ["u1"]
+    assert received(group_stream) == [("member_left", {"group_id": "g1", "user_id": "u2"})]
+
+
+# ETags
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", W/"abc"', True),
+    ('"other"', False),
+    ("*", True),
+    ('"ab"', False),
+])
+def test_etag_matches(header, expected):
+    assert main.etag_matches(header, '"abc"') is expected
+
+
+def test_make_etag_is_stable_and_strong():
+    etag = main.make_etag("groups", [{"id": "g1"}], [datetime(2025, 1, 1, tzinfo=timezone.utc)])
+    assert etag == main.make_etag("groups", [{"id": "g1"}], [datetime(2025, 1, 1, tzinfo=timezone.utc)])
+    assert etag != main.make_etag("groups", [{"id": "g1"}], [datetime(2025, 1, 2, tzinfo=timezone.utc)])
+    assert etag.startswith('"') and etag.endswith('"') and not etag.startswith("W/")
+
+
+def fetch_etag(route, *args, if_none_match=None, **kwargs):
+    """Call a validated list route; returns (ETag, whether it answered 304)"""
+    response = Response()
+    result = run(route(*args, response=response, if_none_match=if_none_match, **kwargs))
+    if isinstance(result, Response):
+        assert result.status_code == 304
+        return result.headers["ETag"], True
+    return response.headers["ETag"], False
+
+
+def test_today_tasks_etag_follows_tasks_version(circle, monkeypatch):
+    versions = {"u1": 3}
+
+    async def get_tasks_version(user_id, date):
+        return versions.get(user_id)
+
+    monkeypatch.setattr(main, "get_tasks_version", get_tasks_version)
+    etag, _ = fetch_etag(main.get_today_tasks, fields=None, current_user=user("u1"))
+    assert fetch_etag(main.get_today_tasks, fields=None, if_none_match=etag, current_user=user("u1")) == (etag, True)
+    # A projection is a different representation
+    assert fetch_etag(main.get_today_tasks, fields="title", if_none_match=etag, current_user=user("u1"))[1] is False
+    versions["u1"] = 4
+    moved, not_modified = fetch_etag(main.get_today_tasks, fields=None, if_none_match=etag, current_user=user("u1"))
+    assert moved != etag and not not_modified
+
+
+def test_today_tasks_etag_moves_with_task_writes_only(circle):
+    etag, _ = fetch_etag(main.get_today_tasks, fields=None, current_user=user("u1"))
+    run(main.create_task(main.TaskCreate(title="Someone else's"), current_user=user("u2")))
+    assert fetch_etag(main.get_today_tasks, fields=None, if_none_match=etag, current_user=user("u1")) == (etag, True)
+    run(main.create_task(main.TaskCreate(title="Mine"), current_user=user("u1")))
+    assert fetch_etag(main.get_today_tasks, fields=None, if_none_match=etag, current_user=user("u1"))[0] != etag
+
+
+def test_group_members_etag_follows_profile_updated_at(circle):
+    def members_etag(if_none_match=None):
+        return fetch_etag(main.get_group_members, "g1", if_none_match=if_none_match, current_user=user("u1"), users=main.UserLoader())
+
+    etag, _ = members_etag()
+    assert members_etag(etag) == (etag, True)
+    put(circle, "users/u3", {"email": "u3@test.local", "display_name": "u3"})
+    run(main.setup_user(main.UserCreate(display_name="Not in the group"), current_user=user("u3")))
+    assert members_etag(etag) == (etag, True)
+    run(main.setup_user(main.UserCreate(display_name="Renamed"), current_user=user("u2")))
+    assert members_etag(etag)[0] != etag
+
+
+def test_groups_list_etag_follows_host_profile_without_loading_it(circle, db_calls):
+    for uid, role in (("u1", "host"), ("u2", "member")):
+        put(circle, f"users/{uid}/group_memberships/g1", {"group_id": "g1", "role": role})
+
+    def groups_etag(if_none_match=None):
+        return fetch_etag(main.get_user_groups, if_none_match=if_none_match, current_user=user("u2"), users=main.UserLoader())
+
+    etag, _ = groups_etag()
+    run(main.setup_user(main.UserCreate(display_name="Member rename"), current_user=user("u2")))
+    del db_calls[:]
+    assert groups_etag(etag) == (etag, True)
+    assert not any("users/u1" in paths for _, paths in db_calls), db_calls
+    run(main.setup_user(main.UserCreate(display_name="Host rename"), current_user=user("u1")))
+    moved, not_modified = groups_etag(etag)
+    assert moved != etag and not not_modified
+
+
+# DocCache
+
+def test_doc_cache_reads_through_once(monkeypatch):
+    ref = main.db.collection("users").document("u1")
+    fetches = []
+
+    async def get_docs(refs):
+        fetches.append([r.path for r in refs])
+        return [FakeSnapshot(r, {"display_name": "One"}) for r in refs]
+
+    async def scenario():
+        cache = main.DocCache(main.MemoryCacheBackend(100), ttl=60)
+        first = await cache.get(ref)
+        second = await cache.get(ref)
+        return cache, first, second
+
+    monkeypatch.setattr(main, "get_docs", get_docs)
+    cache, first, second = asyncio.run(scenario())
+    assert fetches == [[ref.path]]
+    assert first.to_dict() == second.to_dict() == {"display_name": "One"}
+    assert cache.stats()["hits"] == {"users": 1} and cache.stats()["misses"] == {"users": 1}
+
+
+def test_doc_cache_drops_a_fill_raced_by_invalidate(monkeypatch):
+    ref = main.db.collection("groups").document("g1")
+    versions = iter([{"member_count": 1}, {"member_count": 2}])
+
+    async def scenario():
+        cache = main.DocCache(main.MemoryCacheBackend(100), ttl=60)
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def slow_get_docs(refs):
+            data = next(versions)
+            started.set()
+            await release.wait()
+            return [FakeSnapshot(r, data) for r in refs]
+
+        monkeypatch.setattr(main, "get_docs", slow_get_docs)
+        fill = asyncio.ensure_future(cache.get(ref))
+        await started.wait()
+        # A write commits and invalidates while the old value is still on its way back
+        await cache.invalidate(ref)
+        release.set()
+        stale = await fill
+        fresh = await cache.get(ref)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale.to_dict() == {"member_count": 1}
+    assert fresh.to_dict() == {"member_count": 2}
+
+
+def test_doc_cache_caches_missing_documents(monkeypatch):
+    ref = main.db.collection("groups").document("g1").collection("members").document("u1")
+    calls = []
+
+    async def get_docs(refs):
+        calls.append(len(refs))
+        return [FakeSnapshot(r, None) for r in refs]
+
+    monkeypatch.setattr(main, "get_docs", get_docs)
+
+    async def scenario():
+        cache = main.DocCache(main.MemoryCacheBackend(100), ttl=60)
+        return [(await cache.get(ref)).exists for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [False, False]
+    assert calls == [1]
+
+
+def cached(ref):
+    """The document as a route would read it, through doc_cache"""
+    snapshot = run(main.doc_cache.get(ref))
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def test_setup_user_invalidates_the_cached_profile(circle):
+    assert run(main.get_user_data("u2"))["display_name"] == "u2"
+    run(main.setup_user(main.UserCreate(display_name="Renamed"), current_user=user("u2")))
+    assert run(main.get_user_data("u2"))["display_name"] == "Renamed"
+    profiles = run(main.UserLoader().load_many(["u2"]))
+    assert profiles["u2"]["display_name"] == "Renamed"
+
+
+def test_join_and_leave_invalidate_the_group_and_member_docs(circle):
+    put(circle, "users/u3", {"email": "u3@test.local", "display_name": "u3"})
+    circle.docs["groups/g1"]["invite_code"] = "JOIN"
+    group_ref = main.db.collection("groups").document("g1")
+    member_ref = main.get_group_member_ref("g1", "u3")
+    assert cached(group_ref)["member_count"] == 2 and cached(member_ref) is None
+
+    run(main.join_group(main.InviteCodeRequest(invite_code="JOIN"), current_user=user("u3"), idempotency_key=None))
+    assert cached(group_ref)["member_count"] == 3 and "u3" in cached(group_ref)["member_ids"]
+    assert cached(member_ref)["role"] == "member"
+
+    run(main.leave_group("g1", current_user=user("u3")))
+    assert cached(group_ref)["member_count"] == 2 and "u3" not in cached(group_ref)["member_ids"]
+    assert cached(member_ref) is None
+
+
+def test_accept_and_remove_invalidate_the_friendship_edges(circle):
+    put(circle, "users/u3", {"email": "u3@test.local", "display_name": "u3"})
+    put(circle, "friend_requests/r1", {"from_user_id": "u3", "to_user_id": "u1", "status": "pending"})
+    edges = [main.get_friendship_ref("u1", "u3"), main.get_friendship_ref("u3", "u1")]
+    assert [cached(ref) for ref in edges] == [None, None]
+
+    run(main.respond_to_friend_request("r1", main.FriendRequestResponse(accept=True), current_user=user("u1"), idempotency_key=None))
+    assert [cached(ref)["friend_id"] for ref in edges] == ["u3", "u1"]
+
+    run(main.remove_friend("u3", current_user=user("u1")))
+    assert [cached(ref) for ref in edges] == [None, None]
+
+
+# TokenCache
+
+def test_token_cache_serves_until_exp(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(main.time, "time", lambda: now)
+    cache = main.TokenCache(max_size=10, max_ttl=3600)
+    cache.put("token", {"uid": "u1", "exp": now + 60})
+    assert cache.get("token") == {"uid": "u1", "exp": now + 60}
+
+    now += 61
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_token_cache_caps_entries_at_max_ttl(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(main.time, "time", lambda: now)
+    cache = main.TokenCache(max_size=10, max_ttl=30)
+    cache.put("token", {"uid": "u1", "exp": now + 3600})
+    now += 31
+    assert cache.get("token") is None
+
+
+def test_token_cache_skips_expired_tokens_and_evicts_lru():
+    cache = main.TokenCache(max_size=2, max_ttl=3600)
+    cache.put("expired", {"uid": "u0", "exp": 0})
+    assert cache.stats()["size"] == 0
+
+    exp = datetime.now(timezone.utc).timestamp() + 600
+    for token in ("a", "b"):
+        cache.put(token, {"uid": token, "exp": exp})
+    cache.get("a")
+    cache.put("c", {"uid": "c", "exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+# Cursors
+
+def test_cursor_round_trip():
+    ref = main.db.collection("groups").document("g1").collection("messages").document("m1")
+    created_at = datetime(2025, 3, 4, 5, 6, 7, 890000, tzinfo=timezone.utc)
+    cursor = main.encode_cursor(FakeSnapshot(ref, {"created_at": created_at}), "created_at")
+    assert "=" not in cursor
+    assert main.decode_cursor(cursor) == (created_at, "m1")
+
+
+def test_cursor_round_trip_with_null_sort_value():
+    ref = main.db.collection("groups").document("g1").collection("tasks").document("t1")
+    cursor = main.encode_cursor(FakeSnapshot(ref, {"created_at": None}), "created_at")
+    assert main.decode_cursor(cursor) == (None, "t1")
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "eyJ2IjogIm5vcGUiLCAiaWQiOiAieCJ9"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        main.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+# User search
+
+def test_search_tokens_cover_prefixes_and_infixes():
+    tokens = main.search_tokens("Ann@Example.com", "annie", "Ann   Lee")
+    assert "ann" in tokens and "example" in tokens and "annie" in tokens
+    assert "ann lee" in tokens
+    assert "nn l" in tokens
+    assert all(token == token.lower() for token in tokens)
+    assert tokens == sorted(set(tokens))
+
+
+def test_search_tokens_stop_at_ngram_max():
+    tokens = main.search_tokens("a" * 30 + "@x.io", None, None)
+    assert max(len(token) for token in tokens) == main.SEARCH_NGRAM_MAX
+    assert main.search_tokens(None, None, None) == []
+
+
+# History
+
+def history_months(days):
+    """users/{uid}/history snapshots for {date: (total, completed)}"""
+    months = {}
+    for day, (total, completed) in days.items():
+        months.setdefault(day[:7], {})[day[8:]] = {"total_tasks": total, "completed_tasks": completed}
+
+    def get_all_docs(refs):
+        return [FakeSnapshot(ref, {"days": months[ref.id]} if ref.id in months else None) for ref in refs]
+    return get_all_docs
+
+
+def test_build_history_streaks(monkeypatch):
+    monkeypatch.setattr(main, "get_all_docs", history_months({
+        "2025-01-28": (5, 5),
+        "2025-01-29": (5, 4),
+        "2025-01-30": (4, 1),  # below the threshold, breaks the run
+        "2025-01-31": (2, 2),
+        "2025-02-01": (3, 3),
+        "2025-02-02": (1, 1),
+    }))
+    result = asyncio.run(main.build_history("u1", "2025-01-27", "2025-02-02", 31, None))
+    assert result["streaks"] == {"current": 3, "best": 3, "threshold": main.STREAK_THRESHOLD}
+    assert [entry["date"] for entry in result["history"]][:2] == ["2025-02-02", "2025-02-01"]
+    assert result["history"][-1] == {"date": "2025-01-28", "total_tasks": 5, "completed_tasks": 5, "completion_percentage": 100}
+
+
+def test_build_history_empty_day_breaks_streak(monkeypatch):
+    monkeypatch.setattr(main, "get_all_docs", history_months({
+        "2025-03-01": (2, 2), "2025-03-02": (2, 2), "2025-03-03": (2, 2),
+        "2025-03-05": (1, 1),
+    }))
+    result = asyncio.run(main.build_history("u1", "2025-03-01", "2025-03-05", 31, None))
+    assert result["streaks"]["best"] == 3 and result["streaks"]["current"] == 1
+
+
+def test_build_history_unfinished_today_keeps_the_streak(monkeypatch):
+    today = datetime.now(timezone.utc).date()
+    yesterday, before = today - timedelta(days=1), today - timedelta(days=2)
+    monkeypatch.setattr(main, "get_all_docs", history_months({
+        before.isoformat(): (1, 1), yesterday.isoformat(): (1, 1), today.isoformat(): (4, 0),
+    }))
+    result = asyncio.run(main.build_history("u1", before.isoformat(), None, 31, None))
+    assert result["streaks"]["current"] == 2
+
+
+def test_build_history_pages_newest_first(monkeypatch):
+    start = date(2025, 5, 1)
+    monkeypatch.setattr(main, "get_all_docs", history_months({(start + timedelta(days=i)).isoformat(): (1, 1) for i in range(5)}))
+    first = asyncio.run(main.build_history("u1", "2025-05-01", "2025-05-05", 2, None))
+    assert [entry["date"] for entry in first["history"]] == ["2025-05-05", "2025-05-04"]
+    second = asyncio.run(main.build_history("u1", "2025-05-01", "2025-05-05", 2, first["next_cursor"]))
+    assert [entry["date"] for entry in second["history"]] == ["2025-05-03", "2025-05-02"]
+    last = asyncio.run(main.build_history("u1", "2025-05-01", "2025-05-05", 2, second["next_cursor"]))
+    assert [entry["date"] for entry in last["history"]] == ["2025-05-01"] and last["next_cursor"] is None
+
+
+def test_parse_history_range_rejects_bad_ranges():
+    for start, end in (("2025-02-01", "2025-01-01"), ("2024-01-01", "2025-06-01"), ("yesterday", None)):
+        with pytest.raises(HTTPException) as error:
+            main.parse_history_range(start, end)
+        assert error.value.status_code == 400
+
+
+# Firestore accounting
+
+def test_transaction_usage_counts_reads_and_committed_writes():
+    ref = main.db.collection("users").document("u1")
+
+    @main.counts_usage
+    def body(transaction):
+        main.transaction_read(transaction, FakeSnapshot(ref, None))
+        main.transaction_read(transaction, [FakeSnapshot(ref, {}), FakeSnapshot(ref, {})])
+        transaction.update(ref, {})
+        transaction.set(ref, {})
+        transaction.set(ref, {})
+        return "ok"
+
+    transaction = FakeClient().transaction()
+    assert body(transaction) == "ok"
+    assert main.transaction_usage(transaction, True) == (3, 3)
+    assert main.transaction_usage(transaction, False) == (3, 0)
+
+
+def test_responses_carry_server_timing():
+    with TestClient(main.app) as client:
+        response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith('db;dur=0.0;desc="0 reads, 0 writes, 0 calls"')
@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import styled from 'styled-components';
-import { apiService, Task, Friend, Group, MotivationalNote } from '../services/api';
+import { apiService, Task, Friend, FriendProgress, Group, MotivationalNote, LiveEvent, DashboardSection } from '../services/api';
+import { useAuth } from '../contexts/AuthContext';
 
 const DashboardContainer = styled.div`
   display: flex;
@@ -392,11 +393,24 @@ const StatLabel = styled.div`
   letter-spacing: 0.5px;
 `;
 
+// Every section the dashboard renders; the profile section isn't shown here, so it isn't fetched
+const DASHBOARD_SECTIONS: DashboardSection[] = ['tasks', 'friends_progress', 'groups', 'notes'];
+// Task events for collapsed friend cards are coalesced into one stats refresh per window
+const FRIEND_STATS_REFRESH_MS = 2000;
+
 const Dashboard: React.FC = () => {
+  const { currentUser } = useAuth();
+  const userId = currentUser?.uid;
   const [myTasks, setMyTasks] = useState<Task[]>([]);
   const [friends, setFriends] = useState<Friend[]>([]);
   const [groups, setGroups] = useState<Group[]>([]);
+  const [friendStats, setFriendStats] = useState<{ [key: string]: FriendProgress['stats'] }>({});
+  const friendStatsRef = useRef(friendStats);
+  friendStatsRef.current = friendStats;
+  // Task lists of the friend cards that are expanded; the others show rollup stats only
   const [friendTasks, setFriendTasks] = useState<{ [key: string]: Task[] }>({});
+  const friendTasksRef = useRef(friendTasks);
+  friendTasksRef.current = friendTasks;
   const [motivationalNotes, setMotivationalNotes] = useState<MotivationalNote[]>([]);
   const [newTaskTitle, setNewTaskTitle] = useState('');
   const [newTaskDescription, setNewTaskDescription] = useState('');
@@ -404,37 +418,40 @@ const Dashboard: React.FC = () => {
   const [selectedFriend, setSelectedFriend] = useState<string>('');
   const [loading, setLoading] = useState(false);
 
-  const loadData = async () => {
+  // One request builds every section (or just the ones a change touched)
+  const loadData = async (sections: DashboardSection[] = DASHBOARD_SECTIONS) => {
     try {
-      // Load user's tasks
-      const myTasksData = await apiService.getTodayTasks();
-      setMyTasks(myTasksData.tasks || []);
-      
-      // Load friends
-      const friendsData = await apiService.getFriends();
-      setFriends(friendsData.friends || []);
+      const data = await apiService.getDashboard({ sections });
       
-      // Load groups
-      const groupsData = await apiService.getGroups();
-      setGroups(groupsData.groups || []);
+      if (data.tasks) {
+        setMyTasks(data.tasks.tasks || []);
+      }
       
-      // Load friend tasks using friends progress endpoint
-      const friendTasksData: { [key: string]: Task[] } = {};
-      for (const friend of (friendsData.friends || [])) {
-        try {
-          const progressData = await apiService.getFriendsProgress();
-          const friendProgress = progressData.friends_progress?.find((fp: any) => fp.friend.id === friend.id);
-          friendTasksData[friend.id] = friendProgress?.tasks || [];
-        } catch (error) {
-          friendTasksData[friend.id] = [];
+      // Friends and their stats come from the friends progress section, without task lists
+      if (data.friends_progress) {
+        const progress = data.friends_progress.friends_progress || [];
+        const friendStatsData: { [key: string]: FriendProgress['stats'] } = {};
+        for (const fp of progress) {
+          friendStatsData[fp.friend.id] = fp.stats;
         }
+        setFriends(progress.map((fp) => fp.friend));
+        setFriendStats(friendStatsData);
+        setFriendTasks((current) => {
+          const kept: { [key: string]: Task[] } = {};
+          for (const id of Object.keys(current)) {
+            if (id in friendStatsData) kept[id] = current[id];
+          }
+          return kept;
+        });
       }
-      setFriendTasks(friendTasksData);
       
-      // Load motivational notes
-      const notesData = await apiService.getMotivationalNotes();
-      setMotivationalNotes(notesData.notes || []);
+      if (data.groups) {
+        setGroups(data.groups.groups || []);
+      }
       
+      if (data.notes) {
+        setMotivationalNotes(data.notes.notes || []);
+      }
     } catch (error) {
       console.error('Failed to load data:', error);
     }
@@ -444,6 +461,65 @@ const Dashboard: React.FC = () => {
     loadData();
   }, []);
 
+  // Apply friends' task changes and incoming notes as they happen instead of re-fetching everything
+  useEffect(() => {
+    let statsRefresh: ReturnType<typeof setTimeout> | null = null;
+    const refreshFriendStats = () => {
+      if (statsRefresh) return;
+      statsRefresh = setTimeout(() => {
+        statsRefresh = null;
+        loadData(['friends_progress']);
+      }, FRIEND_STATS_REFRESH_MS);
+    };
+
+    const connection = apiService.openEventStream((event: LiveEvent) => {
+      const { type, data } = event;
+      if (type === 'motivational_note') {
+        setMotivationalNotes((notes) => [data.note, ...notes]);
+      } else if (type === 'friend_added' || type === 'friend_removed') {
+        loadData(['friends_progress']);
+      } else if (type === 'task_created' || type === 'task_updated' || type === 'task_deleted') {
+        // The stream also carries our own and group members' tasks; only friends have cards here
+        if (data.user_id === userId || !(data.user_id in friendStatsRef.current)) return;
+        if (!(data.user_id in friendTasksRef.current)) {
+          // Collapsed cards only know their stats, so re-read the rollups (once per burst)
+          refreshFriendStats();
+          return;
+        }
+        setFriendTasks((current) => {
+          if (!(data.user_id in current)) return current;
+          const tasks = current[data.user_id];
+          let updated = tasks;
+          if (type === 'task_created') updated = [...tasks, data.task];
+          if (type === 'task_updated') updated = tasks.map((t) => (t.id === data.task_id ? { ...t, completed: data.completed } : t));
+          if (type === 'task_deleted') updated = tasks.filter((t) => t.id !== data.task_id);
+          return { ...current, [data.user_id]: updated };
+        });
+      }
+    });
+    return () => {
+      connection.close();
+      if (statsRefresh) clearTimeout(statsRefresh);
+    };
+  }, [userId]);
+
+  const toggleFriendTasks = async (friendId: string) => {
+    if (friendId in friendTasks) {
+      setFriendTasks((current) => {
+        const rest = { ...current };
+        delete rest[friendId];
+        return rest;
+      });
+      return;
+    }
+    try {
+      const tasks = await apiService.getFriendTasks(friendId);
+      setFriendTasks((current) => ({ ...current, [friendId]: tasks }));
+    } catch (error) {
+      console.error('Failed to load friend tasks:', error);
+    }
+  };
+
   const handleCreateTask = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!newTaskTitle.trim()) return;
@@ -453,7 +529,7 @@ const Dashboard: React.FC = () => {
       await apiService.createTask(newTaskTitle, newTaskDescription);
       setNewTaskTitle('');
       setNewTaskDescription('');
-      await loadData();
+      await loadData(['tasks']);
     } catch (error) {
       console.error('Failed to create task:', error);
     } finally {
@@ -464,7 +540,7 @@ const Dashboard: React.FC = () => {
   const handleToggleTask = async (taskId: string, completed: boolean) => {
     try {
       await apiService.updateTask(taskId, { completed: !completed });
-      await loadData();
+      await loadData(['tasks']);
     } catch (error) {
       console.error('Failed to update task:', error);
     }
@@ -475,7 +551,7 @@ const Dashboard: React.FC = () => {
 
     try {
       await apiService.deleteTask(taskId);
-      await loadData();
+      await loadData(['tasks']);
     } catch (error) {
       console.error('Failed to delete task:', error);
     }
@@ -612,8 +688,11 @@ const Dashboard: React.FC = () => {
           
           <TaskList>
             {friends.map((friend) => {
-              const tasks = friendTasks[friend.id] || [];
-              const progress = calculateProgress(tasks);
+              const tasks = friendTasks[friend.id];
+              const stats = tasks
+                ? { completed_tasks: tasks.filter(t => t.completed).length, total_tasks: tasks.length, completion_percentage: calculateProgress(tasks) }
+                : friendStats[friend.id] || { completed_tasks: 0, total_tasks: 0, completion_percentage: 0 };
+              const progress = stats.completion_percentage;
               return (
                 <FriendCard key={friend.id}>
                   <FriendHeader>
@@ -621,14 +700,19 @@ const Dashboard: React.FC = () => {
                       {friend.display_name || friend.username || friend.email}
                     </FriendName>
                     <Stats>
-                      <span>{tasks.filter(t => t.completed).length}/{tasks.length}</span>
+                      <span>{stats.completed_tasks}/{stats.total_tasks}</span>
                       <span>{progress}%</span>
+                      {stats.total_tasks > 0 && (
+                        <SmallButton type="button" onClick={() => toggleFriendTasks(friend.id)}>
+                          {tasks ? 'Hide tasks' : 'Show tasks'}
+                        </SmallButton>
+                      )}
                     </Stats>
                   </FriendHeader>
                   <ProgressBar>
                     <ProgressFill $percentage={progress} />
                   </ProgressBar>
-                  {tasks.length > 0 && (
+                  {tasks && tasks.length > 0 && (
                     <div style={{ marginTop: '12px' }}>
                       {tasks.slice(0, 3).map((task) => (
                         <TaskItem key={task.id} $completed={task.completed}>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
-import { apiService, HistoryEntry } from '../services/api';
+import { apiService, HistoryEntry, HistoryPage } from '../services/api';
 
 const HistoryContainer = styled.div`
   display: flex;
@@ -170,13 +170,15 @@ const LoadingState = styled.div`
 
 const History: React.FC = () => {
   const [history, setHistory] = useState<HistoryEntry[]>([]);
+  const [streaks, setStreaks] = useState<HistoryPage['streaks'] | null>(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const loadHistory = async () => {
       try {
         const data = await apiService.getUserHistory();
-        setHistory(data || []);
+        setHistory(data.history || []);
+        setStreaks(data.streaks);
       } catch (error) {
         console.error('Failed to load history:', error);
       } finally {
@@ -202,36 +204,12 @@ const History: React.FC = () => {
       history.reduce((sum, entry) => sum + entry.completion_percentage, 0) / totalDays
     );
 
-    // Calculate streaks (days with >80% completion)
-    let currentStreak = 0;
-    let bestStreak = 0;
-    let tempStreak = 0;
-
-    // Sort history by date (most recent first)
-    const sortedHistory = [...history].sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime());
-
-    for (let i = 0; i < sortedHistory.length; i++) {
-      const entry = sortedHistory[i];
-      if (entry.completion_percentage >= 80) {
-        tempStreak++;
-        if (i === 0) {
-          currentStreak = tempStreak;
-        }
-      } else {
-        bestStreak = Math.max(bestStreak, tempStreak);
-        if (i === 0) {
-          currentStreak = 0;
-        }
-        tempStreak = 0;
-      }
-    }
-    bestStreak = Math.max(bestStreak, tempStreak);
-
+    // Streaks (days with 80%+ completion) are computed server-side over the whole range
     return {
       totalDays,
       averageCompletion,
-      bestStreak,
-      currentStreak
+      bestStreak: streaks?.best ?? 0,
+      currentStreak: streaks?.current ?? 0
     };
   };
 
@@ -33,6 +33,28 @@ export interface Task {
   group_id?: string;
 }
 
+export interface TaskOperation {
+  op: 'create' | 'update' | 'delete';
+  task_id?: string;
+  title?: string;
+  description?: string;
+  priority?: 'low' | 'medium' | 'high';
+  group_id?: string;
+  completed?: boolean;
+}
+
+export interface TaskOperationResult {
+  index: number;
+  op: TaskOperation['op'];
+  ok: boolean;
+  status_code: number;
+  task_id: string | null;
+  group_id?: string | null;
+  task?: Task;
+  completed?: boolean;
+  error?: string;
+}
+
 export interface UserProfile {
   id: string;
   email: string;
@@ -118,6 +140,107 @@ export interface HistoryEntry {
   completion_percentage: number;
 }
 
+export interface HistoryPage {
+  history: HistoryEntry[];
+  streaks: {
+    current: number;
+    best: number;
+    threshold: number;
+  };
+  start: string;
+  end: string;
+  next_cursor: string | null;
+}
+
+export interface HistoryDay {
+  date: string;
+  tasks: Task[];
+  stats: {
+    total_tasks: number;
+    completed_tasks: number;
+    completion_percentage: number;
+  };
+  archived: boolean;
+}
+
+export interface PageQuery {
+  limit?: number;
+  cursor?: string;
+}
+
+export interface ProgressQuery {
+  include_tasks?: boolean;
+  fields?: string;
+}
+
+export interface HistoryQuery {
+  start?: string;
+  end?: string;
+  limit?: number;
+  cursor?: string;
+}
+
+export type LiveEventType =
+  | 'task_created' | 'task_updated' | 'task_deleted'
+  | 'friend_request' | 'friend_added' | 'friend_removed'
+  | 'motivational_note' | 'group_message'
+  | 'group_task_created' | 'group_task_updated' | 'group_task_deleted'
+  | 'group_joined' | 'group_left' | 'member_joined' | 'member_left';
+
+export interface LiveEvent {
+  type: LiveEventType;
+  data: any;
+}
+
+const LIVE_EVENT_TYPES: LiveEventType[] = [
+  'task_created', 'task_updated', 'task_deleted',
+  'friend_request', 'friend_added', 'friend_removed',
+  'motivational_note', 'group_message',
+  'group_task_created', 'group_task_updated', 'group_task_deleted',
+  'group_joined', 'group_left', 'member_joined', 'member_left',
+];
+
+export interface LiveConnection {
+  close: () => void;
+}
+
+const STREAM_RETRY_MIN_MS = 1000;
+const STREAM_RETRY_MAX_MS = 30000;
+
+// Single-use ticket standing in for the ID token on connections that can't send headers
+const getStreamTicket = async (): Promise<string> => {
+  const response = await api.post('/stream/ticket');
+  return response.data.ticket;
+};
+
+export interface FriendProgress {
+  friend: Friend;
+  tasks?: Task[];
+  stats: {
+    total_tasks: number;
+    completed_tasks: number;
+    completion_percentage: number;
+  };
+}
+
+export type DashboardSection = 'profile' | 'tasks' | 'friends_progress' | 'groups' | 'notes';
+
+export interface DashboardQuery {
+  sections?: DashboardSection[];
+  include_tasks?: boolean;
+  fields?: string;
+  notes_limit?: number;
+}
+
+// Each section holds the same body as its own endpoint; only requested sections are present
+export interface DashboardData {
+  profile?: { user: UserProfile | null };
+  tasks?: { tasks: Task[]; date: string };
+  friends_progress?: { friends_progress: FriendProgress[] };
+  groups?: { groups: Group[] };
+  notes?: { notes: MotivationalNote[]; next_cursor: string | null };
+}
+
 export interface GroupProgress {
   group_id: string;
   group_name: string;
@@ -140,6 +263,11 @@ export const apiService = {
     return response.data;
   },
 
+  getDashboard: async ({ sections, ...params }: DashboardQuery = {}): Promise<DashboardData> => {
+    const response = await api.get('/dashboard', { params: { ...params, sections: sections?.join(',') } });
+    return response.data;
+  },
+
   updateProfile: async (data: { display_name?: string; username?: string }): Promise<UserProfile> => {
     const response = await api.post('/users/setup', data);
     return response.data.user;
@@ -171,8 +299,8 @@ export const apiService = {
     return response.data;
   },
 
-  getFriendsProgress: async (): Promise<any> => {
-    const response = await api.get('/friends/progress');
+  getFriendsProgress: async (params?: ProgressQuery): Promise<any> => {
+    const response = await api.get('/friends/progress', { params });
     return response.data;
   },
 
@@ -207,6 +335,11 @@ export const apiService = {
     return response.data;
   },
 
+  batchTasks: async (operations: TaskOperation[]): Promise<{ message: string; results: TaskOperationResult[]; date: string }> => {
+    const response = await api.post('/tasks/batch', { operations });
+    return response.data;
+  },
+
   // Group management
   createGroup: async (name: string, description?: string): Promise<Group> => {
     const response = await api.post('/groups', { name, description });
@@ -249,8 +382,8 @@ export const apiService = {
     return response.data;
   },
 
-  getGroupTasks: async (groupId: string): Promise<GroupTask[]> => {
-    const response = await api.get(`/groups/${groupId}/tasks`);
+  getGroupTasks: async (groupId: string, params?: PageQuery): Promise<{tasks: GroupTask[], group_id: string, next_cursor: string | null}> => {
+    const response = await api.get(`/groups/${groupId}/tasks`, { params });
     return response.data;
   },
 
@@ -270,14 +403,14 @@ export const apiService = {
     return response.data;
   },
 
-  getGroupMessages: async (groupId: string): Promise<GroupMessage[]> => {
-    const response = await api.get(`/groups/${groupId}/messages`);
+  getGroupMessages: async (groupId: string, params?: PageQuery): Promise<{messages: GroupMessage[], group_id: string, next_cursor: string | null}> => {
+    const response = await api.get(`/groups/${groupId}/messages`, { params });
     return response.data;
   },
 
   // Group progress
-  getGroupProgress: async (groupId: string): Promise<GroupProgress> => {
-    const response = await api.get(`/groups/${groupId}/progress`);
+  getGroupProgress: async (groupId: string, params?: ProgressQuery): Promise<GroupProgress> => {
+    const response = await api.get(`/groups/${groupId}/progress`, { params });
     return response.data;
   },
 
@@ -291,8 +424,8 @@ export const apiService = {
     return response.data;
   },
 
-  getMotivationalNotes: async (): Promise<{notes: MotivationalNote[]}> => {
-    const response = await api.get('/motivational-notes');
+  getMotivationalNotes: async (params?: PageQuery): Promise<{notes: MotivationalNote[], next_cursor: string | null}> => {
+    const response = await api.get('/motivational-notes', { params });
     return response.data;
   },
 
@@ -302,15 +435,79 @@ export const apiService = {
   },
 
   // History
-  getUserHistory: async (): Promise<HistoryEntry[]> => {
-    const response = await api.get('/history');
+  getUserHistory: async (params?: HistoryQuery): Promise<HistoryPage> => {
+    const response = await api.get('/history', { params });
+    return response.data;
+  },
+
+  getFriendHistory: async (friendId: string, params?: HistoryQuery): Promise<HistoryPage> => {
+    const response = await api.get(`/history/friend/${friendId}`, { params });
     return response.data;
   },
 
-  getFriendHistory: async (friendId: string): Promise<HistoryEntry[]> => {
-    const response = await api.get(`/history/friend/${friendId}`);
+  getHistoryDay: async (date: string, friendId?: string): Promise<HistoryDay> => {
+    const response = await api.get(friendId ? `/history/friend/${friendId}/${date}` : `/history/${date}`);
     return response.data;
   },
+
+  // Live updates (server-sent events). EventSource can't set headers, so each connection
+  // opens with a single-use ticket; on any error it reconnects with a fresh one (and so a fresh ID token).
+  openEventStream: (onEvent: (event: LiveEvent) => void): LiveConnection => {
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let delay = STREAM_RETRY_MIN_MS;
+    let closed = false;
+
+    const reconnect = () => {
+      if (closed) return;
+      retry = setTimeout(connect, delay);
+      delay = Math.min(delay * 2, STREAM_RETRY_MAX_MS);
+    };
+
+    const connect = async () => {
+      try {
+        const ticket = await getStreamTicket();
+        if (closed) return;
+        source = new EventSource(`${API_BASE_URL}/stream?ticket=${encodeURIComponent(ticket)}`);
+        source.onopen = () => {
+          delay = STREAM_RETRY_MIN_MS;
+        };
+        LIVE_EVENT_TYPES.forEach((type) => {
+          source?.addEventListener(type, (message) => {
+            onEvent({ type, data: JSON.parse((message as MessageEvent).data) });
+          });
+        });
+        // EventSource would retry with the same (already used) ticket, so take over reconnecting
+        source.onerror = () => {
+          source?.close();
+          reconnect();
+        };
+      } catch (error) {
+        reconnect();
+      }
+    };
+
+    connect();
+    return {
+      close: () => {
+        closed = true;
+        clearTimeout(retry);
+        source?.close();
+      },
+    };
+  },
+
+  // Group chat socket: send { message } frames, receive the group's events. Opened with a
+  // single-use ticket, so reconnect (on a 1013 close, say) by calling this again.
+  openGroupChat: async (groupId: string, onEvent: (event: LiveEvent) => void): Promise<WebSocket> => {
+    const ticket = await getStreamTicket();
+    const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws').replace(/\/api$/, '')}/ws/groups/${groupId}?ticket=${encodeURIComponent(ticket)}`);
+    socket.onmessage = (message) => {
+      const frame = JSON.parse(message.data);
+      if (frame.type !== 'error') onEvent({ type: frame.type, data: frame.data });
+    };
+    return socket;
+  },
 };
 
 export default api;